@@ -0,0 +1,22 @@
+"""Add crawl_stats to scan_jobs
+
+Revision ID: 2b3c4d5e6f7a
+Revises: 1a2b3c4d5e6f
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2b3c4d5e6f7a'
+down_revision = '1a2b3c4d5e6f'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('scan_jobs', sa.Column('crawl_stats', postgresql.JSONB(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('scan_jobs', 'crawl_stats')
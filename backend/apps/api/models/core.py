@@ -51,6 +51,7 @@ class ScanJob(Base):
     total_pages_crawled = Column(Integer, default=0)
     total_issues_found = Column(Integer, default=0)
     overall_hygiene_score = Column(Float)
+    crawl_stats = Column(JSONB, default={})
     error_message = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -1,6 +1,7 @@
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from reqon_types.models import PageData
+from apps.detector.dom_index import dom_index
 
 class PageClassifier:
     """
@@ -8,27 +9,17 @@ class PageClassifier:
     based on URL patterns, DOM structure, and text content.
     """
     
+    PURCHASE_PHRASES = ("add to cart", "buy now")
+
     def __init__(self):
         # We could load a light scikit-learn model here if trained
         pass
         
     def classify(self, page_data: PageData) -> str:
-        url = page_data.url.lower()
-        dom = page_data.dom_snapshot.lower()
-        
         # 1. URL Heuristics
-        if any(x in url for x in ['/login', '/signin', '/auth']):
-            return "auth_login"
-        if any(x in url for x in ['/signup', '/register']):
-            return "auth_register"
-        if any(x in url for x in ['/dashboard', '/admin']):
-            return "dashboard"
-        if '/product/' in url or '/item/' in url:
-            return "ecommerce_product"
-        if '/checkout' in url or '/cart' in url:
-            return "ecommerce_checkout"
-        if '/blog/' in url or '/article/' in url or '/post/' in url:
-            return "content_article"
+        page_type = self.classify_url(page_data.url)
+        if page_type:
+            return page_type
             
         # 2. DOM Heuristics
         # Check if forms are present
@@ -45,8 +36,42 @@ class PageClassifier:
                     elif "new_password" in input_names or action.endswith("register"):
                         return "auth_register"
                         
-        if "add to cart" in dom or "buy now" in dom:
+        if self.has_purchase_action(page_data):
             return "ecommerce_product"
             
         # Default fallback
         return "generic_page"
+
+    def has_purchase_action(self, page_data: PageData) -> bool:
+        """
+        An "add to cart" or "buy now" button, link or submit input. The
+        substring check comes first so most pages are never parsed; a match
+        inside a script or plain text does not count.
+        """
+        dom = dom_index(page_data)
+        if not any(phrase in dom.lower for phrase in self.PURCHASE_PHRASES):
+            return False
+        labels = [el.get_text(" ", strip=True) for tag in ("button", "a") for el in dom.elements(tag)]
+        labels += [el["value"] for el in dom.with_attribute("value")
+                   if el.name == "input" and str(el.get("type", "")).lower() in ("submit", "button")]
+        return any(phrase in str(label).lower() for label in labels for phrase in self.PURCHASE_PHRASES)
+
+    def classify_url(self, url: str) -> Optional[str]:
+        """
+        Page type from the URL alone, or None when the URL gives no hint.
+        Cheap enough to run on every discovered link before it is crawled.
+        """
+        url = url.lower()
+        if any(x in url for x in ['/login', '/signin', '/auth']):
+            return "auth_login"
+        if any(x in url for x in ['/signup', '/register']):
+            return "auth_register"
+        if any(x in url for x in ['/dashboard', '/admin']):
+            return "dashboard"
+        if '/product/' in url or '/item/' in url:
+            return "ecommerce_product"
+        if '/checkout' in url or '/cart' in url:
+            return "ecommerce_checkout"
+        if '/blog/' in url or '/article/' in url or '/post/' in url:
+            return "content_article"
+        return None
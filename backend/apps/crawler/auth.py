@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from playwright.async_api import BrowserContext, Route
+
+from reqon_types.models import CrawlerConfig
+from reqon_utils.logger import setup_logger
+
+logger = setup_logger("reqon-crawler")
+
+# Seeds the login's localStorage into pages of its origin. Pooled tabs may
+# clear localStorage between navigations (tab_keep_storage=False), so this
+# runs on every document and only writes when the generation marker is
+# missing or stale.
+AUTH_STORAGE_SCRIPT = """
+(state) => {
+    const entry = state.origins.find(o => o.origin === location.origin);
+    if (!entry) return;
+    try {
+        if (localStorage.getItem('__reqonAuthGeneration') === String(state.generation)) return;
+        for (const item of entry.localStorage) localStorage.setItem(item.name, item.value);
+        localStorage.setItem('__reqonAuthGeneration', String(state.generation));
+    } catch (e) {}
+}
+"""
+
+DEFAULT_USERNAME_SELECTOR = 'input[type="email"], input[name*="user" i], input[name*="email" i], input[type="text"]'
+DEFAULT_PASSWORD_SELECTOR = 'input[type="password"]'
+DEFAULT_SUBMIT_SELECTOR = 'button[type="submit"], input[type="submit"]'
+
+class AuthSession:
+    """
+    Logs in once and shares the session with every context, tab and HTTP
+    client of a job. The resulting Playwright storage state is cached in
+    Redis per organization and target for auth_session_ttl seconds, so
+    concurrent and back-to-back jobs reuse one login; a Redis lock makes
+    sure only one of them performs it.
+
+    Modes: "credentials" fills the login form in the job's browser context,
+    "token"/"oauth2" send a bearer token to the target origin only, and
+    "cookie" uses CrawlerConfig.cookies as the session. Only credentials
+    sessions can be renewed; reauthenticate() is called when a page lands
+    on the login URL or answers 401/403.
+    """
+
+    MODES = ("credentials", "token", "oauth2", "cookie")
+    REAUTH_COOLDOWN = 60.0   # seconds after a login during which 401/403 are taken at face value
+    LOCK_TIMEOUT = 120
+
+    def __init__(self, config: CrawlerConfig, redis_client=None, org_id: Optional[str] = None):
+        self.auth = config.auth_config
+        if self.auth is None:
+            raise ValueError("AuthSession requires CrawlerConfig.auth_config")
+        if self.auth.auth_type not in self.MODES:
+            raise ValueError(f"Unknown auth type '{self.auth.auth_type}', expected one of {self.MODES}")
+        if self.auth.auth_type == "credentials" and not self.auth.login_url:
+            raise ValueError("Credentials auth requires auth_config.login_url")
+        target = urlsplit(config.target_url)
+        self.origin = f"{target.scheme}://{target.netloc}".lower()
+        self.config = config
+        self.redis = redis_client
+        identity = "|".join([self.origin, self.auth.auth_type, self.auth.username or ""])
+        self.cache_key = f"auth:{org_id or 'none'}:{hashlib.sha1(identity.encode()).hexdigest()[:16]}"
+        self.login_path = urlsplit(self.auth.login_url).path if self.auth.login_url else None
+
+        self.state: Optional[Dict[str, Any]] = None
+        self.generation = 0
+        self.counts = {"logins": 0, "cache_hits": 0, "session_losses": 0}
+        self._last_login = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def needs_browser(self) -> bool:
+        return self.auth.auth_type == "credentials"
+
+    def _headers(self) -> Dict[str, str]:
+        if self.auth.auth_type in ("token", "oauth2") and self.auth.bearer_token:
+            return {"Authorization": f"Bearer {self.auth.bearer_token}"}
+        return {}
+
+    async def bootstrap(self, open_context: Callable[[], Awaitable[BrowserContext]]):
+        """Loads the cached session or logs in. open_context is only called when a browser login is needed."""
+        state = await self._load_cached()
+        if state is None:
+            state = await self._login_once(open_context)
+        else:
+            self.counts["cache_hits"] += 1
+        self.state = state
+        self.generation += 1
+
+    async def _load_cached(self) -> Optional[Dict[str, Any]]:
+        if self.redis is None:
+            return None
+        cached = await self.redis.get(self.cache_key)
+        return json.loads(cached) if cached else None
+
+    async def _login_once(self, open_context: Callable[[], Awaitable[BrowserContext]],
+                          stale: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Logs in under the Redis lock, unless another job did so while this one waited for it."""
+        if self.redis is None:
+            return await self._login(open_context)
+        async with self.redis.lock(f"{self.cache_key}:lock", timeout=self.LOCK_TIMEOUT):
+            cached = await self._load_cached()
+            if cached is not None and cached != stale:
+                self.counts["cache_hits"] += 1
+                return cached
+            state = await self._login(open_context)
+            await self.redis.set(self.cache_key, json.dumps(state), ex=self.config.auth_session_ttl)
+            return state
+
+    async def _login(self, open_context: Callable[[], Awaitable[BrowserContext]]) -> Dict[str, Any]:
+        self.counts["logins"] += 1
+        self._last_login = time.monotonic()
+        if self.auth.auth_type == "cookie":
+            return {"cookies": self._config_cookies(), "origins": []}
+        if self.auth.auth_type != "credentials":
+            return {"cookies": [], "origins": []}
+
+        context = await open_context()
+        await context.clear_cookies()
+        page = await context.new_page()
+        timeout = self.config.page_timeout
+        try:
+            await page.goto(self.auth.login_url, wait_until="domcontentloaded", timeout=timeout)
+            await page.fill(self.auth.username_selector or DEFAULT_USERNAME_SELECTOR, self.auth.username or "", timeout=timeout)
+            await page.fill(self.auth.password_selector or DEFAULT_PASSWORD_SELECTOR, self.auth.password or "", timeout=timeout)
+            await page.click(self.auth.submit_selector or DEFAULT_SUBMIT_SELECTOR, timeout=timeout)
+            if self.auth.success_indicator:
+                await page.wait_for_selector(self.auth.success_indicator, timeout=timeout)
+            else:
+                await page.wait_for_load_state("networkidle", timeout=timeout)
+                if urlsplit(page.url).path == self.login_path and await page.query_selector(DEFAULT_PASSWORD_SELECTOR):
+                    raise RuntimeError(f"Login at {self.auth.login_url} did not leave the login form")
+            state = await context.storage_state()
+        finally:
+            await page.close()
+        logger.info("Authenticated crawl session", origin=self.origin, cookies=len(state.get("cookies", [])))
+        return state
+
+    def _config_cookies(self):
+        host = urlsplit(self.origin).hostname
+        return [
+            {"name": c["name"], "value": c["value"], "domain": c.get("domain") or host, "path": c.get("path", "/")}
+            for c in self.config.cookies if "name" in c and "value" in c
+        ]
+
+    async def apply(self, context: BrowserContext):
+        """Installs the session on a new context; every tab it opens inherits it."""
+        headers = self._headers()
+        if headers:
+            async def add_headers(route: Route):
+                # fallback() keeps other handlers, e.g. the interception profile, in the chain.
+                await route.fallback(headers={**route.request.headers, **headers})
+            await context.route(f"{self.origin}/**", add_headers)
+        await self._apply_state(context)
+
+    async def _apply_state(self, context: BrowserContext):
+        if not self.state:
+            return
+        if self.state.get("cookies"):
+            await context.add_cookies(self.state["cookies"])
+        if self.state.get("origins"):
+            payload = json.dumps({"origins": self.state["origins"], "generation": self.generation})
+            await context.add_init_script(f"({AUTH_STORAGE_SCRIPT})({payload})")
+
+    def apply_to_client(self, client: httpx.AsyncClient):
+        client.headers.update(self._headers())
+        for cookie in (self.state or {}).get("cookies", []):
+            client.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+
+    def session_lost(self, requested_url: str, final_url: str, status: int) -> bool:
+        if self.login_path and urlsplit(final_url).path == self.login_path and urlsplit(requested_url).path != self.login_path:
+            return True
+        # Right after a login, 401/403 means this page is off limits, not that the session is gone.
+        return status in (401, 403) and time.monotonic() - self._last_login > self.REAUTH_COOLDOWN
+
+    async def reauthenticate(self, context: BrowserContext, seen_generation: int) -> bool:
+        """
+        Logs in again after session loss. seen_generation is the generation
+        the caller navigated with; if it is stale, another tab already renewed
+        the session and this one only needs to retry. Returns True when a
+        retry makes sense.
+        """
+        async with self._lock:
+            if self.generation != seen_generation:
+                return True
+            self.counts["session_losses"] += 1
+            if not self.needs_browser:
+                logger.warning("Session lost but auth type cannot be renewed", auth_type=self.auth.auth_type)
+                return False
+            async def same_context() -> BrowserContext:
+                return context
+            self.state = await self._login_once(same_context, stale=self.state)
+            self.generation += 1
+            await self._apply_state(context)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"auth_type": self.auth.auth_type, "generation": self.generation, **self.counts}
@@ -0,0 +1,103 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+from playwright.async_api import async_playwright, Browser
+
+from reqon_utils.logger import setup_logger
+
+logger = setup_logger("reqon-crawler")
+
+class PooledBrowser:
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.uses = 0
+        self.crashed = False
+        browser.on("disconnected", lambda _: self._mark_crashed())
+
+    def _mark_crashed(self):
+        self.crashed = True
+
+    def is_healthy(self) -> bool:
+        return not self.crashed and self.browser.is_connected()
+
+    async def close(self):
+        try:
+            if self.browser.is_connected():
+                await self.browser.close()
+        except Exception as e:
+            logger.error("Failed to close pooled browser", error=str(e))
+
+class BrowserPool:
+    """
+    Per-process pool of launched Chromium browsers reused across crawl jobs.
+    Jobs lease a browser and open their own BrowserContext on it, so state
+    stays isolated while the launch cost is paid once per max_uses jobs.
+    """
+
+    def __init__(self, size: int = 2, max_uses: int = 50):
+        self.size = size
+        self.max_uses = max_uses
+        self._playwright = None
+        self._idle: List[PooledBrowser] = []
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(size)
+
+    async def acquire(self) -> PooledBrowser:
+        await self._slots.acquire()
+        try:
+            async with self._lock:
+                while self._idle:
+                    pooled = self._idle.pop()
+                    if pooled.is_healthy():
+                        pooled.uses += 1
+                        return pooled
+                    logger.info("Discarding unhealthy pooled browser", uses=pooled.uses)
+                    await pooled.close()
+                pooled = await self._launch()
+                pooled.uses += 1
+                return pooled
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, pooled: PooledBrowser):
+        try:
+            if pooled.is_healthy() and pooled.uses < self.max_uses:
+                self._idle.append(pooled)
+            else:
+                await pooled.close()
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[PooledBrowser]:
+        pooled = await self.acquire()
+        try:
+            yield pooled
+        finally:
+            await self.release(pooled)
+
+    async def close(self):
+        async with self._lock:
+            for pooled in self._idle:
+                await pooled.close()
+            self._idle = []
+            if self._playwright:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def _launch(self) -> PooledBrowser:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        try:
+            browser = await self._playwright.chromium.launch(headless=True)
+        except Exception as e:
+            # The Playwright driver itself may have died; restart it once.
+            logger.error("Browser launch failed, restarting Playwright", error=str(e))
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = await async_playwright().start()
+            browser = await self._playwright.chromium.launch(headless=True)
+        return PooledBrowser(browser)
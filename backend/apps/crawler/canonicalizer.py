@@ -0,0 +1,108 @@
+import fnmatch
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from reqon_types.models import CrawlerConfig
+
+class UrlCanonicalizer:
+    """
+    Maps the many spellings of one page onto a single canonical URL, whose
+    hash is what the frontier deduplicates on. The crawler still fetches the
+    URL as it was first found; only identity is canonical.
+
+    Rules, in order:
+      host        - lowercase scheme and host, drop default ports and the fragment
+      session     - strip ;jsessionid= path parameters and session query params
+      tracking    - strip utm_* and click-id query params (plus canonical_strip_params)
+      sort_query  - order the remaining query params
+      index_file  - /index.html, /default.aspx, ... collapse to their directory
+      path_case   - lowercase the path (canonical_lowercase_path)
+      rewrite     - per-site regex rewrites (canonical_rewrites)
+    """
+
+    TRACKING_PARAMS = (
+        "utm_*", "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid", "twclid", "ttclid",
+        "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "igshid", "ref_src",
+    )
+    SESSION_PARAMS = ("jsessionid", "phpsessid", "aspsessionid*", "sid", "sessionid", "session_id", "cfid", "cftoken")
+    INDEX_FILES = re.compile(r"/(index|default)\.(html?|php|aspx?|jsp|cfm)$", re.IGNORECASE)
+    PATH_SESSION = re.compile(r";(jsessionid|phpsessid|sid)=[^/?#]*", re.IGNORECASE)
+    DEFAULT_PORTS = {"http": 80, "https": 443}
+
+    def __init__(self, config: Optional[CrawlerConfig] = None):
+        extra = [p.lower() for p in config.canonical_strip_params] if config else []
+        self.session_re = self._compile(self.SESSION_PARAMS)
+        self.tracking_re = self._compile(self.TRACKING_PARAMS + tuple(extra))
+        self.lowercase_path = config.canonical_lowercase_path if config else False
+        self.rewrites: List[Tuple[re.Pattern, str]] = [
+            (re.compile(rule["pattern"]), rule.get("replacement", ""))
+            for rule in (config.canonical_rewrites if config else [])
+        ]
+        # How many links offered to the frontier each rule changed, for crawl stats.
+        self.rule_hits: Counter = Counter()
+
+    def canonicalize(self, url: str, count: bool = False) -> str:
+        """
+        With count, the rules that changed url are added to rule_hits. Only
+        links offered to the frontier are counted, not every lookup.
+        """
+        hits = set()
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").lower()
+        port = parts.port if parts.port and parts.port != self.DEFAULT_PORTS.get(scheme) else None
+        netloc = f"{host}:{port}" if port else host
+        if parts.username:
+            netloc = f"{parts.username}:{parts.password}@{netloc}" if parts.password else f"{parts.username}@{netloc}"
+        if netloc != parts.netloc or scheme != parts.scheme:
+            hits.add("host")
+
+        path = parts.path
+        stripped = self.PATH_SESSION.sub("", path)
+        if stripped != path:
+            hits.add("session")
+            path = stripped
+
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        kept = []
+        for key, value in params:
+            name = key.lower()
+            if self.session_re.match(name):
+                hits.add("session")
+            elif self.tracking_re.match(name):
+                hits.add("tracking")
+            else:
+                kept.append((key, value))
+        ordered = sorted(kept)
+        if ordered != kept:
+            hits.add("sort_query")
+
+        collapsed = self.INDEX_FILES.sub("/", path)
+        if collapsed != path:
+            hits.add("index_file")
+            path = collapsed
+        if self.lowercase_path and path != path.lower():
+            hits.add("path_case")
+            path = path.lower()
+
+        canonical = urlunsplit((scheme, netloc, path.rstrip("/"), urlencode(ordered), ""))
+        for pattern, replacement in self.rewrites:
+            rewritten = pattern.sub(replacement, canonical)
+            if rewritten != canonical:
+                hits.add("rewrite")
+                canonical = rewritten
+        if count:
+            self.rule_hits.update(hits)
+        return canonical
+
+    def hash(self, url: str, count: bool = False) -> str:
+        return hashlib.sha256(self.canonicalize(url, count).encode()).hexdigest()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.rule_hits)
+
+    def _compile(self, patterns) -> re.Pattern:
+        return re.compile("|".join(fnmatch.translate(p) for p in patterns))
@@ -1,12 +1,28 @@
 import asyncio
-import hashlib
+import time
+from collections import Counter
 from datetime import datetime
 from typing import AsyncGenerator, Dict, Any, List, Tuple
-from urllib.parse import urlparse, urljoin
+import httpx
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 
-from reqon_types.models import CrawlerConfig, AuthConfig, PageData
+from reqon_types.models import CrawlerConfig, PageData
 from reqon_utils.logger import setup_logger
+from apps.crawler.auth import AuthSession
+from apps.crawler.canonicalizer import UrlCanonicalizer
+from apps.crawler.frontier import FrontierEntry, MemoryFrontier
+from apps.crawler.http_fetcher import HttpFetcher
+from apps.crawler.incremental import content_hash, not_modified_page, validators
+from apps.crawler.interception import InterceptionProfile
+from apps.crawler.neardup import NearDuplicateIndex, simhash
+from apps.crawler.priority import PriorityScorer
+from apps.crawler.rate_limit import HostRateLimiter, throttle_hint
+from apps.crawler.readiness import ReadinessEngine
+from apps.crawler.scope import ScopeMatcher
+from apps.crawler.sitemap import SitemapReader, seed_frontier, sitemap_priority, sitemap_urls_for
+from apps.crawler.tab_pool import TabPool
+from apps.crawler.url_templates import TemplateSampler
+from apps.detector.dom_index import dom_index
 
 logger = setup_logger("reqon-crawler")
 
@@ -17,226 +33,581 @@ class CrawlerEvent:
         self.timestamp = datetime.utcnow().isoformat()
 
 class AutonomousCrawler:
-    def __init__(self):
+    FETCH_MODES = ("browser", "hybrid", "http")
+    FRONTIER_STRATEGIES = ("priority", "fifo")
+    # Seconds to wait for captured response bodies still being read once the page is ready.
+    BODY_READ_TIMEOUT = 2.0
+
+    def __init__(self, frontier=None, browser_pool=None, baseline=None, auth=None, rate_limiter=None,
+                 live_detection=None):
         self.playwright = None
         self.browser = None
         self.context = None
-        self.visited_urls = set()
-        self.discovered_urls = set()
+        # Without an injected frontier, start() builds a MemoryFrontier for the config's dedup backend.
+        self.frontier = frontier
+        self.browser_pool = browser_pool
+        self._lease = None
+        self.tabs = None
+        self.readiness = None
+        self.http = None
+        self.canonicalizer = UrlCanonicalizer()
+        self.scope = None
+        self.dedup_stats = {"links_offered": 0, "duplicate_hits": 0}
+        self.scorer = None
+        self.sampler = None
+        self.neardup = None
+        self.deadline = None
+        self.time_budget_exhausted = False
+        # url_hash -> page of the baseline scan (ScanPipeline.load_baseline) for incremental scans.
+        self.baseline = baseline or {}
+        self.incremental_stats: Counter = Counter()
+        # Without an injected AuthSession (Redis-cached), start() builds an uncached one for config.auth_config.
+        self.auth = auth
+        self.sitemap_stats: Dict[str, int] = {}
+        # Without an injected (Redis-backed) limiter, start() builds a process-local one.
+        self.rate_limiter = rate_limiter
+        # async (page_data, page) -> results, run on rendered pages before their tab is released
+        # (DefectDetectionEngine.live_hook); the results ride along in metadata["live_detection"].
+        self.live_detection = live_detection
+        self._browser_lock = asyncio.Lock()
 
     async def start(self, config: CrawlerConfig) -> AsyncGenerator[CrawlerEvent, None]:
         logger.info("Starting crawler", target_url=config.target_url)
         
-        self.playwright = await async_playwright().start()
-        self.browser, self.context = await self._setup_browser(config)
+        if config.fetch_mode not in self.FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode '{config.fetch_mode}', expected one of {self.FETCH_MODES}")
+        if config.frontier_strategy not in self.FRONTIER_STRATEGIES:
+            raise ValueError(f"Unknown frontier strategy '{config.frontier_strategy}', expected one of {self.FRONTIER_STRATEGIES}")
+        self.canonicalizer = UrlCanonicalizer(config)
+        self.scorer = PriorityScorer() if config.frontier_strategy == "priority" else None
+        if config.near_duplicate_detection:
+            self.neardup = NearDuplicateIndex(config.near_duplicate_distance)
+        if config.template_sample_size > 0:
+            self.sampler = TemplateSampler(config.template_sample_size, config.template_dom_fingerprint)
+        self.deadline = time.monotonic() + config.max_duration if config.max_duration else None
+        if self.rate_limiter is None:
+            self.rate_limiter = HostRateLimiter.from_config(config)
+        if self.frontier is None:
+            self.frontier = MemoryFrontier(config.dedup_backend, config.dedup_error_rate)
+        if config.auth_config and self.auth is None:
+            self.auth = AuthSession(config)
+        
+        # Long-lived workers pull from the frontier so a slow page only ever
+        # occupies its own slot instead of holding back a whole batch.
+        events: asyncio.Queue = asyncio.Queue(maxsize=config.concurrent_pages * 2)
+        workers: List[asyncio.Task] = []
+        completed = False
+        failure: Exception | None = None
         
         try:
+            # Set up inside the try so a failed login still releases the browser and client.
+            if config.fetch_mode != "browser" or self.baseline:
+                # Also the client for conditional requests against the baseline.
+                self.http = HttpFetcher(config)
+            self.scope = await ScopeMatcher.load(config, self.http.client if self.http else None)
+            if config.fetch_mode == "browser":
+                await self._open_browser(config)
+            if self.auth:
+                await self._authenticate(config)
+
+            resumed = await self.frontier.resume()
             # Yield scan started
-            yield CrawlerEvent("scan_started", {"target_url": config.target_url, "max_pages": config.max_pages})
+            yield CrawlerEvent("scan_started", {
+                "target_url": config.target_url,
+                "max_pages": config.max_pages,
+                "resumed": resumed
+            })
             
-            queue = [(config.target_url, 0, None)] # url, depth, parent
+            if not resumed:
+                # Top priority so sitemap-seeded URLs never crowd out the target page itself.
+                await self.frontier.bootstrap(
+                    FrontierEntry(config.target_url, self._hash_url(config.target_url), priority=100.0),
+                    {"target_url": config.target_url, "pages_crawled": 0}
+                )
+                if config.sitemap_seeding:
+                    await self._seed_from_sitemaps(config)
             
-            while queue and len(self.visited_urls) < config.max_pages:
-                current_batch = queue[:config.concurrent_pages]
-                queue = queue[config.concurrent_pages:]
-                
-                tasks = []
-                for url, depth, parent in current_batch:
-                    if self._is_duplicate(self._hash_url(url)):
-                        continue
-                    
-                    if depth > config.max_depth:
-                        continue
-                        
-                    yield CrawlerEvent("page_discovered", {"url": url})
-                    tasks.append(self._process_url(url, depth, parent, config))
-                    
-                results = await asyncio.gather(*tasks, return_exceptions=True)
+            workers = [
+                asyncio.create_task(self._supervise(events, self._worker(events, config)))
+                for _ in range(max(1, config.concurrent_pages))
+            ]
+            workers.append(asyncio.create_task(self._supervise(events, self._close_when_drained(events))))
+            
+            since_checkpoint = 0
+            while True:
+                item = await events.get()
+                if item is None:
+                    completed = True
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                event, entry = item
+                yield event
                 
-                for res in results:
-                    if isinstance(res, Exception):
-                        logger.error("Error processing page", error=str(res))
-                        continue
-                        
-                    page_data, new_links = res
-                    self.visited_urls.add(page_data.url_hash)
-                    
-                    yield CrawlerEvent("page_crawled", {
-                        "url": page_data.url,
-                        "depth": page_data.depth,
-                        "title": page_data.title,
-                        "http_status": page_data.http_status,
-                        "page_data": page_data
-                    })
-                    
-                    # Add new links to queue
-                    for link in new_links:
-                        link_hash = self._hash_url(link)
-                        if self._should_crawl_url(link, config.target_url, config) and link_hash not in self.discovered_urls:
-                            self.discovered_urls.add(link_hash)
-                            queue.append((link, depth + 1, page_data.url))
+                if entry is not None:
+                    # The consumer has handled the page by the time the
+                    # generator resumes, so it is now safe to retire it.
+                    await self.frontier.mark_visited(entry.url_hash)
+                    await self.frontier.task_done(entry)
+                    since_checkpoint += 1
+                    if since_checkpoint >= config.checkpoint_interval:
+                        since_checkpoint = 0
+                        await self.frontier.checkpoint({
+                            "target_url": config.target_url,
+                            "pages_crawled": (await self.frontier.stats())["visited"]
+                        })
+        except Exception as e:
+            failure = e
+            raise
                             
         finally:
-            if self.context:
-                await self.context.close()
-            if self.browser:
-                await self.browser.close()
-            if self.playwright:
-                await self.playwright.stop()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if self.http:
+                await self.http.close()
+            await self._close_browser()
                 
+            stats = await self.frontier.stats()
+            final = await self.frontier.close(completed)
             yield CrawlerEvent("scan_completed", {
-                "total_pages_crawled": len(self.visited_urls),
-                "total_pages_discovered": len(self.discovered_urls)
+                "total_pages_crawled": stats["visited"],
+                "total_pages_discovered": stats["discovered"],
+                "dedup": {
+                    **self.dedup_stats,
+                    "canonicalized": self.canonicalizer.stats(),
+                    "memory": stats.get("memory", {}),
+                },
+                "scope": self.scope.stats() if self.scope else {},
+                "frontier": {
+                    "strategy": config.frontier_strategy,
+                    "time_budget_exhausted": self.time_budget_exhausted,
+                    **(self.scorer.stats() if self.scorer else {}),
+                },
+                "templates": self.sampler.stats() if self.sampler else {},
+                "near_duplicates": self.neardup.stats() if self.neardup else {},
+                "incremental": dict(self.incremental_stats),
+                "auth": self.auth.stats() if self.auth else {},
+                "sitemaps": self.sitemap_stats,
+                "rate_limits": self.rate_limiter.stats() if self.rate_limiter else {},
+                "final": final,
+                # Set when the scan was aborted; the exception follows this event.
+                "error": str(failure) if failure else None
             })
 
+    async def _supervise(self, events: asyncio.Queue, work):
+        # A background task of start() that dies would leave the frontier
+        # undrained and the scan waiting forever; hand the error to the consumer instead.
+        try:
+            await work
+        except Exception as e:
+            logger.error("Crawler task failed", error=str(e))
+            await events.put(e)
+
+    async def _worker(self, events: asyncio.Queue, config: CrawlerConfig):
+        while True:
+            entry = await self.frontier.get()
+            # Entries are left in flight when the worker is cancelled so an
+            # interrupted scan can requeue them on resume.
+            try:
+                handed_over = await self._visit(entry, events, config)
+            except Exception as e:
+                logger.error("Error visiting frontier entry", url=entry.url, error=str(e))
+                handed_over = False
+            if not handed_over:
+                await self.frontier.task_done(entry)
+
+    async def _visit(self, entry: FrontierEntry, events: asyncio.Queue, config: CrawlerConfig) -> bool:
+        """Crawls one frontier entry. Returns True once the page has been handed to the consumer."""
+        if await self._is_duplicate(entry.url_hash) or entry.depth > config.max_depth:
+            return False
+        if self.deadline and time.monotonic() >= self.deadline:
+            # Out of time: drain the frontier without crawling so the scan ends.
+            self.time_budget_exhausted = True
+            return False
+        representative = self.sampler.claim(entry.url) if self.sampler else None
+        if representative:
+            # Its template already has enough sampled pages.
+            await events.put((CrawlerEvent("page_represented", {"url": entry.url, "represented_by": representative}), None))
+            return False
+        # Pages in flight count against the budget so concurrent
+        # workers never overshoot max_pages.
+        if not await self.frontier.reserve(config.max_pages):
+            if self.sampler:
+                self.sampler.release(entry.url)
+            return False
+        try:
+            return await self._crawl(entry, events, config)
+        except Exception as e:
+            # Anything short of handing the page over gives the reservation back.
+            await self.frontier.release()
+            if self.sampler:
+                self.sampler.release(entry.url)
+            logger.error("Error processing page", url=entry.url, error=str(e))
+            return False
+
+    async def _crawl(self, entry: FrontierEntry, events: asyncio.Queue, config: CrawlerConfig) -> bool:
+        await events.put((CrawlerEvent("page_discovered", {"url": entry.url}), None))
+        await self.scope.wait_turn()
+        await self.rate_limiter.acquire(entry.url)
+        started = time.monotonic()
+        try:
+            page_data, new_links = await self._process_url(entry.url, entry.depth, entry.parent_url, config)
+        except Exception:
+            await self.rate_limiter.feedback(entry.url, 0, time.monotonic() - started)
+            raise
+        await self.rate_limiter.feedback(entry.url, page_data.http_status, time.monotonic() - started,
+                                         page_data.metadata.get("retry_after"))
+        if self.sampler:
+            page_data.metadata["url_template"] = self.sampler.observe(page_data)
+        
+        # Add new links to frontier
+        offered, bumps = [], {}
+        for link in new_links:
+            if not self._should_crawl_url(link, config.target_url, config):
+                continue
+            url_hash = self.canonicalizer.hash(link, count=True)
+            priority = 0.0
+            if self.scorer:
+                priority, bump = self.scorer.score(link, url_hash, entry.depth + 1)
+                if bump:
+                    bumps[url_hash] = bumps.get(url_hash, 0.0) + bump
+            offered.append(FrontierEntry(link, url_hash, entry.depth + 1, page_data.url, priority))
+        added = await self.frontier.offer(offered)
+        if bumps:
+            await self.frontier.bump(bumps)
+        self.dedup_stats["links_offered"] += len(offered)
+        self.dedup_stats["duplicate_hits"] += len(offered) - added
+        
+        await events.put((CrawlerEvent("page_crawled", {
+            "url": page_data.url,
+            "depth": page_data.depth,
+            "title": page_data.title,
+            "http_status": page_data.http_status,
+            "page_data": page_data
+        }), entry))
+        return True
+
+    async def _seed_from_sitemaps(self, config: CrawlerConfig):
+        client = self.http.client if self.http else httpx.AsyncClient(
+            headers={"User-Agent": config.user_agent}, follow_redirects=True, timeout=config.page_timeout / 1000)
+        reader = SitemapReader(client, max_urls=config.sitemap_max_urls)
+        try:
+            seeded = await seed_frontier(self.frontier, reader, sitemap_urls_for(config, self.scope),
+                                         self.scope, self.canonicalizer, sitemap_priority(self.scorer, self.baseline))
+        finally:
+            if self.http is None:
+                await client.aclose()
+        self.sitemap_stats = {**reader.counts, "seeded": seeded}
+        logger.info("Seeded frontier from sitemaps", target_url=config.target_url, **self.sitemap_stats)
+
+    async def _close_when_drained(self, events: asyncio.Queue):
+        # Crawled entries are only marked done after their event has been
+        # consumed, so the sentinel always arrives after the last page.
+        await self.frontier.join()
+        await events.put(None)
+
     async def _setup_browser(self, config: CrawlerConfig) -> Tuple[Browser, BrowserContext]:
         browser = await self.playwright.chromium.launch(headless=True)
-        context = await browser.new_context(
+        context = await self._new_context(browser, config)
+        return browser, context
+
+    async def _new_context(self, browser: Browser, config: CrawlerConfig) -> BrowserContext:
+        return await browser.new_context(
             viewport={'width': config.viewport_width, 'height': config.viewport_height},
             user_agent=config.user_agent,
             extra_http_headers=config.extra_headers
         )
-        return browser, context
 
-    async def _process_url(self, url: str, depth: int, parent_url: str | None, config: CrawlerConfig) -> Tuple[PageData, List[str]]:
-        page = await self.context.new_page()
-        network_requests = []
-        console_logs = []
+    async def _open_browser(self, config: CrawlerConfig):
+        async with self._browser_lock:
+            if self.tabs is not None:
+                return
+            if self.browser_pool:
+                # Warm browser from the worker's pool; only the context is per job.
+                self._lease = await self.browser_pool.acquire()
+                self.browser = self._lease.browser
+                self.context = await self._new_context(self.browser, config)
+            else:
+                self.playwright = await async_playwright().start()
+                self.browser, self.context = await self._setup_browser(config)
+            interception = InterceptionProfile(config.interception_profile, config.target_url)
+            if interception.active:
+                await interception.install(self.context)
+            self.readiness = ReadinessEngine(config)
+            await self.readiness.install(self.context)
+            if self.auth and self.auth.state is not None:
+                # Opened after the login (hybrid escalation); a login in progress applies it itself.
+                await self.auth.apply(self.context)
+            self.tabs = TabPool(
+                self.context,
+                size=config.concurrent_pages,
+                max_uses=config.tab_max_uses,
+                keep_storage=config.tab_keep_storage,
+                interception=interception if interception.active else None,
+                capture_network=config.capture_network,
+                capture_console=config.capture_console,
+                body_max_bytes=config.response_body_max_bytes if config.capture_response_bodies else 0
+            )
+
+    async def _authenticate(self, config: CrawlerConfig):
+        async def open_context():
+            # A form login needs Chromium even in http mode.
+            await self._open_browser(config)
+            return self.context
+
+        await self.auth.bootstrap(open_context)
+        if self.context:
+            await self.auth.apply(self.context)
+        if self.http:
+            self.auth.apply_to_client(self.http.client)
+
+    async def _close_browser(self):
+        if self.tabs:
+            await self.tabs.close()
+            self.tabs = None
         
-        # Setup listeners
-        page.on("request", lambda r: network_requests.append({"url": r.url, "method": r.method}))
-        page.on("response", lambda r: network_requests[-1].update({"status": r.status}) if network_requests else None)
-        page.on("console", lambda msg: console_logs.append({"type": msg.type, "text": msg.text}))
+        if self._lease:
+            try:
+                if self.context:
+                    await self.context.close()
+            except Exception as e:
+                logger.error("Failed to close browser context", error=str(e))
+            finally:
+                await self.browser_pool.release(self._lease)
+                self._lease = None
+        else:
+            if self.context:
+                await self.context.close()
+            if self.browser:
+                await self.browser.close()
+            if self.playwright:
+                await self.playwright.stop()
+
+    async def _process_url(self, url: str, depth: int, parent_url: str | None, config: CrawlerConfig) -> Tuple[PageData, List[str]]:
+        url_hash = self._hash_url(url)
+        previous = self.baseline.get(url_hash)
+        if previous and await self.http.not_modified(url, previous):
+            self.incremental_stats["not_modified"] += 1
+            page_data = not_modified_page(url, url_hash, depth, parent_url, previous)
+            return page_data, page_data.links_found
+
+        return await self._fetch_url(url, url_hash, depth, parent_url, config)
+
+    def _annotate(self, page_data: PageData):
+        """
+        Marks a fetched page unchanged since the baseline or a near-duplicate
+        of one already crawled, the pages ScanPipeline skips detection on.
+        Runs before the live detectors so they are not wasted on them.
+        """
+        if page_data.dom_snapshot:
+            page_data.metadata["content_hash"] = content_hash(page_data.dom_snapshot)
+        if self.baseline:
+            previous = self.baseline.get(page_data.url_hash)
+            if previous is None:
+                status = "new"
+            elif (page_data.metadata.get("content_hash") is not None
+                  and page_data.metadata["content_hash"] == previous.get("content_hash")
+                  and page_data.http_status == previous.get("http_status")):
+                status = "unchanged"
+            else:
+                status = "changed"
+            self.incremental_stats[status] += 1
+            page_data.metadata["incremental"] = {"status": status}
+            if status == "unchanged":
+                page_data.metadata["incremental"]["previous_page_id"] = previous["page_id"]
+        if self.neardup and page_data.dom_snapshot:
+            fingerprint = simhash(dom_index(page_data).text)
+            if fingerprint is not None:
+                page_data.metadata["simhash"] = f"{fingerprint:016x}"
+                canonical = self.neardup.check(page_data.url, fingerprint)
+                if canonical:
+                    page_data.metadata["near_duplicate_of"] = canonical
+
+    async def _fetch_url(self, url: str, url_hash: str, depth: int, parent_url: str | None, config: CrawlerConfig) -> Tuple[PageData, List[str]]:
+        if config.fetch_mode == "browser":
+            return await self._render_url(url, depth, parent_url, config)
+
+        page_data, needs_js = await self.http.fetch(url, url_hash, depth, parent_url)
+        if needs_js is None or config.fetch_mode == "http":
+            page_data.metadata["fetch"] = {"mode": "http", "needs_js": needs_js}
+            self._annotate(page_data)
+            return page_data, page_data.links_found
+
+        # Chromium is only started once some page actually needs it.
+        await self._open_browser(config)
+        page_data, links = await self._render_url(url, depth, parent_url, config)
+        page_data.metadata["fetch"] = {"mode": "browser", "escalated": needs_js}
+        return page_data, links
+
+    async def _render_url(self, url: str, depth: int, parent_url: str | None, config: CrawlerConfig) -> Tuple[PageData, List[str]]:
+        tab = await self.tabs.acquire()
+        page = tab.page
+        network_requests = tab.capture.network_requests
+        console_logs = tab.capture.console_logs
         
         try:
-            response = await page.goto(url, wait_until="networkidle", timeout=config.page_timeout)
-            await page.wait_for_timeout(config.wait_after_load)
+            generation = self.auth.generation if self.auth else 0
+            response, readiness = await self.readiness.navigate(page, url, tab.capture)
+            if self.auth and self.auth.session_lost(url, page.url, response.status if response else 0):
+                if await self.auth.reauthenticate(self.context, generation):
+                    response, readiness = await self.readiness.navigate(page, url, tab.capture)
             
             # Extract data
-            dom = await page.content()
-            title = await page.title()
+            bundle = await self._extract_page_bundle(page, config)
             status = response.status if response else 0
-            
-            # Auth handler bypass for now
-            
-            dom_structure = await self._extract_dom_structure(page)
-            links = await self._extract_links(page)
-            forms = await self._extract_forms(page)
-            performance = await self._capture_performance_metrics(page)
+            links = bundle["links"]
             
             screenshot_bytes = None
             if config.capture_screenshots:
                 screenshot_bytes = await page.screenshot(full_page=True)
+            await tab.capture.collect_bodies(self.BODY_READ_TIMEOUT)
                 
             page_data = PageData(
                 url=url,
                 url_hash=self._hash_url(url),
-                title=title,
+                title=bundle["title"],
                 http_status=status,
                 depth=depth,
                 parent_url=parent_url,
-                dom_snapshot=dom,
-                dom_structure=dom_structure,
+                dom_snapshot=bundle["html"],
+                dom_structure=bundle["dom_structure"],
                 screenshot_bytes=screenshot_bytes,
                 console_logs=console_logs,
                 network_requests=network_requests,
-                performance_metrics=performance,
+                performance_metrics=bundle["performance"],
                 links_found=links,
-                forms_found=forms,
+                forms_found=bundle["forms"],
                 interactive_elements=[],
-                metadata={},
+                response_bodies=tab.capture.response_bodies,
+                metadata={
+                    "readiness": readiness,
+                    **validators(response.headers if response else {}),
+                    **throttle_hint(status, response.headers if response else {}),
+                },
                 crawled_at=datetime.utcnow()
             )
+            self._annotate(page_data)
+            # ScanPipeline runs no detectors on these; their findings carry over from the original.
+            skipped = "near_duplicate_of" in page_data.metadata or "previous_page_id" in page_data.metadata.get("incremental", {})
+            if self.live_detection and not skipped:
+                page_data.metadata["live_detection"] = await self.live_detection(page_data, page)
             
             return page_data, links
             
         finally:
-            await page.close()
+            await self.tabs.release(tab)
 
-    async def _extract_dom_structure(self, page: Page) -> Dict[str, Any]:
-        js_code = """
-        () => {
-            const getTexts = (selector) => Array.from(document.querySelectorAll(selector)).map(e => e.innerText.trim());
-            const getAttrs = (selector, attr) => Array.from(document.querySelectorAll(selector)).map(e => e.getAttribute(attr));
-            
-            return {
-                "headings": getTexts('h1, h2, h3, h4, h5, h6').slice(0, 50),
-                "buttons": getTexts('button').slice(0, 50),
-                "images": getAttrs('img', 'src').slice(0, 50),
-                "inputs": getAttrs('input', 'type').reduce((acc, type) => {
-                    acc[type] = (acc[type] || 0) + 1;
-                    return acc;
-                }, {}),
-                "total_elements": document.querySelectorAll('*').length,
-                "visible_text_length": document.body.innerText.length,
-                "has_form": document.querySelectorAll('form').length > 0,
-                "has_table": document.querySelectorAll('table').length > 0,
-                "has_nav": document.querySelectorAll('nav').length > 0
-            };
-        }
+    async def _extract_page_bundle(self, page: Page, config: CrawlerConfig) -> Dict[str, Any]:
         """
-        return await page.evaluate(js_code)
-
-    async def _extract_links(self, page: Page) -> List[str]:
-        links = await page.evaluate("Array.from(document.querySelectorAll('a')).map(a => a.href)")
-        return list(set([l for l in links if l.startswith('http')]))
-
-    async def _extract_forms(self, page: Page) -> List[Dict[str, Any]]:
-        js_code = """
-        () => {
-            return Array.from(document.querySelectorAll('form')).map(f => {
-                const inputs = Array.from(f.querySelectorAll('input, select, textarea')).map(i => {
-                    return {
-                        name: i.name || '',
-                        type: i.type || i.tagName.toLowerCase(),
-                        required: i.required
-                    };
-                });
-                return {
-                    id: f.id || '',
-                    action: f.action || '',
-                    method: f.method || 'get',
-                    inputs: inputs
-                };
-            });
-        }
+        Everything PageData needs from the live DOM in one evaluate call,
+        walking the element tree a single time.
         """
-        return await page.evaluate(js_code)
-
-    async def _capture_performance_metrics(self, page: Page) -> Dict[str, Any]:
         js_code = """
-        () => {
-            const timing = window.performance.timing;
+        (opts) => {
+            const headings = [], buttons = [], images = [], inputTypes = [], links = [];
+            const forms = [], formIndex = new Map();
+            let hasTable = false, hasNav = false;
+            
+            const all = document.getElementsByTagName('*');
+            for (let i = 0; i < all.length; i++) {
+                const el = all[i];
+                switch (el.tagName) {
+                    case 'H1': case 'H2': case 'H3': case 'H4': case 'H5': case 'H6':
+                        if (headings.length < 50) headings.push(el.innerText.trim());
+                        break;
+                    case 'BUTTON':
+                        if (buttons.length < 50) buttons.push(el.innerText.trim());
+                        break;
+                    case 'IMG':
+                        if (images.length < 50) images.push(el.getAttribute('src'));
+                        break;
+                    case 'A':
+                        links.push(el.href);
+                        break;
+                    case 'FORM': {
+                        const record = {
+                            id: el.id || '',
+                            action: el.action || '',
+                            method: el.method || 'get',
+                            inputs: []
+                        };
+                        formIndex.set(el, record);
+                        forms.push(record);
+                        break;
+                    }
+                    case 'TABLE':
+                        hasTable = true;
+                        break;
+                    case 'NAV':
+                        hasNav = true;
+                        break;
+                }
+                if (el.tagName === 'INPUT' || el.tagName === 'SELECT' || el.tagName === 'TEXTAREA') {
+                    if (el.tagName === 'INPUT') inputTypes.push(el.getAttribute('type'));
+                    const owner = el.closest('form');
+                    if (owner && formIndex.has(owner)) {
+                        formIndex.get(owner).inputs.push({
+                            name: el.name || '',
+                            type: el.type || el.tagName.toLowerCase(),
+                            required: el.required
+                        });
+                    }
+                }
+            }
+            
+            let performance = {};
+            try {
+                const timing = window.performance.timing;
+                performance = {
+                    load_time: timing.loadEventEnd - timing.navigationStart,
+                    dom_ready: timing.domContentLoadedEventEnd - timing.navigationStart,
+                    ttfb: timing.responseStart - timing.navigationStart,
+                };
+            } catch (e) {}
+            
+            let html = '';
+            if (opts.captureDom) {
+                if (document.doctype) html = new XMLSerializer().serializeToString(document.doctype);
+                if (document.documentElement) html += document.documentElement.outerHTML;
+            }
+            
             return {
-                load_time: timing.loadEventEnd - timing.navigationStart,
-                dom_ready: timing.domContentLoadedEventEnd - timing.navigationStart,
-                ttfb: timing.responseStart - timing.navigationStart,
+                title: document.title,
+                html: html,
+                dom_structure: {
+                    "headings": headings,
+                    "buttons": buttons,
+                    "images": images,
+                    "inputs": inputTypes.reduce((acc, type) => {
+                        acc[type] = (acc[type] || 0) + 1;
+                        return acc;
+                    }, {}),
+                    "total_elements": all.length,
+                    "visible_text_length": document.body ? document.body.innerText.length : 0,
+                    "has_form": forms.length > 0,
+                    "has_table": hasTable,
+                    "has_nav": hasNav
+                },
+                links: links,
+                forms: forms,
+                performance: performance
             };
         }
         """
-        try:
-            return await page.evaluate(js_code)
-        except Exception:
-            return {}
+        bundle = await page.evaluate(js_code, {"captureDom": config.capture_dom})
+        bundle["links"] = list(set([l for l in bundle["links"] if l.startswith('http')]))
+        return bundle
 
     def _hash_url(self, url: str) -> str:
-        parsed = urlparse(url)
-        normalized = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-        if parsed.query:
-            normalized += f"?{parsed.query}"
-        normalized = normalized.rstrip("/")
-        return hashlib.sha256(normalized.encode()).hexdigest()
+        return self.canonicalizer.hash(url)
 
-    def _is_duplicate(self, url_hash: str) -> bool:
-        return url_hash in self.visited_urls
+    async def _is_duplicate(self, url_hash: str) -> bool:
+        return await self.frontier.is_visited(url_hash)
 
     def _should_crawl_url(self, url: str, base_url: str, config: CrawlerConfig) -> bool:
+        # Same site, include/exclude patterns and robots.txt, all prepared once in start().
         try:
-            parsed_url = urlparse(url)
-            parsed_base = urlparse(base_url)
-            # Only stay on same domain
-            if parsed_url.netloc != parsed_base.netloc:
-                return False
-            return True
-        except:
+            return self.scope.allows(url)
+        except ValueError:
             return False
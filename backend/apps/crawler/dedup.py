@@ -0,0 +1,189 @@
+import math
+import sys
+from array import array
+from typing import Iterable, List
+
+class ExactHashSet:
+    """The plain set of hex digests: exact, about 130 bytes per URL."""
+
+    name = "exact"
+
+    def __init__(self):
+        self._items = set()
+
+    def add(self, url_hash: str) -> bool:
+        """Adds url_hash and returns True if it was not present."""
+        if url_hash in self._items:
+            return False
+        self._items.add(url_hash)
+        return True
+
+    def update(self, url_hashes: Iterable[str]):
+        self._items.update(url_hashes)
+
+    def __contains__(self, url_hash: str) -> bool:
+        return url_hash in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def memory_bytes(self) -> int:
+        # All entries are 64-character str objects of the same size.
+        item_size = sys.getsizeof("0" * 64) if self._items else 0
+        return sys.getsizeof(self._items) + item_size * len(self._items)
+
+class CompactHashSet:
+    """
+    Open-addressing table of the first 64 bits of each SHA-256 digest in an
+    array('Q'): 8 bytes per slot at a load factor of at most 1/2. Two
+    different URLs collide with probability ~n^2 / 2^65, i.e. never at crawl
+    sizes, so lookups are exact in practice.
+    """
+
+    name = "compact"
+    EMPTY = 0
+    MAX_LOAD = 0.5
+
+    def __init__(self, capacity: int = 1024):
+        size = 1 << max(4, math.ceil(math.log2(capacity / self.MAX_LOAD)))
+        self._slots = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+
+    def _key(self, url_hash: str) -> int:
+        # Zero marks an empty slot, so fold the one digest prefix that maps to it.
+        return int(url_hash[:16], 16) or 1
+
+    def _find(self, key: int) -> int:
+        slots, mask = self._slots, self._mask
+        i = key & mask
+        while slots[i] != self.EMPTY and slots[i] != key:
+            i = (i + 1) & mask
+        return i
+
+    def add(self, url_hash: str) -> bool:
+        key = self._key(url_hash)
+        i = self._find(key)
+        if self._slots[i] == key:
+            return False
+        self._slots[i] = key
+        self._count += 1
+        if self._count > len(self._slots) * self.MAX_LOAD:
+            self._grow()
+        return True
+
+    def update(self, url_hashes: Iterable[str]):
+        for url_hash in url_hashes:
+            self.add(url_hash)
+
+    def _grow(self):
+        old = self._slots
+        self._slots = array("Q", bytes(8 * len(old) * 2))
+        self._mask = len(self._slots) - 1
+        for key in old:
+            if key != self.EMPTY:
+                self._slots[self._find(key)] = key
+
+    def __contains__(self, url_hash: str) -> bool:
+        key = self._key(url_hash)
+        return self._slots[self._find(key)] == key
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._slots)
+
+class _BloomSlice:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.hash_count = max(1, math.ceil(math.log2(1 / error_rate)))
+        # Optimal bit count for the capacity, rounded up to whole bytes.
+        bits = math.ceil(capacity * abs(math.log(error_rate)) / (math.log(2) ** 2))
+        self.bit_count = max(8, bits + (-bits % 8))
+        self.bits = bytearray(self.bit_count // 8)
+        self.count = 0
+
+    def positions(self, h1: int, h2: int) -> List[int]:
+        return [(h1 + i * h2) % self.bit_count for i in range(self.hash_count)]
+
+    def contains(self, positions: List[int]) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def set(self, positions: List[int]):
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+class ScalableBloomFilter:
+    """
+    Scalable Bloom filter (Almeida et al.): when a slice fills up a new one
+    is added with twice the capacity and a tighter error rate, so the
+    overall false-positive rate stays below error_rate however many URLs
+    arrive. A false positive makes a never-seen URL look seen, i.e. the page
+    is skipped; there are no false negatives.
+
+    The input is already a SHA-256 digest, so its bits serve directly as the
+    two base hashes for double hashing.
+    """
+
+    name = "bloom"
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, error_rate: float = 0.001, initial_capacity: int = 65536):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self._slices: List[_BloomSlice] = []
+        self._count = 0
+        self._add_slice()
+
+    def _add_slice(self):
+        i = len(self._slices)
+        # Slice error rates form a geometric series summing to error_rate.
+        slice_error = self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING ** i
+        self._slices.append(_BloomSlice(self.initial_capacity * self.GROWTH ** i, slice_error))
+
+    def _hashes(self, url_hash: str):
+        return int(url_hash[:16], 16), int(url_hash[16:32], 16) | 1
+
+    def add(self, url_hash: str) -> bool:
+        h1, h2 = self._hashes(url_hash)
+        for s in self._slices:
+            if s.contains(s.positions(h1, h2)):
+                return False
+        current = self._slices[-1]
+        if current.count >= current.capacity:
+            self._add_slice()
+            current = self._slices[-1]
+        current.set(current.positions(h1, h2))
+        self._count += 1
+        return True
+
+    def update(self, url_hashes: Iterable[str]):
+        for url_hash in url_hashes:
+            self.add(url_hash)
+
+    def __contains__(self, url_hash: str) -> bool:
+        h1, h2 = self._hashes(url_hash)
+        return any(s.contains(s.positions(h1, h2)) for s in self._slices)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory_bytes(self) -> int:
+        return sum(sys.getsizeof(s.bits) for s in self._slices)
+
+DEDUP_BACKENDS = ("exact", "compact", "bloom")
+
+def make_hash_set(backend: str = "exact", error_rate: float = 0.001):
+    if backend == "exact":
+        return ExactHashSet()
+    if backend == "compact":
+        return CompactHashSet()
+    if backend == "bloom":
+        return ScalableBloomFilter(error_rate)
+    raise ValueError(f"Unknown dedup backend '{backend}', expected one of {DEDUP_BACKENDS}")
@@ -0,0 +1,438 @@
+import asyncio
+import itertools
+import json
+import uuid
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from reqon_utils.logger import setup_logger
+from apps.crawler.dedup import make_hash_set
+
+logger = setup_logger("reqon-crawler")
+
+# Extends a lease only while the caller still owns it.
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+@dataclass
+class FrontierEntry:
+    url: str
+    url_hash: str
+    depth: int = 0
+    parent_url: Optional[str] = None
+    priority: float = 0.0  # higher is crawled sooner; all 0.0 gives FIFO order
+    lastmod: Optional[str] = None  # sitemap <lastmod>, for entries seeded from sitemaps
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "FrontierEntry":
+        if isinstance(raw, bytes):
+            raw = raw.decode()
+        return cls(**json.loads(raw))
+
+class MemoryFrontier:
+    """
+    Process-local frontier. Mirrors the asyncio.Queue contract
+    (get / task_done / join) and owns the visited and discovered sets,
+    which use the dedup backend from apps.crawler.dedup ("exact",
+    "compact" or "bloom").
+
+    Entries come out highest priority first, FIFO among equals. bump()
+    pushes a better-keyed copy and get() discards the stale one.
+    """
+
+    def __init__(self, dedup_backend: str = "exact", dedup_error_rate: float = 0.001):
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._pending: Dict[str, Tuple[Tuple[float, int], FrontierEntry]] = {}
+        self._in_flight = 0
+        self.visited_urls = make_hash_set(dedup_backend, dedup_error_rate)
+        self.discovered_urls = make_hash_set(dedup_backend, dedup_error_rate)
+
+    async def bootstrap(self, seed: FrontierEntry, state: Dict[str, Any]):
+        await self.offer([seed])
+
+    async def resume(self) -> bool:
+        return False
+
+    async def offer(self, entries: Iterable[FrontierEntry]) -> int:
+        """Enqueues entries whose hash has not been discovered yet."""
+        added = 0
+        for entry in entries:
+            if not self.discovered_urls.add(entry.url_hash):
+                continue
+            self._put(entry, (-entry.priority, next(self._seq)))
+            added += 1
+        return added
+
+    async def bump(self, deltas: Dict[str, float]):
+        """Raises the priority of entries still waiting in the frontier."""
+        for url_hash, delta in deltas.items():
+            pending = self._pending.get(url_hash)
+            if pending and delta > 0:
+                (key, seq), entry = pending
+                self._put(entry, (key - delta, seq))
+                # The superseded copy no longer counts as unfinished work.
+                self._queue.task_done()
+
+    def _put(self, entry: FrontierEntry, key: Tuple[float, int]):
+        self._pending[entry.url_hash] = (key, entry)
+        self._queue.put_nowait((key, entry))
+
+    async def get(self) -> FrontierEntry:
+        while True:
+            key, entry = await self._queue.get()
+            pending = self._pending.get(entry.url_hash)
+            if pending and pending[0] == key:
+                del self._pending[entry.url_hash]
+                return entry
+            # Superseded by a bump; its live copy is elsewhere in the queue.
+
+    async def task_done(self, entry: FrontierEntry):
+        self._queue.task_done()
+
+    async def join(self):
+        await self._queue.join()
+
+    async def reserve(self, limit: int) -> bool:
+        """Claims one page of the max_pages budget for a page about to be crawled."""
+        if len(self.visited_urls) + self._in_flight >= limit:
+            return False
+        self._in_flight += 1
+        return True
+
+    async def release(self):
+        self._in_flight -= 1
+
+    async def is_visited(self, url_hash: str) -> bool:
+        return url_hash in self.visited_urls
+
+    async def mark_visited(self, url_hash: str):
+        self.visited_urls.add(url_hash)
+        self._in_flight -= 1
+
+    async def restore_visited(self, url_hashes: Iterable[str]):
+        self.visited_urls.update(url_hashes)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "visited": len(self.visited_urls),
+            "discovered": len(self.discovered_urls),
+            "memory": {
+                "backend": self.visited_urls.name,
+                "visited_bytes": self.visited_urls.memory_bytes(),
+                "discovered_bytes": self.discovered_urls.memory_bytes(),
+            },
+        }
+
+    async def checkpoint(self, state: Dict[str, Any]):
+        pass
+
+    async def close(self, completed: bool) -> bool:
+        return True
+
+def shard_for(url_hash: str, shard_count: int) -> int:
+    """Stable shard assignment from the leading bits of the URL hash."""
+    return int(url_hash[:8], 16) % shard_count
+
+class RedisFrontier:
+    """
+    Frontier persisted in Redis so a redelivered crawl_job can resume.
+
+    Pending URL hashes live in a sorted set whose score carries the
+    priority (FIFO among equals, see _score) with the entries themselves in
+    a companion hash; entries being crawled are parked in an in-flight hash
+    until the consumer has persisted the page, and the visited/discovered
+    sets are Redis sets. Nothing proportional to the site size is kept in
+    process memory.
+
+    With shard_count > 1 several crawl_shard tasks share one job: each shard
+    pops from its own sorted set, discovered URLs are routed by shard_for,
+    and dedup, the page budget and the pending counter are global.
+    """
+
+    KEY_TTL = 7 * 24 * 3600  # seconds
+    POLL_INTERVAL = 0.5      # seconds, shard mode only
+    PRIORITY_STEPS = 1000    # priorities 0-100 in steps of 0.1
+    SEQ_SPAN = 10 ** 10      # insertion order within one priority step
+    LEASE_TTL = 60           # seconds a delivery's claim on its shard outlives a dead worker
+
+    def __init__(self, redis_client, job_id: str, shard_index: int = 0, shard_count: int = 1):
+        self.redis = redis_client
+        self.job_id = job_id
+        self.shard_index = shard_index
+        self.shard_count = max(1, shard_count)
+        self.prefix = f"crawl:{job_id}"
+        self.frontier_key = self._frontier_key(shard_index)
+        self.entries_key = self._entries_key(shard_index)
+        self.inflight_key = f"{self.prefix}:inflight:{shard_index}"
+        self.seq_key = f"{self.prefix}:seq"
+        self.pending_key = f"{self.prefix}:pending"
+        self.reserved_key = f"{self.prefix}:reserved"
+        self.shards_active_key = f"{self.prefix}:shards_active"
+        self.visited_key = f"{self.prefix}:visited"
+        self.discovered_key = f"{self.prefix}:discovered"
+        self.meta_key = f"{self.prefix}:meta"
+        self.abort_key = f"{self.prefix}:abort"
+        self.lease_key = f"{self.prefix}:lease:{shard_index}"
+
+        self._available = asyncio.Semaphore(0)
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+        self._lease_owner: Optional[str] = None
+        self._lease_renewer: Optional[asyncio.Task] = None
+
+    @property
+    def distributed(self) -> bool:
+        return self.shard_count > 1
+
+    def _frontier_key(self, shard_index: int) -> str:
+        return f"{self.prefix}:frontier:{shard_index}"
+
+    def _entries_key(self, shard_index: int) -> str:
+        return f"{self.prefix}:entries:{shard_index}"
+
+    def _steps(self, priority: float) -> int:
+        return max(0, min(self.PRIORITY_STEPS, round(priority * self.PRIORITY_STEPS / 100)))
+
+    def _score(self, priority: float, seq: int) -> int:
+        # Lowest score pops first; stays well inside a double's 53-bit mantissa.
+        return (self.PRIORITY_STEPS - self._steps(priority)) * self.SEQ_SPAN + seq
+
+    @property
+    def _keys(self) -> List[str]:
+        shard_keys = []
+        for i in range(self.shard_count):
+            shard_keys += [self._frontier_key(i), self._entries_key(i), f"{self.prefix}:inflight:{i}"]
+        return shard_keys + [self.seq_key, self.pending_key, self.reserved_key, self.shards_active_key,
+                             self.visited_key, self.discovered_key, self.meta_key, self.abort_key]
+
+    async def bootstrap(self, seed: FrontierEntry, state: Dict[str, Any]):
+        """
+        Starts a fresh job: clears partial frontier state, resets the page
+        budget to the already persisted pages and enqueues the seed.
+        """
+        # Visited hashes may have been restored from persisted pages.
+        await self.redis.delete(*[k for k in self._keys if k != self.visited_key])
+        await self.redis.set(self.reserved_key, await self.redis.scard(self.visited_key))
+        if self.distributed:
+            await self.redis.set(self.shards_active_key, self.shard_count)
+        await self.offer([seed])
+        await self.checkpoint(state)
+
+    async def has_checkpoint(self) -> bool:
+        return bool(await self.redis.exists(self.meta_key))
+
+    async def resume(self) -> bool:
+        """
+        Restores a previous checkpoint. Entries this shard had in flight
+        when its worker died are put back on the frontier and their budget
+        reservations returned. Returns False when there is nothing to resume.
+        """
+        if not await self.has_checkpoint():
+            return False
+
+        inflight = await self.redis.hgetall(self.inflight_key)
+        if inflight:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(self.entries_key, mapping=inflight)
+                pipe.zadd(self.frontier_key, {url_hash: 0 for url_hash in inflight})
+                pipe.delete(self.inflight_key)
+                pipe.decrby(self.reserved_key, len(inflight))
+                await pipe.execute()
+        # Entries popped by a worker that died before parking them in flight.
+        queued = await self.redis.hkeys(self.entries_key)
+        if queued:
+            await self.redis.zadd(self.frontier_key, {url_hash: 0 for url_hash in queued}, nx=True)
+
+        pending = await self.redis.zcard(self.frontier_key)
+        if not self.distributed:
+            self._unfinished = pending
+            self._available = asyncio.Semaphore(pending)
+            if pending:
+                self._finished.clear()
+        logger.info("Resuming crawl frontier", job_id=self.job_id, shard=self.shard_index,
+                    pending=pending, requeued=len(inflight))
+        return True
+
+    async def offer(self, entries: Iterable[FrontierEntry]) -> int:
+        entries = list(entries)
+        if not entries:
+            return 0
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for entry in entries:
+                pipe.sadd(self.discovered_key, entry.url_hash)
+            is_new = await pipe.execute()
+
+        new_entries = [e for e, added in zip(entries, is_new) if added]
+        if not new_entries:
+            return 0
+
+        last_seq = await self.redis.incrby(self.seq_key, len(new_entries))
+        first_seq = last_seq - len(new_entries) + 1
+        by_shard: Dict[int, Tuple[Dict[str, int], Dict[str, str]]] = {}
+        for i, entry in enumerate(new_entries):
+            scores, payloads = by_shard.setdefault(shard_for(entry.url_hash, self.shard_count), ({}, {}))
+            scores[entry.url_hash] = self._score(entry.priority, first_seq + i)
+            payloads[entry.url_hash] = entry.to_json()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            # Count pending before the entries become visible to other shards
+            pipe.incrby(self.pending_key, len(new_entries))
+            for shard, (scores, payloads) in by_shard.items():
+                pipe.hset(self._entries_key(shard), mapping=payloads)
+                pipe.zadd(self._frontier_key(shard), scores)
+            await pipe.execute()
+
+        if not self.distributed:
+            self._unfinished += len(new_entries)
+            self._finished.clear()
+            for _ in new_entries:
+                self._available.release()
+        return len(new_entries)
+
+    async def get(self) -> FrontierEntry:
+        if self.distributed:
+            while not (popped := await self.redis.zpopmin(self.frontier_key)):
+                await asyncio.sleep(self.POLL_INTERVAL)
+        else:
+            await self._available.acquire()
+            popped = await self.redis.zpopmin(self.frontier_key)
+        url_hash = popped[0][0]
+        raw = await self.redis.hget(self.entries_key, url_hash)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.inflight_key, url_hash, raw)
+            pipe.hdel(self.entries_key, url_hash)
+            await pipe.execute()
+        return FrontierEntry.from_json(raw)
+
+    async def bump(self, deltas: Dict[str, float]):
+        """Raises the priority of entries still waiting in the frontier (XX: never re-adds popped ones)."""
+        deltas = {h: d for h, d in deltas.items() if self._steps(d) > 0}
+        if not deltas:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for url_hash, delta in deltas.items():
+                key = self._frontier_key(shard_for(url_hash, self.shard_count))
+                pipe.zadd(key, {url_hash: -self._steps(delta) * self.SEQ_SPAN}, xx=True, incr=True)
+            await pipe.execute()
+
+    async def task_done(self, entry: FrontierEntry):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hdel(self.inflight_key, entry.url_hash)
+            pipe.decr(self.pending_key)
+            await pipe.execute()
+        if not self.distributed:
+            self._unfinished -= 1
+            if self._unfinished <= 0:
+                self._finished.set()
+
+    async def join(self):
+        if not self.distributed:
+            await self._finished.wait()
+            return
+        # Other shards may still be crawling pages that will feed this one.
+        while int(await self.redis.get(self.pending_key) or 0) > 0:
+            reason = await self.redis.get(self.abort_key)
+            if reason is not None:
+                # A failed shard leaves its entries pending for good.
+                raise RuntimeError(f"Scan aborted: {reason.decode() if isinstance(reason, bytes) else reason}")
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+    async def abort(self, reason: str):
+        """Fails the job for every participant: their join() raises instead of waiting on entries nobody will pop."""
+        # NX: the first failure's reason is the one reported.
+        await self.redis.set(self.abort_key, reason, ex=self.KEY_TTL, nx=True)
+
+    async def acquire_lease(self) -> bool:
+        """
+        Claims this shard of the job for the running delivery and keeps the
+        claim alive until release_lease(). Returns False while another
+        delivery holds it, e.g. a task the broker redelivered although its
+        first worker is still crawling; resuming then would requeue that
+        worker's in-flight entries under it.
+        """
+        owner = uuid.uuid4().hex
+        if not await self.redis.set(self.lease_key, owner, ex=self.LEASE_TTL, nx=True):
+            return False
+        self._lease_owner = owner
+        self._lease_renewer = asyncio.create_task(self._renew_lease())
+        return True
+
+    async def _renew_lease(self):
+        while True:
+            await asyncio.sleep(self.LEASE_TTL / 3)
+            if not await self.redis.eval(RENEW_LEASE_SCRIPT, 1, self.lease_key, self._lease_owner, self.LEASE_TTL):
+                logger.error("Lost crawl lease", job_id=self.job_id, shard=self.shard_index)
+                return
+
+    async def release_lease(self):
+        if self._lease_owner is None:
+            return
+        self._lease_renewer.cancel()
+        await self.redis.eval(RELEASE_LEASE_SCRIPT, 1, self.lease_key, self._lease_owner)
+        self._lease_owner = self._lease_renewer = None
+
+    async def reserve(self, limit: int) -> bool:
+        if await self.redis.incr(self.reserved_key) > limit:
+            await self.redis.decr(self.reserved_key)
+            return False
+        return True
+
+    async def release(self):
+        await self.redis.decr(self.reserved_key)
+
+    async def is_visited(self, url_hash: str) -> bool:
+        return bool(await self.redis.sismember(self.visited_key, url_hash))
+
+    async def mark_visited(self, url_hash: str):
+        await self.redis.sadd(self.visited_key, url_hash)
+
+    async def restore_visited(self, url_hashes: Iterable[str]):
+        url_hashes = list(url_hashes)
+        if url_hashes:
+            await self.redis.sadd(self.visited_key, *url_hashes)
+
+    async def stats(self) -> Dict[str, Any]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.scard(self.visited_key)
+            pipe.scard(self.discovered_key)
+            visited, discovered = await pipe.execute()
+        return {"visited": visited, "discovered": discovered}
+
+    async def checkpoint(self, state: Dict[str, Any]):
+        mapping = {k: json.dumps(v) for k, v in state.items()}
+        mapping["updated_at"] = datetime.utcnow().isoformat()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(self.meta_key, mapping=mapping)
+            for key in self._keys:
+                pipe.expire(key, self.KEY_TTL)
+            await pipe.execute()
+
+    async def close(self, completed: bool) -> bool:
+        """
+        Returns True when this was the last participant of the job. A
+        finished job has nothing to resume, so its keys are dropped; an
+        interrupted one keeps them (bounded by KEY_TTL) for redelivery.
+        """
+        if not completed:
+            return False
+        if self.distributed and await self.redis.decr(self.shards_active_key) > 0:
+            return False
+        await self.redis.delete(*self._keys)
+        return True
@@ -0,0 +1,245 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import httpx
+from bs4 import BeautifulSoup
+
+from apps.crawler.incremental import validators
+from apps.crawler.rate_limit import throttle_hint
+from reqon_types.models import CrawlerConfig, PageData
+
+class HttpFetcher:
+    """
+    Browserless fetch path for server-rendered pages. One pooled
+    httpx.AsyncClient per crawl; the HTML is parsed with BeautifulSoup into
+    the same PageData shape the browser extraction produces.
+
+    needs_browser() says when the fetched HTML is not the real page and the
+    crawler should escalate to Chromium: an empty body behind scripts, an
+    unfilled SPA mount point, or navigation that only exists in JavaScript.
+    In hybrid mode a request that fails outright (reset, TLS, timeout) also
+    escalates, since Chromium may still get through.
+    """
+
+    SPA_ROOT_IDS = frozenset({"root", "app", "__next", "__nuxt", "___gatsby", "svelte", "main-app"})
+    SPA_ROOT_ATTRS = ("ng-app", "data-ng-app")
+    MIN_BODY_TEXT = 50
+    HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+    def __init__(self, config: CrawlerConfig):
+        self.capture_dom = config.capture_dom
+        self.escalate_errors = config.fetch_mode == "hybrid"
+        headers = {"User-Agent": config.user_agent, **config.extra_headers}
+        cookies = httpx.Cookies()
+        for cookie in config.cookies:
+            if "name" in cookie and "value" in cookie:
+                cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+        self.client = httpx.AsyncClient(
+            headers=headers,
+            cookies=cookies,
+            follow_redirects=True,
+            timeout=config.page_timeout / 1000,
+            limits=httpx.Limits(max_connections=max(1, config.concurrent_pages) * 2,
+                                max_keepalive_connections=max(1, config.concurrent_pages)),
+        )
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def not_modified(self, url: str, previous: Dict[str, Any]) -> bool:
+        """Conditional GET against the validators stored by the previous scan; True on a 304."""
+        headers = {}
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+        if not headers:
+            return False
+        try:
+            response = await self.client.send(self.client.build_request("GET", url, headers=headers), stream=True)
+        except httpx.HTTPError:
+            return False
+        # The body of a changed page is not needed here; the normal fetch or render follows.
+        await response.aclose()
+        return response.status_code == 304
+
+    async def fetch(self, url: str, url_hash: str, depth: int, parent_url: str | None) -> Tuple[PageData, Optional[str]]:
+        """Fetches and parses url. Returns the PageData and, if the page needs JS, the reason why."""
+        started = time.monotonic()
+        try:
+            response = await self.client.send(self.client.build_request("GET", url), stream=True)
+            try:
+                ttfb = (time.monotonic() - started) * 1000
+                body = await response.aread()
+            finally:
+                await response.aclose()
+        except httpx.HTTPError as e:
+            if not self.escalate_errors:
+                raise
+            page_data = self._page_data(url, url_hash, depth, parent_url, 0, "", "", {}, [], [],
+                                        [{"url": url, "method": "GET", "status": 0, "error": str(e) or type(e).__name__}],
+                                        {"load_time": round((time.monotonic() - started) * 1000)})
+            return page_data, "http_error"
+        load_time = (time.monotonic() - started) * 1000
+
+        network_requests = [{
+            "url": url,
+            "method": "GET",
+            "status": response.status_code,
+            "headers": dict(response.headers),
+        }]
+        performance = {"ttfb": round(ttfb), "load_time": round(load_time)}
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+
+        if content_type and content_type not in self.HTML_TYPES:
+            # Nothing to render or follow; a browser would not do better.
+            page_data = self._page_data(url, url_hash, depth, parent_url, response.status_code, "", "", {}, [], [],
+                                        network_requests, performance)
+            page_data.metadata.update(validators(response.headers))
+            page_data.metadata.update(throttle_hint(response.status_code, response.headers))
+            return page_data, None
+
+        html = response.text if body else ""
+        soup = BeautifulSoup(html, "html.parser")
+        base_url = str(response.url)
+        base_tag = soup.find("base", href=True)
+        if base_tag:
+            base_url = urljoin(base_url, base_tag["href"])
+
+        title = soup.title.get_text(strip=True) if soup.title else ""
+        dom_structure, links, forms = self._extract(soup, base_url)
+        page_data = self._page_data(url, url_hash, depth, parent_url, response.status_code, title,
+                                    html if self.capture_dom else "", dom_structure, links, forms,
+                                    network_requests, performance)
+        page_data.metadata.update(validators(response.headers))
+        page_data.metadata.update(throttle_hint(response.status_code, response.headers))
+        return page_data, self.needs_browser(soup, dom_structure, links)
+
+    def needs_browser(self, soup: BeautifulSoup, dom_structure: Dict[str, Any], links: List[str]) -> Optional[str]:
+        has_scripts = soup.find("script") is not None
+        if not has_scripts:
+            return None
+
+        for el in soup.find_all(id=lambda v: v in self.SPA_ROOT_IDS):
+            if not el.find(True):
+                return "spa_root"
+        for attr in self.SPA_ROOT_ATTRS:
+            el = soup.find(attrs={attr: True})
+            if el is not None and dom_structure["visible_text_length"] < self.MIN_BODY_TEXT * 4:
+                return "spa_root"
+
+        if dom_structure["visible_text_length"] < self.MIN_BODY_TEXT:
+            return "empty_body"
+
+        if not links:
+            # Anchors without a usable href, or click handlers doing the navigation.
+            scripted = soup.find(lambda el: (el.name == "a" and (not el.get("href") or el["href"].startswith(("#", "javascript:"))))
+                                 or el.get("role") == "link"
+                                 or "location" in (el.get("onclick") or ""))
+            if scripted is not None:
+                return "script_links"
+        return None
+
+    def _extract(self, soup: BeautifulSoup, base_url: str) -> Tuple[Dict[str, Any], List[str], List[Dict[str, Any]]]:
+        """Mirrors AutonomousCrawler._extract_page_bundle in one pass over the parsed tree."""
+        headings, buttons, images, links, forms = [], [], [], [], []
+        input_types: Dict[Any, int] = {}
+        form_records: Dict[int, Dict[str, Any]] = {}
+        seen_links = set()
+        has_table = has_nav = False
+
+        elements = soup.find_all(True)
+        for el in elements:
+            tag = el.name
+            if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+                if len(headings) < 50:
+                    headings.append(el.get_text(" ", strip=True))
+            elif tag == "button":
+                if len(buttons) < 50:
+                    buttons.append(el.get_text(" ", strip=True))
+            elif tag == "img":
+                if len(images) < 50:
+                    images.append(el.get("src"))
+            elif tag == "a" and el.get("href"):
+                link = urljoin(base_url, el["href"])
+                if urlparse(link).scheme in ("http", "https") and link not in seen_links:
+                    seen_links.add(link)
+                    links.append(link)
+            elif tag == "form":
+                action = el.get("action")
+                record = {
+                    "id": el.get("id", ""),
+                    "action": urljoin(base_url, action) if action else base_url,
+                    "method": (el.get("method") or "get").lower(),
+                    "inputs": [],
+                }
+                form_records[id(el)] = record
+                forms.append(record)
+            elif tag == "table":
+                has_table = True
+            elif tag == "nav":
+                has_nav = True
+
+            if tag in ("input", "select", "textarea"):
+                if tag == "input":
+                    input_types[el.get("type")] = input_types.get(el.get("type"), 0) + 1
+                owner = el.find_parent("form")
+                if owner is not None and id(owner) in form_records:
+                    form_records[id(owner)]["inputs"].append({
+                        "name": el.get("name", ""),
+                        "type": self._input_type(el),
+                        "required": el.has_attr("required"),
+                    })
+
+        dom_structure = {
+            "headings": headings,
+            "buttons": buttons,
+            "images": images,
+            "inputs": input_types,
+            "total_elements": len(elements),
+            "visible_text_length": self._visible_text_length(soup),
+            "has_form": bool(forms),
+            "has_table": has_table,
+            "has_nav": has_nav,
+        }
+        return dom_structure, links, forms
+
+    def _input_type(self, el) -> str:
+        if el.name == "select":
+            return "select-multiple" if el.has_attr("multiple") else "select-one"
+        if el.name == "textarea":
+            return "textarea"
+        return (el.get("type") or "text").lower()
+
+    def _visible_text_length(self, soup: BeautifulSoup) -> int:
+        if soup.body is None:
+            return 0
+        text = " ".join(
+            s.strip() for s in soup.body.find_all(string=True)
+            if s.strip() and s.parent.name not in ("script", "style", "noscript", "template")
+        )
+        return len(text)
+
+    def _page_data(self, url: str, url_hash: str, depth: int, parent_url: str | None, status: int, title: str,
+                   html: str, dom_structure: Dict[str, Any], links: List[str], forms: List[Dict[str, Any]],
+                   network_requests: List[Dict[str, Any]], performance: Dict[str, Any]) -> PageData:
+        return PageData(
+            url=url,
+            url_hash=url_hash,
+            title=title,
+            http_status=status,
+            depth=depth,
+            parent_url=parent_url,
+            dom_snapshot=html,
+            dom_structure=dom_structure,
+            console_logs=[],
+            network_requests=network_requests,
+            performance_metrics=performance,
+            links_found=links,
+            forms_found=forms,
+            interactive_elements=[],
+            metadata={},
+            crawled_at=datetime.utcnow()
+        )
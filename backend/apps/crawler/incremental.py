@@ -0,0 +1,52 @@
+import hashlib
+import re
+from datetime import datetime
+from typing import Any, Dict, Mapping
+
+from apps.detector.dom_index import TAG_BLOCKS
+from reqon_types.models import PageData
+
+WHITESPACE = re.compile(r"\s+")
+BETWEEN_TAGS = re.compile(r">\s+<")
+
+def content_hash(html: str) -> str:
+    """
+    Hash of a rendered DOM with script/style blocks and insignificant
+    whitespace removed, so per-request nonces in inline scripts and
+    reformatting do not count as a change.
+    """
+    normalized = BETWEEN_TAGS.sub("><", WHITESPACE.sub(" ", TAG_BLOCKS.sub("", html))).strip()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+def validators(headers: Mapping[str, str]) -> Dict[str, str]:
+    """HTTP cache validators of a document response, for the next scan's conditional request."""
+    found = {}
+    for header, key in (("etag", "etag"), ("last-modified", "last_modified")):
+        value = headers.get(header)
+        if value:
+            found[key] = value
+    return found
+
+def not_modified_page(url: str, url_hash: str, depth: int, parent_url: str | None, previous: Dict[str, Any]) -> PageData:
+    """PageData for a page the server confirmed unchanged (304); everything comes from the previous scan."""
+    return PageData(
+        url=url,
+        url_hash=url_hash,
+        title=previous.get("title") or "",
+        http_status=previous.get("http_status") or 200,
+        depth=depth,
+        parent_url=parent_url,
+        dom_snapshot="",
+        dom_structure={},
+        console_logs=[],
+        network_requests=[],
+        performance_metrics={},
+        links_found=previous.get("links", []),
+        forms_found=[],
+        interactive_elements=[],
+        metadata={
+            **{k: previous[k] for k in ("etag", "last_modified", "content_hash") if previous.get(k)},
+            "incremental": {"status": "not_modified", "previous_page_id": previous["page_id"]},
+        },
+        crawled_at=datetime.utcnow()
+    )
@@ -0,0 +1,55 @@
+from urllib.parse import urlparse
+from playwright.async_api import BrowserContext, Route
+
+class InterceptionProfile:
+    """
+    Decides which subresources a crawl actually needs. Blocked requests are
+    aborted at the context's router but still recorded in network_requests
+    with a "blocked" marker so network-based detectors can see them.
+
+    Profiles:
+      full              - load everything (default)
+      no-media          - drop images, media and fonts
+      first-party-only  - drop requests outside the target's domain
+      html+js           - only documents, scripts and API calls
+    """
+
+    PROFILES = ("full", "no-media", "first-party-only", "html+js")
+    MEDIA_TYPES = frozenset({"image", "media", "font"})
+    HTML_JS_TYPES = frozenset({"document", "script", "xhr", "fetch", "websocket", "eventsource"})
+
+    def __init__(self, name: str, target_url: str):
+        if name not in self.PROFILES:
+            raise ValueError(f"Unknown interception profile '{name}', expected one of {self.PROFILES}")
+        self.name = name
+        host = (urlparse(target_url).hostname or "").lower()
+        self.first_party_domain = host[4:] if host.startswith("www.") else host
+
+    @property
+    def active(self) -> bool:
+        return self.name != "full"
+
+    def is_first_party(self, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        return host == self.first_party_domain or host.endswith("." + self.first_party_domain)
+
+    def blocks(self, resource_type: str, url: str) -> bool:
+        if self.name == "no-media":
+            return resource_type in self.MEDIA_TYPES
+        if self.name == "first-party-only":
+            # Never block the navigation itself, even after a cross-domain redirect.
+            return resource_type != "document" and not self.is_first_party(url)
+        if self.name == "html+js":
+            return resource_type not in self.HTML_JS_TYPES
+        return False
+
+    async def install(self, context: BrowserContext):
+        # Routing every request has a cost of its own, so "full" never installs a route.
+        await context.route("**/*", self._handle)
+
+    async def _handle(self, route: Route):
+        request = route.request
+        if self.blocks(request.resource_type, request.url):
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
@@ -0,0 +1,94 @@
+import hashlib
+import re
+import sys
+from array import array
+from typing import Dict, List, Optional
+
+import numpy as np
+
+WORDS = re.compile(r"\w+")
+
+def simhash(text: str, shingle_size: int = 4) -> Optional[int]:
+    """64-bit SimHash over word shingles, or None when there are too few words to mean anything."""
+    words = WORDS.findall(text.lower())
+    count = len(words) - shingle_size + 1
+    if len(words) < shingle_size * 2:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(" ".join(words[i:i + shingle_size]).encode(), digest_size=8).digest(), "big")
+         for i in range(count)),
+        dtype=np.uint64, count=count,
+    )
+    # Per-bit majority vote over all shingle hashes.
+    votes = np.unpackbits(hashes.view(np.uint8)).reshape(count, 64).sum(axis=0)
+    return int.from_bytes(np.packbits(votes * 2 > count).tobytes(), "big")
+
+class NearDuplicateIndex:
+    """
+    Banded SimHash index. Fingerprints within max_distance bits of each
+    other must agree exactly on at least one of max_distance + 1 bands
+    (pigeonhole), so a lookup is one dict probe per band plus a popcount per
+    candidate. Memory is bounded by capacity: past it, pages are still
+    checked against the index but no longer added.
+    """
+
+    def __init__(self, max_distance: int = 3, capacity: int = 200_000):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self.capacity = capacity
+        self._fingerprints = array("Q")
+        self._urls: List[str] = []
+        # One dict per band: band value -> id, or list of ids on collision.
+        self._buckets: List[Dict[int, object]] = [{} for _ in range(self.bands)]
+        self.duplicates = 0
+
+    def _band_values(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (i * self.band_bits)) & mask for i in range(self.bands)]
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        for bucket, value in zip(self._buckets, self._band_values(fingerprint)):
+            ids = bucket.get(value)
+            if ids is None:
+                continue
+            for i in ids if isinstance(ids, list) else (ids,):
+                if bin(self._fingerprints[i] ^ fingerprint).count("1") <= self.max_distance:
+                    return self._urls[i]
+        return None
+
+    def add(self, url: str, fingerprint: int):
+        if len(self._urls) >= self.capacity:
+            return
+        i = len(self._urls)
+        self._fingerprints.append(fingerprint)
+        self._urls.append(url)
+        for bucket, value in zip(self._buckets, self._band_values(fingerprint)):
+            ids = bucket.get(value)
+            if ids is None:
+                bucket[value] = i
+            elif isinstance(ids, list):
+                ids.append(i)
+            else:
+                bucket[value] = [ids, i]
+
+    def check(self, url: str, fingerprint: int) -> Optional[str]:
+        """Returns the canonical URL url duplicates, or indexes url as a new canonical page."""
+        canonical = self.find(fingerprint)
+        if canonical is not None:
+            self.duplicates += 1
+            return canonical
+        self.add(url, fingerprint)
+        return None
+
+    def memory_bytes(self) -> int:
+        return (sys.getsizeof(self._fingerprints) + sys.getsizeof(self._urls)
+                + sum(sys.getsizeof(u) for u in self._urls)
+                + sum(sys.getsizeof(b) for b in self._buckets))
+
+    def stats(self):
+        return {
+            "indexed": len(self._urls),
+            "near_duplicates": self.duplicates,
+            "memory_bytes": self.memory_bytes(),
+        }
@@ -0,0 +1,283 @@
+import json
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.future import select
+
+from reqon_config.settings import settings
+from reqon_types.models import CrawlerConfig, PageData, RawIssue
+from reqon_utils.logger import setup_logger
+from apps.api.models.core import Page, Issue, ScanJob
+from apps.crawler.rate_limit import HostRateLimiter
+from apps.detector.engine import DefectDetectionEngine, DetectorResult
+from apps.detector.static_pool import StaticDetectorPool
+from apps.knowledge.graph_service import KnowledgeGraphService
+
+logger = setup_logger("reqon-crawler")
+
+class ScanPipeline:
+    """
+    Analysis and persistence stage of a scan job. Consumes crawled pages:
+    stores them in PostgreSQL and Neo4j, runs the detectors and publishes
+    progress on the scan:{job_id} channel.
+    """
+
+    def __init__(self, job_id: str, config: Optional[CrawlerConfig] = None,
+                 static_pool: Optional[StaticDetectorPool] = None):
+        self.job_id = job_id
+        self.engine = create_async_engine(settings.DATABASE_URL, echo=False)
+        self.async_session = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.redis_client = aioredis.from_url(settings.REDIS_URL)
+        # Shared with the crawler so page loads and link checks draw on the same per-host budget.
+        self.rate_limiter = HostRateLimiter.from_config(config, self.redis_client) if config else None
+        if config:
+            self.detector_engine = DefectDetectionEngine(self.rate_limiter, config.detector_concurrency, config.detector_timeout,
+                                                         config.detector_processes, static_pool)
+        else:
+            self.detector_engine = DefectDetectionEngine()
+        self.kg_service = KnowledgeGraphService()
+        self.pubsub_channel = f"scan:{job_id}"
+
+        self.baseline: Dict[str, Dict[str, Any]] = {}
+        self.pages_handled = 0
+        self.stage_seconds = {"persist": 0.0, "detect": 0.0}
+        # Per detector: runs by outcome and total seconds.
+        self.detector_stats: Dict[str, Counter] = {}
+        self._started = time.monotonic()
+
+    async def open(self):
+        await self.kg_service.init_schema()
+
+    async def close(self):
+        await self.detector_engine.close()
+        await self.kg_service.close()
+        await self.redis_client.aclose() if hasattr(self.redis_client, 'aclose') else await self.redis_client.close()
+        await self.engine.dispose()
+
+    async def publish(self, msg_text: str, msg_type: str = "info"):
+        payload = json.dumps({
+            "time": datetime.utcnow().isoformat().split('T')[1][:8],
+            "msg": msg_text,
+            "type": msg_type
+        })
+        await self.redis_client.publish(self.pubsub_channel, payload)
+
+    async def load_persisted_hashes(self) -> List[str]:
+        """Pages already stored for this job, e.g. by a worker that died mid-scan."""
+        async with self.async_session() as db:
+            result = await db.execute(select(Page.url_hash).filter_by(scan_job_id=self.job_id))
+            return list(result.scalars().all())
+
+    async def load_org_id(self) -> Optional[str]:
+        async with self.async_session() as db:
+            result = await db.execute(select(ScanJob.org_id).filter_by(id=self.job_id))
+            org_id = result.scalars().first()
+            return str(org_id) if org_id else None
+
+    async def load_baseline(self, config: CrawlerConfig) -> Dict[str, Dict[str, Any]]:
+        """
+        Pages of the scan an incremental scan compares against, by url_hash:
+        the explicit baseline_scan_id, else the latest completed scan of the
+        same organization and target.
+        """
+        async with self.async_session() as db:
+            baseline_id: Optional[str] = config.baseline_scan_id
+            if baseline_id is None:
+                job = (await db.execute(select(ScanJob).filter_by(id=self.job_id))).scalars().first()
+                if job is None:
+                    return {}
+                result = await db.execute(
+                    select(ScanJob.id)
+                    .filter(ScanJob.org_id == job.org_id, ScanJob.target_url == job.target_url,
+                            ScanJob.status == "completed", ScanJob.id != job.id)
+                    .order_by(ScanJob.completed_at.desc())
+                    .limit(1)
+                )
+                baseline_id = result.scalars().first()
+                if baseline_id is None:
+                    return {}
+
+            result = await db.execute(
+                select(Page.id, Page.url_hash, Page.title, Page.http_status, Page.hygiene_score, Page.crawled_at,
+                       Page.metadata_json)
+                .filter_by(scan_job_id=baseline_id)
+            )
+            baseline = {}
+            for page_id, url_hash, title, http_status, hygiene_score, crawled_at, metadata in result.all():
+                metadata = metadata or {}
+                baseline[url_hash] = {
+                    "page_id": str(page_id),
+                    "title": title,
+                    "http_status": http_status,
+                    "hygiene_score": hygiene_score,
+                    "crawled_at": crawled_at.isoformat() if crawled_at else None,
+                    "etag": metadata.get("etag"),
+                    "last_modified": metadata.get("last_modified"),
+                    "content_hash": metadata.get("content_hash"),
+                    "links": metadata.get("links", []),
+                }
+            logger.info("Loaded incremental baseline", job_id=self.job_id, baseline_scan_id=str(baseline_id), pages=len(baseline))
+            self.baseline = baseline
+            return baseline
+
+    async def handle_page(self, page_data: PageData):
+        url = page_data.url
+        await self.publish(f"Discovered and inspected {url}")
+
+        # 1. Save Page to PostgreSQL
+        started = time.monotonic()
+        # Results of the live-page phase the crawler ran before releasing the tab.
+        live_results = [DetectorResult.from_dict(r) for r in page_data.metadata.pop("live_detection", [])]
+        previous_page_id = page_data.metadata.get("incremental", {}).get("previous_page_id")
+        previous = self.baseline.get(page_data.url_hash) if previous_page_id else None
+        async with self.async_session() as db:
+            db_page = Page(
+                scan_job_id=self.job_id,
+                url=page_data.url,
+                url_hash=page_data.url_hash,
+                title=page_data.title,
+                http_status=page_data.http_status,
+                depth=page_data.depth,
+                parent_url=page_data.parent_url,
+                performance_metrics=page_data.performance_metrics,
+                network_requests=page_data.network_requests,
+                hygiene_score=previous["hygiene_score"] if previous else None,
+                # Links are kept so the next incremental scan can follow a 304 page without fetching it.
+                metadata_json={**page_data.metadata, "links": page_data.links_found}
+            )
+            db.add(db_page)
+            await db.commit()
+            await db.refresh(db_page)
+            db_page_id = db_page.id
+
+        # 2. Add to Neo4j Graph
+        await self.kg_service.add_page(self.job_id, page_data)
+        self.stage_seconds["persist"] += time.monotonic() - started
+
+        canonical_url = page_data.metadata.get("near_duplicate_of")
+        if canonical_url:
+            # Same content as a page already analyzed; its issues stand for this one.
+            await self.kg_service.link_near_duplicate(page_data.url, canonical_url)
+            self.pages_handled += 1
+            return
+
+        if previous_page_id:
+            # Unchanged since the baseline scan; its findings still hold.
+            await self._carry_forward_issues(page_data, previous_page_id, db_page_id)
+            self.pages_handled += 1
+            return
+
+        # 3. Run Detectors
+        started = time.monotonic()
+        issues: List[RawIssue] = []
+        for result in live_results + await self.detector_engine.run(page_data):
+            issues.extend(result.issues)
+            stats = self.detector_stats.setdefault(result.detector, Counter())
+            stats[result.status] += 1
+            stats["seconds"] += result.duration
+        self.stage_seconds["detect"] += time.monotonic() - started
+
+        if issues:
+            started = time.monotonic()
+            # Save issues to Postgres
+            async with self.async_session() as db:
+                for r_issue in issues:
+                    await self.publish(f"Defect detected on {url}: {r_issue.title} (Severity: {r_issue.severity})", "warn")
+                    db_issue = Issue(
+                        scan_job_id=self.job_id,
+                        page_id=db_page_id,
+                        detector_name=r_issue.detector_name,
+                        category=r_issue.category,
+                        subcategory=r_issue.subcategory,
+                        severity=r_issue.severity,
+                        title=r_issue.title,
+                        description=r_issue.description,
+                        element_selector=r_issue.element_selector,
+                        element_html=r_issue.element_html,
+                        confidence_score=r_issue.confidence_score
+                    )
+                    db.add(db_issue)
+                await db.commit()
+
+            # Save issues to Neo4j
+            await self.kg_service.add_issues(page_data.url, issues)
+            self.stage_seconds["persist"] += time.monotonic() - started
+
+        self.pages_handled += 1
+
+    async def handle_represented(self, url: str, representative_url: str):
+        """A page template sampling skipped; the graph keeps which sampled page stands for it."""
+        await self.kg_service.link_represented(url, representative_url)
+
+    async def _carry_forward_issues(self, page_data: PageData, previous_page_id: str, db_page_id):
+        started = time.monotonic()
+        issues: List[RawIssue] = []
+        async with self.async_session() as db:
+            result = await db.execute(select(Issue).filter_by(page_id=previous_page_id))
+            for old in result.scalars().all():
+                db.add(Issue(
+                    scan_job_id=self.job_id,
+                    page_id=db_page_id,
+                    detector_name=old.detector_name,
+                    category=old.category,
+                    subcategory=old.subcategory,
+                    severity=old.severity,
+                    title=old.title,
+                    description=old.description,
+                    element_selector=old.element_selector,
+                    element_html=old.element_html,
+                    screenshot_path=old.screenshot_path,
+                    evidence=old.evidence,
+                    recommendation=old.recommendation,
+                    code_snippet=old.code_snippet,
+                    confidence_score=old.confidence_score,
+                    is_false_positive=old.is_false_positive,
+                    status=old.status,
+                    first_seen=old.first_seen
+                ))
+                issues.append(RawIssue(
+                    detector_name=old.detector_name,
+                    category=old.category,
+                    subcategory=old.subcategory or "",
+                    severity=old.severity,
+                    title=old.title,
+                    description=old.description,
+                    is_false_positive=bool(old.is_false_positive),
+                ))
+            await db.commit()
+        await self.kg_service.add_issues(page_data.url, issues)
+        self.stage_seconds["persist"] += time.monotonic() - started
+
+    def throughput(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        return {
+            "pages": self.pages_handled,
+            "pages_per_sec": round(self.pages_handled / elapsed, 3),
+            "persist_seconds": round(self.stage_seconds["persist"], 3),
+            "detect_seconds": round(self.stage_seconds["detect"], 3),
+            "detectors": {
+                name: {k: round(v, 3) for k, v in stats.items()}
+                for name, stats in sorted(self.detector_stats.items())
+            },
+        }
+
+    async def complete(self, stats: Dict[str, Any]):
+        await self.publish("Scan Complete. Generating Knowledge Graph...")
+
+        # Update job status
+        async with self.async_session() as db:
+            result = await db.execute(select(ScanJob).filter_by(id=self.job_id))
+            job = result.scalars().first()
+            if job:
+                job.status = "completed"
+                job.completed_at = datetime.utcnow()
+                job.total_pages_crawled = stats.get("total_pages_crawled", 0)
+                job.crawl_stats = {
+                    **{k: v for k, v in stats.items() if k != "final"},
+                    "detectors": self.throughput()["detectors"],
+                }
+                await db.commit()
@@ -0,0 +1,211 @@
+import asyncio
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+from reqon_types.models import CrawlerConfig
+from reqon_utils.logger import setup_logger
+
+logger = setup_logger("reqon-crawler")
+
+# Both scripts keep one hash per host: tokens, ts (ms the tokens were
+# counted at, in the future while the host is backing off), rate
+# (requests/s, shared so every worker adapts together), latency (EWMA, ms)
+# and decreased_at (last multiplicative decrease).
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate')
+local rate = tonumber(state[3]) or tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+if now > ts then
+    tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+    ts = now
+end
+tokens = tokens - 1
+local wait = ts - now
+if tokens < 0 then
+    wait = wait - tokens * 1000 / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', ts, 'rate', rate)
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+return math.ceil(wait)
+"""
+
+FEEDBACK_SCRIPT = """
+local now = tonumber(ARGV[1])
+local signal = ARGV[2]
+local latency = tonumber(ARGV[3])
+local backoff = tonumber(ARGV[4])
+local min_rate, max_rate = tonumber(ARGV[6]), tonumber(ARGV[7])
+local state = redis.call('HMGET', KEYS[1], 'rate', 'latency', 'decreased_at', 'ts')
+local rate = tonumber(state[1]) or tonumber(ARGV[5])
+local ewma = tonumber(state[2])
+local decreased_at = tonumber(state[3]) or 0
+if signal == 'ok' and ewma and latency > ewma * tonumber(ARGV[8]) and latency > tonumber(ARGV[9]) then
+    signal = 'slow'
+end
+if signal == 'ok' then
+    rate = math.min(max_rate, rate + 1 / rate)
+elseif now - decreased_at >= tonumber(ARGV[10]) then
+    rate = math.max(min_rate, rate * (signal == 'throttled' and 0.5 or 0.8))
+    redis.call('HSET', KEYS[1], 'decreased_at', now)
+end
+if signal == 'throttled' then
+    redis.call('HSET', KEYS[1], 'tokens', 0, 'ts', math.max(now + backoff, tonumber(state[4]) or 0))
+elseif signal ~= 'error' and latency > 0 then
+    ewma = ewma and (ewma * 0.8 + latency * 0.2) or latency
+    redis.call('HSET', KEYS[1], 'latency', ewma)
+end
+redis.call('HSET', KEYS[1], 'rate', rate)
+redis.call('PEXPIRE', KEYS[1], ARGV[11])
+return {signal, tostring(rate)}
+"""
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds, from either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def throttle_hint(status: int, headers: Mapping[str, str]) -> Dict[str, str]:
+    """The Retry-After of a 429/503 response, for HostRateLimiter.feedback()."""
+    if status in HostRateLimiter.THROTTLE_STATUSES and headers.get("retry-after"):
+        return {"retry_after": headers["retry-after"]}
+    return {}
+
+class HostRateLimiter:
+    """
+    Token bucket per host with AIMD rate control. acquire() takes a token,
+    sleeping until one is due; feedback() adjusts the host's rate from the
+    response: +1/rate per success (about +1 req/s per second of clean
+    traffic), x0.8 when latency climbs past SLOW_FACTOR times its average
+    or a request gets no response at all (status 0: connection error,
+    timeout), x0.5 on 429/503, which also pauses the host for Retry-After or
+    DEFAULT_BACKOFF seconds. Decreases are spaced by DECREASE_INTERVAL so a
+    burst of slow responses counts once.
+
+    With a Redis client the buckets live in Redis, updated atomically by
+    Lua scripts, so every worker crawling a host shares its budget; without
+    one they are process-local.
+    """
+
+    THROTTLE_STATUSES = (429, 503)
+    SLOW_FACTOR = 2.0
+    MIN_SLOW_MS = 1000
+    DECREASE_INTERVAL = 1.0
+    DEFAULT_BACKOFF = 1.0
+    MAX_BACKOFF = 300.0
+    KEY_TTL = 3600
+
+    def __init__(self, redis_client=None, rate: float = 10.0, burst: int = 20, min_rate: float = 0.5,
+                 max_rate: float = 50.0, prefix: str = "ratelimit"):
+        self.redis = redis_client
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.prefix = prefix
+        self._local: Dict[str, Dict[str, float]] = {}
+        self._acquire = redis_client.register_script(ACQUIRE_SCRIPT) if redis_client is not None else None
+        self._feedback = redis_client.register_script(FEEDBACK_SCRIPT) if redis_client is not None else None
+        self.counts: Dict[str, Counter] = {}
+        self.rates: Dict[str, float] = {}
+
+    @classmethod
+    def from_config(cls, config: CrawlerConfig, redis_client=None) -> "HostRateLimiter":
+        return cls(redis_client, rate=config.rate_limit_per_host, burst=config.rate_limit_burst,
+                   min_rate=config.rate_limit_min, max_rate=config.rate_limit_max)
+
+    def _host(self, url: str) -> str:
+        return (urlsplit(url).hostname or "").lower()
+
+    def _count(self, host: str, name: str, amount: float = 1):
+        self.counts.setdefault(host, Counter())[name] += amount
+
+    async def acquire(self, url: str) -> float:
+        """Waits for the host's next token. Returns the seconds waited."""
+        host = self._host(url)
+        now_ms = time.time() * 1000
+        if self._acquire is not None:
+            wait_ms = int(await self._acquire(keys=[f"{self.prefix}:{host}"],
+                                              args=[int(now_ms), self.rate, self.burst, self.KEY_TTL * 1000]))
+        else:
+            wait_ms = self._local_acquire(host, now_ms)
+        wait = min(max(0.0, wait_ms / 1000), self.MAX_BACKOFF)
+        self._count(host, "requests")
+        if wait > 0:
+            self._count(host, "waited_seconds", wait)
+            await asyncio.sleep(wait)
+        return wait
+
+    async def feedback(self, url: str, status: int, latency: float, retry_after: Optional[str] = None):
+        """
+        Reports a response (latency in seconds) so the host's rate can
+        adapt; status 0 reports a request that failed without one.
+        """
+        host = self._host(url)
+        now_ms = time.time() * 1000
+        throttled = status in self.THROTTLE_STATUSES
+        backoff = min(retry_after_seconds(retry_after) or self.DEFAULT_BACKOFF, self.MAX_BACKOFF) if throttled else 0.0
+        signal = "throttled" if throttled else "error" if status == 0 else "ok"
+        if self._feedback is not None:
+            result = await self._feedback(keys=[f"{self.prefix}:{host}"], args=[
+                int(now_ms), signal, int(latency * 1000), int(backoff * 1000), self.rate, self.min_rate,
+                self.max_rate, self.SLOW_FACTOR, self.MIN_SLOW_MS, int(self.DECREASE_INTERVAL * 1000),
+                self.KEY_TTL * 1000,
+            ])
+            signal = result[0].decode() if isinstance(result[0], bytes) else result[0]
+            rate = float(result[1])
+        else:
+            signal, rate = self._local_feedback(host, now_ms, signal, latency * 1000, backoff * 1000)
+        if signal != "ok":
+            self._count(host, signal)
+            logger.info("Backing off host", host=host, signal=signal, status=status, rate=round(rate, 2))
+        self.rates[host] = rate
+
+    # Process-local mirror of the two scripts above.
+
+    def _local_acquire(self, host: str, now: float) -> float:
+        state = self._local.setdefault(host, {"tokens": self.burst, "ts": now, "rate": self.rate})
+        if now > state["ts"]:
+            state["tokens"] = min(self.burst, state["tokens"] + (now - state["ts"]) * state["rate"] / 1000)
+            state["ts"] = now
+        state["tokens"] -= 1
+        wait = state["ts"] - now
+        if state["tokens"] < 0:
+            wait -= state["tokens"] * 1000 / state["rate"]
+        return wait
+
+    def _local_feedback(self, host: str, now: float, signal: str, latency: float, backoff: float):
+        state = self._local.setdefault(host, {"tokens": self.burst, "ts": now, "rate": self.rate})
+        ewma = state.get("latency")
+        if signal == "ok" and ewma and latency > ewma * self.SLOW_FACTOR and latency > self.MIN_SLOW_MS:
+            signal = "slow"
+        if signal == "ok":
+            state["rate"] = min(self.max_rate, state["rate"] + 1 / state["rate"])
+        elif now - state.get("decreased_at", 0) >= self.DECREASE_INTERVAL * 1000:
+            state["rate"] = max(self.min_rate, state["rate"] * (0.5 if signal == "throttled" else 0.8))
+            state["decreased_at"] = now
+        if signal == "throttled":
+            state["tokens"] = 0
+            state["ts"] = max(now + backoff, state["ts"])
+        elif signal != "error" and latency > 0:
+            # A failed request's latency is not a response time.
+            state["latency"] = ewma * 0.8 + latency * 0.2 if ewma else latency
+        return signal, state["rate"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            host: {**{k: round(v, 3) for k, v in counts.items()}, "rate": round(self.rates.get(host, self.rate), 2)}
+            for host, counts in self.counts.items()
+        }
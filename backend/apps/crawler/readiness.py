@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Any, Dict, Tuple
+from playwright.async_api import BrowserContext, Page, Response
+
+from reqon_types.models import CrawlerConfig
+
+# Runs before any page script on every navigation and timestamps DOM mutations.
+READINESS_INIT_SCRIPT = """
+(() => {
+    window.__reqonLastMutation = performance.now();
+    const observe = () => {
+        new MutationObserver(() => { window.__reqonLastMutation = performance.now(); })
+            .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    };
+    if (document.documentElement) { observe(); }
+    else { document.addEventListener('readystatechange', observe, {once: true}); }
+})();
+"""
+
+# Resolves true once the load event has fired and the DOM has been quiet for
+# quietMs, or false when timeoutMs runs out first.
+DOM_QUIET_SCRIPT = """
+({quietMs, timeoutMs}) => new Promise(resolve => {
+    const start = performance.now();
+    const check = () => {
+        const now = performance.now();
+        const lastMutation = window.__reqonLastMutation || 0;
+        if (document.readyState === 'complete' && now - lastMutation >= quietMs) return resolve(true);
+        if (now - start >= timeoutMs) return resolve(false);
+        setTimeout(check, Math.min(quietMs, 100));
+    };
+    check();
+})
+"""
+
+class ReadinessEngine:
+    """
+    Decides when a navigated page is ready for extraction.
+
+    "adaptive" returns as soon as the load event has fired, no short-lived
+    request is pending and the DOM has stopped mutating for quiet_ms, bounded
+    by max_wait. Requests pending longer than LONG_REQUEST_SECONDS (long
+    polling, analytics beacons) do not hold the page back. "networkidle" is
+    the previous behaviour: networkidle plus a fixed wait_after_load.
+    """
+
+    STRATEGIES = ("adaptive", "networkidle")
+    LONG_REQUEST_SECONDS = 3.0
+    NETWORK_POLL_SECONDS = 0.05
+    DOM_CHECK_SLICE_MS = 1000
+
+    def __init__(self, config: CrawlerConfig):
+        if config.readiness_strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown readiness strategy '{config.readiness_strategy}', expected one of {self.STRATEGIES}")
+        self.strategy = config.readiness_strategy
+        self.page_timeout = config.page_timeout
+        self.wait_after_load = config.wait_after_load
+        self.quiet_ms = config.readiness_quiet_ms
+        self.max_wait_ms = config.readiness_max_wait
+
+    async def install(self, context: BrowserContext):
+        if self.strategy == "adaptive":
+            await context.add_init_script(READINESS_INIT_SCRIPT)
+
+    async def navigate(self, page: Page, url: str, capture) -> Tuple[Response | None, Dict[str, Any]]:
+        """Navigates and waits for readiness; returns the response and what the wait cost."""
+        started = time.monotonic()
+        if self.strategy == "networkidle":
+            response = await page.goto(url, wait_until="networkidle", timeout=self.page_timeout)
+            loaded = time.monotonic()
+            await page.wait_for_timeout(self.wait_after_load)
+            outcome = "fixed_wait"
+        else:
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=self.page_timeout)
+            loaded = time.monotonic()
+            outcome = await self._wait_until_quiet(page, capture)
+
+        finished = time.monotonic()
+        return response, {
+            "strategy": self.strategy,
+            "outcome": outcome,
+            "navigation_ms": round((loaded - started) * 1000),
+            "waited_ms": round((finished - loaded) * 1000),
+        }
+
+    async def _wait_until_quiet(self, page: Page, capture) -> str:
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while True:
+            remaining_ms = (deadline - time.monotonic()) * 1000
+            if remaining_ms <= 0:
+                return "max_wait"
+            if not capture.network_quiet(self.LONG_REQUEST_SECONDS):
+                await asyncio.sleep(self.NETWORK_POLL_SECONDS)
+                continue
+            try:
+                dom_quiet = await page.evaluate(DOM_QUIET_SCRIPT, {
+                    "quietMs": self.quiet_ms,
+                    "timeoutMs": min(remaining_ms, self.DOM_CHECK_SLICE_MS),
+                })
+            except Exception:
+                # Client-side redirect destroyed the execution context; keep waiting.
+                await asyncio.sleep(self.NETWORK_POLL_SECONDS)
+                continue
+            if dom_quiet and capture.network_quiet(self.LONG_REQUEST_SECONDS):
+                return "quiet"
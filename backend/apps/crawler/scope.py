@@ -0,0 +1,147 @@
+import asyncio
+import fnmatch
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from reqon_types.models import CrawlerConfig
+from reqon_utils.logger import setup_logger
+
+logger = setup_logger("reqon-crawler")
+
+# robots.txt per (origin, user agent), shared by the jobs of one worker process.
+_robots_cache: Dict[Tuple[str, str], Tuple[float, "RobotsPolicy"]] = {}
+ROBOTS_CACHE_TTL = 3600
+
+async def fetch_robots_txt(origin: str, user_agent: str, client: Optional[httpx.AsyncClient] = None) -> Optional[str]:
+    """Body of origin/robots.txt, or None when there is none to obey."""
+    owned = client is None
+    client = client or httpx.AsyncClient(follow_redirects=True, timeout=10)
+    try:
+        response = await client.get(f"{origin}/robots.txt", headers={"User-Agent": user_agent})
+        if response.status_code >= 400:
+            return None
+        return response.text
+    except httpx.HTTPError as e:
+        logger.info("robots.txt unavailable, crawling unrestricted", origin=origin, error=str(e))
+        return None
+    finally:
+        if owned:
+            await client.aclose()
+
+class RobotsPolicy:
+    """Parsed robots.txt rules for one origin."""
+
+    def __init__(self, robots_txt: Optional[str], user_agent: str):
+        self.user_agent = user_agent
+        self.parser: Optional[RobotFileParser] = None
+        self.crawl_delay = 0.0
+        self.sitemaps: List[str] = []
+        if robots_txt:
+            self.parser = RobotFileParser()
+            self.parser.parse(robots_txt.splitlines())
+            self.crawl_delay = float(self.parser.crawl_delay(user_agent) or 0)
+            self.sitemaps = self.parser.site_maps() or []
+
+    def allows(self, url: str) -> bool:
+        return self.parser is None or self.parser.can_fetch(self.user_agent, url)
+
+class ScopeMatcher:
+    """
+    Decides, once per discovered link, whether it belongs to the crawl.
+    Built once per job: the target origin is parsed up front, include and
+    exclude patterns are each compiled into a single alternation regex and
+    robots.txt is fetched once and cached per worker.
+
+    Patterns are globs unless prefixed with "re:". Globs containing "://"
+    match the whole URL, other globs match the path and query
+    ("/blog/*"). Regexes are searched in the whole URL.
+    """
+
+    def __init__(self, config: CrawlerConfig, robots: Optional[RobotsPolicy] = None):
+        target = urlsplit(config.target_url)
+        self.netloc = target.netloc.lower()
+        self.include = self._compile(config.include_patterns)
+        self.exclude = self._compile(config.exclude_patterns)
+        self.robots = robots
+        self.crawl_delay = robots.crawl_delay if robots else 0.0
+        self.rejected: Counter = Counter()
+        self._gate = asyncio.Lock()
+        self._last_fetch = 0.0
+
+    @classmethod
+    async def load(cls, config: CrawlerConfig, client: Optional[httpx.AsyncClient] = None) -> "ScopeMatcher":
+        robots = None
+        if config.respect_robots_txt:
+            target = urlsplit(config.target_url)
+            origin = f"{target.scheme}://{target.netloc}".lower()
+            key = (origin, config.user_agent)
+            cached = _robots_cache.get(key)
+            if cached and time.monotonic() - cached[0] < ROBOTS_CACHE_TTL:
+                robots = cached[1]
+            else:
+                robots = RobotsPolicy(await fetch_robots_txt(origin, config.user_agent, client), config.user_agent)
+                _robots_cache[key] = (time.monotonic(), robots)
+        return cls(config, robots)
+
+    def _compile(self, patterns: List[str]) -> Optional[Tuple[Optional[re.Pattern], Optional[re.Pattern]]]:
+        """One regex for patterns over the whole URL and one for patterns over the path."""
+        if not patterns:
+            return None
+        url_parts, path_parts = [], []
+        for pattern in patterns:
+            if pattern.startswith("re:"):
+                url_parts.append(f"(?:.*?(?:{pattern[3:]}))")
+            elif "://" in pattern:
+                url_parts.append(fnmatch.translate(pattern))
+            else:
+                path_parts.append(fnmatch.translate(pattern))
+        return (
+            re.compile("|".join(url_parts)) if url_parts else None,
+            re.compile("|".join(path_parts)) if path_parts else None,
+        )
+
+    def _matches(self, compiled, url: str, path: str) -> bool:
+        url_re, path_re = compiled
+        return bool((url_re and url_re.match(url)) or (path_re and path_re.match(path)))
+
+    def allows(self, url: str) -> bool:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or parts.netloc.lower() != self.netloc:
+            self.rejected["off_site"] += 1
+            return False
+
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        if self.exclude and self._matches(self.exclude, url, path):
+            self.rejected["excluded"] += 1
+            return False
+        if self.include and not self._matches(self.include, url, path):
+            self.rejected["not_included"] += 1
+            return False
+        if self.robots and not self.robots.allows(url):
+            self.rejected["robots"] += 1
+            return False
+        return True
+
+    async def wait_turn(self):
+        """Spaces this job's navigations by the robots.txt crawl-delay."""
+        if not self.crawl_delay:
+            return
+        async with self._gate:
+            wait = self._last_fetch + self.crawl_delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_fetch = time.monotonic()
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self.rejected)
+        if self.crawl_delay:
+            stats["crawl_delay"] = self.crawl_delay
+        return stats
@@ -0,0 +1,164 @@
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+from xml.etree import ElementTree
+
+import httpx
+
+from reqon_types.models import CrawlerConfig
+from reqon_utils.logger import setup_logger
+from apps.crawler.canonicalizer import UrlCanonicalizer
+from apps.crawler.frontier import FrontierEntry
+from apps.crawler.priority import PriorityScorer
+from apps.crawler.scope import ScopeMatcher
+
+logger = setup_logger("reqon-crawler")
+
+GZIP_MAGIC = b"\x1f\x8b"
+SEED_BATCH_SIZE = 500
+CHANGED_SINCE_BASELINE_BONUS = 30.0  # priority for baseline pages whose <lastmod> is newer than their last crawl
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """W3C datetime of a sitemap <lastmod> ("2024-05-01", "2024-05-01T10:00:00Z"), as an aware datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _local_name(tag: str) -> str:
+    # Sitemaps in the wild use the 0.9 namespace, an old one or none at all.
+    return tag.rsplit("}", 1)[-1]
+
+def _child_text(element: ElementTree.Element, name: str) -> Optional[str]:
+    for child in element:
+        if _local_name(child.tag) == name:
+            return (child.text or "").strip() or None
+    return None
+
+class SitemapReader:
+    """
+    Streams URLs out of sitemaps and sitemap indexes. Bodies are fed chunk
+    by chunk into an XMLPullParser, gunzipping on the fly for .xml.gz files,
+    and every <url>/<sitemap> element is cleared once read, so a 50 MB
+    sitemap never sits in memory. Indexes are followed breadth-first up to
+    max_depth levels.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, client: httpx.AsyncClient, max_urls: int = 50_000, max_sitemaps: int = 1000, max_depth: int = 3):
+        self.client = client
+        self.max_urls = max_urls
+        self.max_sitemaps = max_sitemaps
+        self.max_depth = max_depth
+        self.counts = {"sitemaps": 0, "urls": 0, "errors": 0}
+
+    async def read(self, sitemap_urls: Iterable[str]) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """Yields (url, lastmod) for every page listed under sitemap_urls."""
+        queue = deque((url, 0) for url in sitemap_urls)
+        seen = set()
+        while queue and self.counts["sitemaps"] < self.max_sitemaps:
+            sitemap_url, level = queue.popleft()
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            children = []
+            try:
+                async for kind, loc, lastmod in self._parse(sitemap_url):
+                    if kind == "sitemap":
+                        if level < self.max_depth:
+                            children.append(loc)
+                        continue
+                    self.counts["urls"] += 1
+                    yield loc, lastmod
+                    if self.counts["urls"] >= self.max_urls:
+                        return
+            except (httpx.HTTPError, ElementTree.ParseError, zlib.error) as e:
+                self.counts["errors"] += 1
+                logger.info("Skipping unreadable sitemap", sitemap=sitemap_url, error=str(e))
+            queue.extend((child, level + 1) for child in children)
+
+    async def _parse(self, sitemap_url: str) -> AsyncIterator[Tuple[str, str, Optional[str]]]:
+        parser = ElementTree.XMLPullParser(events=("end",))
+        async with self.client.stream("GET", sitemap_url) as response:
+            if response.status_code >= 400:
+                self.counts["errors"] += 1
+                return
+            self.counts["sitemaps"] += 1
+            decompressor = None
+            first = True
+            # aiter_bytes already undoes Content-Encoding; this is for gzip files served as-is.
+            async for chunk in response.aiter_bytes(self.CHUNK_SIZE):
+                if first:
+                    first = False
+                    if chunk.startswith(GZIP_MAGIC):
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+                for item in self._drain(parser):
+                    yield item
+            if decompressor:
+                parser.feed(decompressor.flush())
+            parser.close()
+            for item in self._drain(parser):
+                yield item
+
+    def _drain(self, parser: ElementTree.XMLPullParser) -> Iterator[Tuple[str, str, Optional[str]]]:
+        for _, element in parser.read_events():
+            kind = _local_name(element.tag)
+            if kind not in ("url", "sitemap"):
+                continue
+            loc = _child_text(element, "loc")
+            if loc:
+                yield kind, loc, _child_text(element, "lastmod")
+            element.clear()
+
+def sitemap_urls_for(config: CrawlerConfig, scope: ScopeMatcher) -> List[str]:
+    """Sitemaps announced in robots.txt, else the conventional /sitemap.xml."""
+    if scope.robots and scope.robots.sitemaps:
+        return scope.robots.sitemaps
+    target = urlsplit(config.target_url)
+    return [f"{target.scheme}://{target.netloc}/sitemap.xml"]
+
+def sitemap_priority(scorer: Optional[PriorityScorer],
+                     baseline: Dict[str, Dict[str, Any]]) -> Callable[[str, str, Optional[str]], float]:
+    """
+    The seed_frontier priority of a crawl: scorer's score for the URL one
+    level below the seed, which is where a link from it would put it, plus
+    CHANGED_SINCE_BASELINE_BONUS when the baseline crawled it before its lastmod.
+    """
+    def priority(url: str, url_hash: str, lastmod: Optional[str]) -> float:
+        value = scorer.score(url, url_hash, 1)[0] if scorer else 0.0
+        previous = baseline.get(url_hash)
+        if previous:
+            changed_at, crawled_at = parse_lastmod(lastmod), parse_lastmod(previous.get("crawled_at"))
+            if changed_at and crawled_at and changed_at > crawled_at:
+                value += CHANGED_SINCE_BASELINE_BONUS
+        return value
+
+    return priority
+
+async def seed_frontier(frontier, reader: SitemapReader, sitemap_urls: Iterable[str], scope: ScopeMatcher,
+                        canonicalizer: UrlCanonicalizer,
+                        priority: Optional[Callable[[str, str, Optional[str]], float]] = None) -> int:
+    """Offers every in-scope sitemap URL to frontier in batches, one level below the seed. Returns how many were new."""
+    seeded = 0
+    batch: List[FrontierEntry] = []
+    async for url, lastmod in reader.read(sitemap_urls):
+        try:
+            if not scope.allows(url):
+                continue
+        except ValueError:
+            continue
+        url_hash = canonicalizer.hash(url, count=True)
+        batch.append(FrontierEntry(url, url_hash, 1, None, priority(url, url_hash, lastmod) if priority else 0.0, lastmod))
+        if len(batch) >= SEED_BATCH_SIZE:
+            seeded += await frontier.offer(batch)
+            batch = []
+    if batch:
+        seeded += await frontier.offer(batch)
+    return seeded
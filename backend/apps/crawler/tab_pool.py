@@ -0,0 +1,196 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set
+from playwright.async_api import BrowserContext, Page
+
+from reqon_utils.logger import setup_logger
+from apps.crawler.interception import InterceptionProfile
+
+logger = setup_logger("reqon-crawler")
+
+# Resource types whose text bodies may carry leaked secrets.
+BODY_RESOURCE_TYPES = ("script", "xhr", "fetch")
+TEXT_CONTENT_TYPES = ("javascript", "json", "text/", "xml")
+
+class PageCapture:
+    """Network and console records of a single navigation."""
+
+    def __init__(self):
+        self.network_requests: List[Dict[str, Any]] = []
+        self.console_logs: List[Dict[str, Any]] = []
+        self.response_bodies: List[Dict[str, str]] = []
+        self.entries_by_request: Dict[Any, Dict[str, Any]] = {}
+        # In-flight requests and when they started, for readiness checks.
+        self.pending: Dict[Any, float] = {}
+        self.body_reads: Set[asyncio.Task] = set()
+
+    async def collect_bodies(self, timeout: float):
+        """Waits for response bodies still being read; those not done within timeout are dropped."""
+        if not self.body_reads:
+            return
+        _, pending = await asyncio.wait(self.body_reads, timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+    def network_quiet(self, ignore_after: float) -> bool:
+        """True when no request younger than ignore_after seconds is still in flight."""
+        cutoff = time.monotonic() - ignore_after
+        return all(started < cutoff for started in self.pending.values())
+
+class PooledTab:
+    """
+    A Page reused across navigations. Listeners are attached once and write
+    into the current PageCapture, which is swapped for a fresh one per URL.
+    """
+
+    def __init__(self, page: Page, interception: Optional[InterceptionProfile] = None,
+                 capture_network: bool = True, capture_console: bool = True, body_max_bytes: int = 0):
+        self.page = page
+        self.interception = interception
+        self.uses = 0
+        self.crashed = False
+        self.capture_network = capture_network
+        # >0 keeps text bodies of script/XHR/fetch responses up to this size.
+        self.body_max_bytes = body_max_bytes
+        self.capture = PageCapture()
+
+        # Requests are always tracked so readiness can see what is pending.
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_request_done)
+        page.on("requestfailed", self._on_request_done)
+        if capture_network or body_max_bytes:
+            page.on("response", self._on_response)
+        if capture_console:
+            page.on("console", self._on_console)
+        page.on("crash", self._on_crash)
+
+    def _on_request(self, request):
+        self.capture.pending[request] = time.monotonic()
+        if not self.capture_network:
+            return
+        entry = {"url": request.url, "method": request.method}
+        if self.interception and self.interception.blocks(request.resource_type, request.url):
+            entry["blocked"] = True
+            entry["blocked_by"] = self.interception.name
+        self.capture.network_requests.append(entry)
+        self.capture.entries_by_request[request] = entry
+
+    def _on_response(self, response):
+        # Attribute the status to its own request, not whichever came last.
+        entry = self.capture.entries_by_request.pop(response.request, None)
+        if entry is not None:
+            entry.update({"status": response.status})
+        if self.body_max_bytes and response.request.resource_type in BODY_RESOURCE_TYPES:
+            headers = response.headers
+            content_type = headers.get("content-type", "")
+            length = headers.get("content-length")
+            if any(t in content_type for t in TEXT_CONTENT_TYPES) and not (length and length.isdigit() and int(length) > self.body_max_bytes):
+                task = asyncio.ensure_future(self._read_body(response, self.capture))
+                self.capture.body_reads.add(task)
+                task.add_done_callback(self.capture.body_reads.discard)
+
+    async def _read_body(self, response, capture: PageCapture):
+        try:
+            body = await response.body()
+        except Exception:
+            # Redirects and responses evicted from the renderer have no body.
+            return
+        if len(body) <= self.body_max_bytes:
+            capture.response_bodies.append({"url": response.url, "body": body.decode("utf-8", errors="replace")})
+
+    def _on_request_done(self, request):
+        self.capture.pending.pop(request, None)
+
+    def _on_console(self, msg):
+        self.capture.console_logs.append({"type": msg.type, "text": msg.text})
+
+    def _on_crash(self, _):
+        self.crashed = True
+
+    def is_reusable(self, max_uses: int) -> bool:
+        return not self.crashed and not self.page.is_closed() and self.uses < max_uses
+
+class TabPool:
+    """
+    Reusable tabs for one BrowserContext. Tabs are reset between
+    navigations and recycled after max_uses navigations or a renderer crash.
+    """
+
+    RESET_SCRIPT = """
+    (clearLocal) => {
+        try {
+            sessionStorage.clear();
+            if (clearLocal) { localStorage.clear(); }
+        } catch (e) {}
+    }
+    """
+
+    def __init__(self, context: BrowserContext, size: int, max_uses: int = 50, keep_storage: bool = True,
+                 interception: Optional[InterceptionProfile] = None,
+                 capture_network: bool = True, capture_console: bool = True, body_max_bytes: int = 0):
+        self.context = context
+        self.interception = interception
+        self.capture_network = capture_network
+        self.capture_console = capture_console
+        self.body_max_bytes = body_max_bytes
+        self.max_uses = max_uses
+        self.keep_storage = keep_storage
+        self._idle: List[PooledTab] = []
+        self._all: List[PooledTab] = []
+        self._slots = asyncio.Semaphore(max(1, size))
+
+    async def acquire(self) -> PooledTab:
+        await self._slots.acquire()
+        try:
+            tab = self._idle.pop() if self._idle else await self._open()
+        except BaseException:
+            self._slots.release()
+            raise
+        tab.uses += 1
+        tab.capture = PageCapture()
+        return tab
+
+    async def release(self, tab: PooledTab):
+        # Detach the returned PageData's lists before anything else fires.
+        for task in tab.capture.body_reads:
+            task.cancel()
+        tab.capture = PageCapture()
+        try:
+            if tab.is_reusable(self.max_uses) and await self._reset(tab):
+                self._idle.append(tab)
+            else:
+                await self._discard(tab)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        for tab in list(self._all):
+            await self._discard(tab)
+        self._idle = []
+
+    async def _open(self) -> PooledTab:
+        tab = PooledTab(await self.context.new_page(), self.interception,
+                        capture_network=self.capture_network, capture_console=self.capture_console,
+                        body_max_bytes=self.body_max_bytes)
+        self._all.append(tab)
+        return tab
+
+    async def _reset(self, tab: PooledTab) -> bool:
+        # sessionStorage is per tab, so clearing it keeps a reused tab
+        # equivalent to a fresh one; localStorage is context-wide anyway.
+        try:
+            await tab.page.evaluate(self.RESET_SCRIPT, not self.keep_storage)
+            await tab.page.goto("about:blank")
+            return True
+        except Exception as e:
+            logger.info("Recycling tab that failed to reset", error=str(e))
+            return False
+
+    async def _discard(self, tab: PooledTab):
+        if tab in self._all:
+            self._all.remove(tab)
+        try:
+            if not tab.page.is_closed():
+                await tab.page.close()
+        except Exception as e:
+            logger.error("Failed to close pooled tab", error=str(e))
@@ -1,17 +1,33 @@
-from celery import Celery
+from celery import Celery, group
+from celery.signals import worker_process_shutdown
 import asyncio
-import json
+import queue
+import time
 from datetime import datetime
 from typing import Dict, Any
 from reqon_config.settings import settings
+import billiard
+import httpx
 import redis.asyncio as aioredis
 
+from apps.crawler.browser_pool import BrowserPool
+from apps.crawler.canonicalizer import UrlCanonicalizer
+from apps.crawler.auth import AuthSession
 from apps.crawler.crawler import AutonomousCrawler
+from apps.crawler.scope import ScopeMatcher
+from apps.crawler.sitemap import SitemapReader, seed_frontier, sitemap_priority, sitemap_urls_for
+from apps.crawler.frontier import FrontierEntry, RedisFrontier
+from apps.crawler.pipeline import ScanPipeline
+from apps.crawler.priority import PriorityScorer
+from apps.crawler.rate_limit import HostRateLimiter
 from apps.detector.engine import DefectDetectionEngine
-from reqon_types.models import CrawlerConfig, PageData, RawIssue
+from apps.detector.static_pool import StaticDetectorPool
+from reqon_types.models import CrawlerConfig, PageData
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from apps.api.models.core import Page, Issue, ScanJob
-from apps.knowledge.graph_service import KnowledgeGraphService
+from apps.api.models.core import ScanJob
+from reqon_utils.logger import setup_logger
+
+logger = setup_logger("reqon-crawler")
 
 celery_app = Celery(
     "reqon_crawler",
@@ -26,112 +42,327 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
+    # acks_late tasks still unacked after this long are redelivered to another
+    # worker, so it must outlast the longest scan; the frontier lease catches the rest.
+    broker_transport_options={"visibility_timeout": settings.CRAWL_VISIBILITY_TIMEOUT},
 )
 
-async def _run_crawler(job_id: str, config_dict: Dict[str, Any]):
-    config = CrawlerConfig(**config_dict)
-    crawler = AutonomousCrawler()
-    detector_engine = DefectDetectionEngine()
-    kg_service = KnowledgeGraphService()
-    
-    await kg_service.init_schema()
-    
+# Playwright objects are bound to the event loop that created them, so each
+# worker process keeps one loop alive across tasks for its browser pool.
+_worker_loop: asyncio.AbstractEventLoop | None = None
+_browser_pool: BrowserPool | None = None
+_static_pool: StaticDetectorPool | None = None
+
+def _run_on_worker_loop(coro):
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop.run_until_complete(coro)
+
+def _get_browser_pool() -> BrowserPool:
+    # Browsers launch on the first task's acquire(), not in worker_process_init:
+    # starting Playwright and Chromium can outlast the 4s Celery gives a new
+    # process to report in before it is killed and replaced.
+    global _browser_pool
+    if _browser_pool is None:
+        _browser_pool = BrowserPool(size=settings.BROWSER_POOL_SIZE, max_uses=settings.BROWSER_POOL_MAX_USES)
+    return _browser_pool
+
+def _get_static_pool(processes: int) -> StaticDetectorPool:
+    """Detector processes are kept across scans too, rather than spawned and terminated by every ScanPipeline."""
+    global _static_pool
+    if _static_pool is None or _static_pool.processes != processes:
+        if _static_pool is not None:
+            _static_pool.close()
+        _static_pool = StaticDetectorPool(processes)
+    return _static_pool
+
+@worker_process_shutdown.connect
+def _close_worker_pools(**kwargs):
+    if _static_pool is not None:
+        _static_pool.close()
+    if _browser_pool is not None and _worker_loop is not None and not _worker_loop.is_closed():
+        _run_on_worker_loop(_browser_pool.close())
+        _worker_loop.close()
+
+async def _mark_job_failed(job_id: str, error_message: str):
     engine = create_async_engine(settings.DATABASE_URL, echo=False)
     async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-    
-    redis_client = aioredis.from_url(settings.REDIS_URL)
-    pubsub_channel = f"scan:{job_id}"
-    
-    async def publish_event(msg_text: str, msg_type: str = "info"):
-        payload = json.dumps({
-            "time": datetime.utcnow().isoformat().split('T')[1][:8],
-            "msg": msg_text,
-            "type": msg_type
-        })
-        await redis_client.publish(pubsub_channel, payload)
+    try:
+        async with async_session() as db:
+            from sqlalchemy.future import select
+            job = (await db.execute(select(ScanJob).filter_by(id=job_id))).scalars().first()
+            # Keep the first reason when several shards or processes fail the same job.
+            if job and job.status != "failed":
+                job.status = "failed"
+                job.error_message = error_message
+                job.completed_at = datetime.utcnow()
+                await db.commit()
+    finally:
+        await engine.dispose()
+
+async def _bootstrap_shared_frontier(pipeline: ScanPipeline, config: CrawlerConfig, shard_count: int,
+                                     baseline: Dict[str, Dict[str, Any]] | None = None) -> bool:
+    """
+    Seeds the Redis frontier shared by shard tasks or browser processes.
+    Returns False when a previous delivery already did so.
+    """
+    frontier = RedisFrontier(pipeline.redis_client, pipeline.job_id, shard_count=shard_count)
+    if await frontier.has_checkpoint():
+        return False
+
+    await frontier.restore_visited(await pipeline.load_persisted_hashes())
+    seed_url = config.target_url
+    canonicalizer = UrlCanonicalizer(config)
+    await frontier.bootstrap(
+        FrontierEntry(seed_url, canonicalizer.hash(seed_url), priority=100.0),
+        {"target_url": seed_url, "pages_crawled": 0, "shard_count": shard_count}
+    )
+    if config.sitemap_seeding:
+        async with httpx.AsyncClient(headers={"User-Agent": config.user_agent}, follow_redirects=True,
+                                     timeout=config.page_timeout / 1000) as client:
+            scope = await ScopeMatcher.load(config, client)
+            reader = SitemapReader(client, max_urls=config.sitemap_max_urls)
+            if baseline is None and config.incremental:
+                baseline = await pipeline.load_baseline(config)
+            # Scored as a single-process crawl would seed them.
+            priority = sitemap_priority(PriorityScorer() if config.frontier_strategy == "priority" else None, baseline or {})
+            seeded = await seed_frontier(frontier, reader, sitemap_urls_for(config, scope), scope, canonicalizer, priority)
+        await pipeline.publish(f"Seeded {seeded} URLs from {reader.counts['sitemaps']} sitemaps")
+    return True
+
+async def _dispatch_shards(job_id: str, config_dict: Dict[str, Any]):
+    """Coordinator for shard mode: seeds the shared frontier and fans out one crawl_shard per shard."""
+    config = CrawlerConfig(**config_dict)
+    pipeline = ScanPipeline(job_id, config)
+    try:
+        if not await _bootstrap_shared_frontier(pipeline, config, config.shard_count):
+            # Shards were already dispatched by a previous delivery.
+            return {"status": "dispatched", "job_id": job_id}
+    finally:
+        await pipeline.close()
+
+    group(crawl_shard.s(job_id, config_dict, i) for i in range(config.shard_count)).apply_async()
+    return {"status": "dispatched", "job_id": job_id, "shards": config.shard_count}
+
+async def _run_crawler(job_id: str, config_dict: Dict[str, Any], shard_index: int | None = None):
+    config = CrawlerConfig(**config_dict)
+    pipeline = ScanPipeline(job_id, config, _get_static_pool(config.detector_processes))
+    await pipeline.open()
+
+    if shard_index is not None:
+        frontier = RedisFrontier(pipeline.redis_client, job_id, shard_index=shard_index, shard_count=config.shard_count)
+    elif config.frontier_backend == "redis":
+        frontier = RedisFrontier(pipeline.redis_client, job_id)
+    else:
+        frontier = None
+    baseline = await pipeline.load_baseline(config) if config.incremental else None
+    auth = AuthSession(config, pipeline.redis_client, await pipeline.load_org_id()) if config.auth_config else None
+    crawler = AutonomousCrawler(frontier=frontier, browser_pool=_get_browser_pool(), baseline=baseline, auth=auth,
+                                rate_limiter=pipeline.rate_limiter, live_detection=pipeline.detector_engine.live_hook)
+
+    if isinstance(crawler.frontier, RedisFrontier):
+        if not await crawler.frontier.acquire_lease():
+            logger.warning("Crawl already running under another delivery", job_id=job_id, shard=shard_index)
+            await pipeline.close()
+            return {"status": "running", "job_id": job_id}
+        # Never recrawl pages a previous attempt already persisted.
+        await crawler.frontier.restore_visited(await pipeline.load_persisted_hashes())
 
     try:
         async for event in crawler.start(config):
             if event.event_type == "scan_started":
-                await publish_event("Scan started")
-                
+                if shard_index is not None:
+                    await pipeline.publish(f"Shard {shard_index + 1}/{config.shard_count} started")
+                else:
+                    await pipeline.publish("Scan resumed from checkpoint" if event.data.get("resumed") else "Scan started")
+
             elif event.event_type == "page_discovered":
                 pass # Handled on crawled
-                
+
             elif event.event_type == "page_crawled":
                 page_data: PageData = event.data.pop("page_data")
-                url = event.data["url"]
-                await publish_event(f"Discovered and inspected {url}")
-                
-                # 1. Save Page to PostgreSQL
-                db_page_id = None
-                async with async_session() as db:
-                    db_page = Page(
-                        scan_job_id=job_id,
-                        url=page_data.url,
-                        url_hash=page_data.url_hash,
-                        title=page_data.title,
-                        http_status=page_data.http_status,
-                        depth=page_data.depth,
-                        parent_url=page_data.parent_url,
-                        performance_metrics=page_data.performance_metrics,
-                        network_requests=page_data.network_requests
-                    )
-                    db.add(db_page)
-                    await db.commit()
-                    await db.refresh(db_page)
-                    db_page_id = db_page.id
-                
-                # 2. Add to Neo4j Graph
-                await kg_service.add_page(job_id, page_data)
-                
-                # 3. Run Detectors
-                issues: list[RawIssue] = await detector_engine.run_all(page_data)
-                if issues:
-                    # Save issues to Postgres
-                    async with async_session() as db:
-                        for r_issue in issues:
-                            await publish_event(f"Defect detected on {url}: {r_issue.title} (Severity: {r_issue.severity})", "warn")
-                            db_issue = Issue(
-                                scan_job_id=job_id,
-                                page_id=db_page_id,
-                                detector_name=r_issue.detector_name,
-                                category=r_issue.category,
-                                subcategory=r_issue.subcategory,
-                                severity=r_issue.severity,
-                                title=r_issue.title,
-                                description=r_issue.description,
-                                element_selector=r_issue.element_selector,
-                                element_html=r_issue.element_html,
-                                confidence_score=r_issue.confidence_score
-                            )
-                            db.add(db_issue)
-                        await db.commit()
-                    
-                    # Save issues to Neo4j
-                    await kg_service.add_issues(page_data.url, issues)
-                    
+                await pipeline.handle_page(page_data)
+
+            elif event.event_type == "page_represented":
+                await pipeline.handle_represented(event.data["url"], event.data["represented_by"])
+
             elif event.event_type == "scan_completed":
-                await publish_event("Scan Complete. Generating Knowledge Graph...")
-                
-                # Update job status
-                async with async_session() as db:
-                    from sqlalchemy.future import select
-                    stmt = select(ScanJob).filter_by(id=job_id)
-                    result = await db.execute(stmt)
-                    job = result.scalars().first()
-                    if job:
-                        job.status = "completed"
-                        job.completed_at = datetime.utcnow()
-                        job.total_pages_crawled = event.data.get("total_pages_crawled", 0)
-                        await db.commit()
-                        
+                if event.data.get("error"):
+                    continue
+                if not event.data.get("final", True):
+                    # Another shard is still crawling; the last one closes the job.
+                    await pipeline.publish(f"Shard {shard_index + 1}/{config.shard_count} finished")
+                    continue
+                await pipeline.complete(event.data)
+
+    except Exception as e:
+        if shard_index is not None:
+            await crawler.frontier.abort(f"shard {shard_index + 1}/{config.shard_count} failed: {e}")
+        await _mark_job_failed(job_id, str(e))
+        raise
     finally:
-        await kg_service.close()
+        if isinstance(crawler.frontier, RedisFrontier):
+            await crawler.frontier.release_lease()
+        await pipeline.close()
+
+    return {"status": "completed", "job_id": job_id}
+
+def _browser_process_main(job_id: str, config_dict: Dict[str, Any], shard_index: int, shard_count: int, page_queue,
+                          baseline: Dict[str, Dict[str, Any]] | None = None, org_id: str | None = None):
+    """Entry point of a browser process in multi-process mode."""
+    asyncio.run(_browser_process(job_id, config_dict, shard_index, shard_count, page_queue, baseline, org_id))
+
+async def _browser_process(job_id: str, config_dict: Dict[str, Any], shard_index: int, shard_count: int, page_queue,
+                           baseline: Dict[str, Dict[str, Any]] | None = None, org_id: str | None = None):
+    config = CrawlerConfig(**config_dict)
+    redis_client = aioredis.from_url(settings.REDIS_URL)
+    # The processes share one login through the Redis-cached storage state.
+    auth = AuthSession(config, redis_client, org_id) if config.auth_config else None
+    # Live detectors need the page, so they run here; the rest run in the analysis process.
+    detector_engine = DefectDetectionEngine(timeout=config.detector_timeout)
+    crawler = AutonomousCrawler(frontier=RedisFrontier(redis_client, job_id, shard_index=shard_index, shard_count=shard_count),
+                                baseline=baseline, auth=auth, rate_limiter=HostRateLimiter.from_config(config, redis_client),
+                                live_detection=detector_engine.live_hook)
+    loop = asyncio.get_running_loop()
+
+    started = time.monotonic()
+    pages = 0
+    queue_wait = 0.0
+    scan_stats: Dict[str, Any] = {}
+    error = None
+    try:
+        async for event in crawler.start(config):
+            if event.event_type == "page_crawled":
+                payload = event.data["page_data"].model_dump()
+                # A full queue means the analysis stage is the bottleneck;
+                # blocking here is the backpressure.
+                put_started = time.monotonic()
+                await loop.run_in_executor(None, page_queue.put, ("page", shard_index, payload))
+                queue_wait += time.monotonic() - put_started
+                pages += 1
+            elif event.event_type == "page_represented":
+                await loop.run_in_executor(None, page_queue.put, ("represented", shard_index, event.data))
+            elif event.event_type == "scan_completed":
+                scan_stats = event.data
+    except Exception as e:
+        # Reported with "done"; the analysis process aborts the job and stops the other processes.
+        error = str(e) or type(e).__name__
+        raise
+    finally:
+        await detector_engine.close()
         await redis_client.aclose() if hasattr(redis_client, 'aclose') else await redis_client.close()
+        elapsed = max(time.monotonic() - started, 1e-6)
+        page_queue.put(("done", shard_index, {
+            "pages": pages,
+            "pages_per_sec": round(pages / elapsed, 3),
+            "queue_wait_seconds": round(queue_wait, 3),
+            "scan": scan_stats,
+            "error": error,
+        }))
+
+async def _run_multiprocess(job_id: str, config_dict: Dict[str, Any]):
+    """
+    Runs config.process_workers browser processes, each crawling one shard of
+    a Redis frontier, and keeps analysis and persistence in this process.
+    Pages cross over a bounded queue so neither stage can starve the other's
+    event loop.
+    """
+    config = CrawlerConfig(**config_dict)
+    workers = config.process_workers
+    pipeline = ScanPipeline(job_id, config, _get_static_pool(config.detector_processes))
+    await pipeline.open()
+    # The browser processes resume the shared frontier, so one delivery at a time may start them.
+    frontier = RedisFrontier(pipeline.redis_client, job_id, shard_count=workers)
+    if not await frontier.acquire_lease():
+        logger.warning("Crawl already running under another delivery", job_id=job_id)
+        await pipeline.close()
+        return {"status": "running", "job_id": job_id}
+
+    # billiard (Celery's multiprocessing fork) allows children of the
+    # daemonic prefork pool processes; spawn keeps Chromium out of a forked loop.
+    ctx = billiard.get_context("spawn")
+    page_queue = ctx.Queue(maxsize=config.process_queue_size)
+    processes = []
+    browser_stats: Dict[int, Dict[str, Any]] = {}
+    loop = asyncio.get_running_loop()
+
+    try:
+        baseline = await pipeline.load_baseline(config) if config.incremental else None
+        resumed = not await _bootstrap_shared_frontier(pipeline, config, workers, baseline)
+        await pipeline.publish("Scan resumed from checkpoint" if resumed else f"Scan started ({workers} browser processes)")
+        org_id = await pipeline.load_org_id()
+
+        for i in range(workers):
+            process = ctx.Process(target=_browser_process_main,
+                                  args=(job_id, config_dict, i, workers, page_queue, baseline, org_id))
+            process.start()
+            processes.append(process)
+
+        while len(browser_stats) < workers:
+            try:
+                kind, shard_index, payload = await loop.run_in_executor(None, page_queue.get, True, 1.0)
+            except queue.Empty:
+                for i, process in enumerate(processes):
+                    if i not in browser_stats and not process.is_alive():
+                        logger.error("Browser process exited without reporting", job_id=job_id, shard=i, exitcode=process.exitcode)
+                        raise RuntimeError(f"Browser process {i + 1}/{workers} exited with code {process.exitcode}")
+                continue
+
+            if kind == "page":
+                # Already validated in the browser process.
+                await pipeline.handle_page(PageData.model_construct(**payload))
+            elif kind == "represented":
+                await pipeline.handle_represented(payload["url"], payload["represented_by"])
+            else:
+                browser_stats[shard_index] = payload
+                if payload.get("error"):
+                    raise RuntimeError(f"Browser process {shard_index + 1}/{workers} failed: {payload['error']}")
+
+        totals = next((s["scan"] for s in browser_stats.values() if s.get("scan", {}).get("final")), {})
+        await pipeline.complete({
+            "total_pages_crawled": totals.get("total_pages_crawled", pipeline.pages_handled),
+            "total_pages_discovered": totals.get("total_pages_discovered", 0),
+            "throughput": {
+                "browser": {str(i): {k: v for k, v in s.items() if k != "scan"} for i, s in sorted(browser_stats.items())},
+                "analysis": pipeline.throughput(),
+            },
+            "dedup": {str(i): s.get("scan", {}).get("dedup", {}) for i, s in sorted(browser_stats.items())},
+        })
+    except Exception as e:
+        # The surviving processes would wait in the shared frontier's join() for the dead one's entries.
+        await frontier.abort(str(e))
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        await _mark_job_failed(job_id, str(e))
+        raise
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        await frontier.release_lease()
+        await pipeline.close()
 
     return {"status": "completed", "job_id": job_id}
 
-@celery_app.task(bind=True, name="crawl_job")
+# acks_late + reject_on_worker_lost redeliver the task when its worker dies,
+# which lets a Redis-backed frontier pick up from its last checkpoint.
+@celery_app.task(bind=True, name="crawl_job", acks_late=True, reject_on_worker_lost=True)
 def crawl_job(self, job_id: str, config_dict: Dict[str, Any]):
-    return asyncio.run(_run_crawler(job_id, config_dict))
+    if config_dict.get("shard_count", 1) > 1:
+        return _run_on_worker_loop(_dispatch_shards(job_id, config_dict))
+    if config_dict.get("process_workers", 0) > 0:
+        return _run_on_worker_loop(_run_multiprocess(job_id, config_dict))
+
+    redelivered = (self.request.delivery_info or {}).get("redelivered")
+    if redelivered and config_dict.get("frontier_backend", "memory") != "redis":
+        _run_on_worker_loop(_mark_job_failed(job_id, "Worker lost during scan; in-memory frontier cannot be resumed"))
+        return {"status": "failed", "job_id": job_id}
+    return _run_on_worker_loop(_run_crawler(job_id, config_dict))
+
+@celery_app.task(bind=True, name="crawl_shard", acks_late=True, reject_on_worker_lost=True)
+def crawl_shard(self, job_id: str, config_dict: Dict[str, Any], shard_index: int):
+    return _run_on_worker_loop(_run_crawler(job_id, config_dict, shard_index=shard_index))
@@ -0,0 +1,136 @@
+import hashlib
+import re
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from reqon_types.models import PageData
+
+NUMERIC = re.compile(r"^\d+$")
+HEX_ID = re.compile(r"^(?=.*\d)[0-9a-f]{8,}$|^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+# Three or more words, or long enough to be generated from a title.
+SLUG = re.compile(r"^[\w]+(?:[-_][\w]+){2,}$|^[\w-]{40,}$")
+
+def url_template(url: str) -> str:
+    """
+    Collapses the variable parts of a URL so pages rendered by the same
+    template share a key: numeric and hex/uuid segments become {id}, long
+    slugs become {slug}, and the query keeps its parameter names only.
+
+        https://shop.example.com/p/123/blue-suede-shoes?color=red
+        -> shop.example.com/p/{id}/{slug}?color
+    """
+    parts = urlsplit(url)
+    segments = []
+    for segment in parts.path.split("/"):
+        if not segment:
+            continue
+        if NUMERIC.match(segment) or HEX_ID.match(segment):
+            segments.append("{id}")
+        elif SLUG.match(segment):
+            segments.append("{slug}")
+        else:
+            segments.append(segment.lower())
+    template = parts.netloc.lower() + "/" + "/".join(segments)
+    keys = sorted({key for key, _ in parse_qsl(parts.query, keep_blank_values=True)})
+    if keys:
+        template += "?" + "&".join(keys)
+    return template
+
+def dom_fingerprint(page_data: PageData) -> str:
+    """Coarse structural signature of a rendered page: which building blocks it has, not its content."""
+    dom = page_data.dom_structure
+    elements = dom.get("total_elements", 0)
+    signature = [
+        "form" if dom.get("has_form") else "",
+        "table" if dom.get("has_table") else "",
+        "nav" if dom.get("has_nav") else "",
+        ",".join(sorted(str(t) for t in dom.get("inputs", {}))),
+        str(len(page_data.forms_found)),
+        # Element count in powers of two, so small content differences do not split a template.
+        str(elements.bit_length() if isinstance(elements, int) else 0),
+    ]
+    return hashlib.sha1("|".join(signature).encode()).hexdigest()[:12]
+
+class TemplateSampler:
+    """
+    Crawls at most sample_size pages per URL template; the rest are only
+    recorded as represented by the template's first sampled page, and do
+    not use up the page budget.
+
+    With use_dom_fingerprint, a template whose sampled pages turn out to
+    have different DOM structures is not really one template, so its quota
+    is lifted and every page of it is crawled.
+
+    stats() keeps MAX_EXAMPLES skipped URLs for each of the
+    MAX_REPORTED_TEMPLATES largest templates; the crawler emits every skip
+    as a page_represented event, which the pipeline stores in the graph.
+    """
+
+    MAX_REPORTED_TEMPLATES = 200
+    MAX_EXAMPLES = 10
+
+    def __init__(self, sample_size: int, use_dom_fingerprint: bool = False):
+        self.sample_size = sample_size
+        self.use_dom_fingerprint = use_dom_fingerprint
+        self.templates: Dict[str, Dict[str, Any]] = {}
+
+    def _record(self, template: str) -> Dict[str, Any]:
+        record = self.templates.get(template)
+        if record is None:
+            record = self.templates[template] = {
+                "claimed": 0,
+                "crawled": 0,
+                "represented": 0,
+                "representative": None,
+                "fingerprints": set(),
+                "examples": [],
+            }
+        return record
+
+    def claim(self, url: str) -> Optional[str]:
+        """Returns None if url should be crawled, else the URL it is represented by."""
+        record = self._record(url_template(url))
+        if record["claimed"] < self.sample_size or len(record["fingerprints"]) > 1:
+            record["claimed"] += 1
+            if record["representative"] is None:
+                record["representative"] = url
+            return None
+        record["represented"] += 1
+        if len(record["examples"]) < self.MAX_EXAMPLES:
+            record["examples"].append({"url": url, "represented_by": record["representative"]})
+        return record["representative"]
+
+    def release(self, url: str):
+        """A claimed page was not crawled after all (budget or error); free its slot."""
+        record = self._record(url_template(url))
+        record["claimed"] -= 1
+        if record["representative"] == url and not record["crawled"]:
+            record["representative"] = None
+
+    def observe(self, page_data: PageData) -> str:
+        template = url_template(page_data.url)
+        record = self._record(template)
+        record["crawled"] += 1
+        if self.use_dom_fingerprint:
+            record["fingerprints"].add(dom_fingerprint(page_data))
+        return template
+
+    def stats(self) -> Dict[str, Any]:
+        ranked = sorted(self.templates.items(), key=lambda kv: kv[1]["crawled"] + kv[1]["represented"], reverse=True)
+        return {
+            "sample_size": self.sample_size,
+            "templates_total": len(self.templates),
+            "pages_represented": sum(r["represented"] for r in self.templates.values()),
+            "examples_per_template": self.MAX_EXAMPLES,
+            "templates": {
+                template: {
+                    "crawled": r["crawled"],
+                    "represented": r["represented"],
+                    "coverage": round(r["crawled"] / max(1, r["crawled"] + r["represented"]), 3),
+                    "representative": r["representative"],
+                    "dom_variants": len(r["fingerprints"]),
+                    "examples": r["examples"],
+                }
+                for template, r in ranked[:self.MAX_REPORTED_TEMPLATES]
+            },
+        }
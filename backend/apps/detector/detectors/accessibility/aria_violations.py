@@ -5,6 +5,8 @@ from ..base import BaseDetector
 class AriaViolationsDetector(BaseDetector):
     name = "aria_violations"
     category = "accessibility"
+    inputs = ("page_data", "page")
+    cost = "io"
     
     async def detect(self, page_data: PageData, page: Any | None) -> List[RawIssue]:
         # Usually implemented with an embedded axe-core script injection in Playwright.
@@ -5,6 +5,8 @@ from ..base import BaseDetector
 class ColorOnlyInfoDetector(BaseDetector):
     name = "color_only_info"
     category = "accessibility"
+    inputs = ("page_data", "page")
+    cost = "io"
     
     async def detect(self, page_data: PageData, page: Any | None) -> List[RawIssue]:
         issues = []
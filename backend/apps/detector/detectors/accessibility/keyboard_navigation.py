@@ -5,6 +5,8 @@ from ..base import BaseDetector
 class KeyboardNavigationDetector(BaseDetector):
     name = "keyboard_navigation"
     category = "accessibility"
+    inputs = ("page_data", "page")
+    cost = "io"
     
     async def detect(self, page_data: PageData, page: Any | None) -> List[RawIssue]:
         issues = []
@@ -5,6 +5,8 @@ from ..base import BaseDetector
 class MissingAltTextDetector(BaseDetector):
     name = "missing_alt_text"
     category = "accessibility"
+    inputs = ("page_data", "page")
+    cost = "io"
     
     async def detect(self, page_data: PageData, page: Any | None) -> List[RawIssue]:
         issues = []
@@ -1,16 +1,37 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Tuple
 import uuid
 
 from reqon_types.models import PageData, RawIssue
 
 class BaseDetector(ABC):
+    INPUTS = ("page_data", "page", "network")
+    COSTS = ("light", "cpu", "io")
+
     name: str
     category: str
+    # What detect() reads besides PageData: the live Playwright "page", or the "network" (its own requests).
+    inputs: Tuple[str, ...] = ("page_data",)
+    # How the engine schedules it: "light" runs inline, "cpu" in the static process pool
+    # (pure PageData work such as regexes over the DOM), "io" in the async lane under the concurrency cap.
+    cost: str = "light"
+    # Per-host HostRateLimiter for detectors that make their own requests; set by the engine.
+    rate_limiter: Any = None
+    # Seconds before the engine gives up on this detector; None uses the engine default.
+    timeout: Optional[float] = None
     
+    @property
+    def live(self) -> bool:
+        """Needs the live Playwright page, so runs in the crawler before the tab is released."""
+        return "page" in self.inputs
+
     @abstractmethod
     async def detect(self, page_data: PageData, page: Any | None) -> List[RawIssue]:
         pass
+
+    async def close(self):
+        """Releases resources held across pages, e.g. HTTP clients."""
+        pass
     
     def create_issue(
         self,
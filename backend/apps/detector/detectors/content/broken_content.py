@@ -2,17 +2,22 @@ import re
 from typing import List, Any
 from reqon_types.models import PageData, RawIssue
 from ..base import BaseDetector
+from apps.detector.dom_index import dom_index
+
+TEMPLATE_VARIABLE = re.compile(r'(\{\{\s*[a-zA-Z0-9_]+\s*\}\}|\[\[\s*[a-zA-Z0-9_]+\s*\]\])')
 
 class BrokenContentDetector(BaseDetector):
     name = "broken_content"
     category = "content"
+    cost = "cpu"
     
     async def detect(self, page_data: PageData, page: Any | None) -> List[RawIssue]:
         issues = []
-        dom = page_data.dom_snapshot
+        dom = dom_index(page_data)
         
-        # Heuristics for broken content
-        if "lorem ipsum" in dom.lower():
+        # Heuristics for broken content, on the markup without script bodies:
+        # placeholders in attributes (alt, title, placeholder) count, JS string literals do not.
+        if "lorem ipsum" in dom.markup_lower:
             issues.append(self.create_issue(
                 subcategory="placeholder_text",
                 severity="medium",
@@ -21,7 +26,7 @@ class BrokenContentDetector(BaseDetector):
             ))
             
         # Look for unresolved template variables (e.g. {{ name }}, [[ variable ]])
-        template_vars = re.findall(r'(\{\{\s*[a-zA-Z0-9_]+\s*\}\}|\[\[\s*[a-zA-Z0-9_]+\s*\]\])', dom)
+        template_vars = TEMPLATE_VARIABLE.findall(dom.markup)
         if template_vars:
             issues.append(self.create_issue(
                 subcategory="template_variable",
@@ -1,5 +1,6 @@
 import httpx
 import asyncio
+import time
 from typing import List, Any, Optional
 from urllib.parse import urljoin
 
@@ -9,42 +10,42 @@ from ..base import BaseDetector
 class BrokenLinksDetector(BaseDetector):
     name = "broken_links"
     category = "functional"
+    inputs = ("page_data", "network")
+    cost = "io"
+    MAX_CONCURRENT_CHECKS = 10
+    timeout = 120.0  # pages with hundreds of links, at 10 checks at a time
+
+    def __init__(self):
+        # One pooled client and one concurrency cap for every page of the scan.
+        self._client: Optional[httpx.AsyncClient] = None
+        self._checks = asyncio.Semaphore(self.MAX_CONCURRENT_CHECKS)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(10.0),
+                verify=False,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.MAX_CONCURRENT_CHECKS),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def detect(self, page_data: PageData, page: Any | None) -> List[RawIssue]:
         issues = []
-        timeout = httpx.Timeout(10.0)
         
         async def check_link(href: str) -> Optional[RawIssue]:
             url = urljoin(page_data.url, href)
             if not url.startswith('http') or any(url.startswith(scheme) for scheme in ['mailto:', 'tel:', 'javascript:']):
                 return None
                 
-            try:
-                async with httpx.AsyncClient(timeout=timeout, verify=False) as client:
-                    response = await client.head(url, follow_redirects=True)
-                    if response.status_code >= 400:
-                        severity = "high"
-                        if response.status_code >= 500:
-                            severity = "critical"
-                        elif response.status_code in (401, 403):
-                            severity = "medium"
-                            
-                        return self.create_issue(
-                            subcategory="http_error",
-                            severity=severity,
-                            title=f"Broken link returning HTTP {response.status_code}",
-                            description=f"The link to {url} returned an error status.",
-                            evidence={"url": url, "status_code": response.status_code}
-                        )
-            except httpx.RequestError as exc:
-                return self.create_issue(
-                    subcategory="connection_error",
-                    severity="high",
-                    title=f"Broken link: Connection failed",
-                    description=f"Could not connect to {url}.",
-                    evidence={"url": url, "error": str(exc)}
-                )
-            return None
+            async with self._checks:
+                return await self._check(url)
             
         tasks = [check_link(link) for link in page_data.links_found]
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -54,3 +55,39 @@ class BrokenLinksDetector(BaseDetector):
                 issues.append(res)
                 
         return issues
+
+    async def _check(self, url: str) -> Optional[RawIssue]:
+        if self.rate_limiter:
+            await self.rate_limiter.acquire(url)
+        started = time.monotonic()
+        try:
+            response = await self.client.head(url)
+            if self.rate_limiter:
+                await self.rate_limiter.feedback(url, response.status_code, time.monotonic() - started,
+                                                 response.headers.get("retry-after"))
+            # Being throttled says nothing about the link itself.
+            if response.status_code >= 400 and response.status_code != 429:
+                severity = "high"
+                if response.status_code >= 500:
+                    severity = "critical"
+                elif response.status_code in (401, 403):
+                    severity = "medium"
+                    
+                return self.create_issue(
+                    subcategory="http_error",
+                    severity=severity,
+                    title=f"Broken link returning HTTP {response.status_code}",
+                    description=f"The link to {url} returned an error status.",
+                    evidence={"url": url, "status_code": response.status_code}
+                )
+        except httpx.RequestError as exc:
+            if self.rate_limiter:
+                await self.rate_limiter.feedback(url, 0, time.monotonic() - started)
+            return self.create_issue(
+                subcategory="connection_error",
+                severity="high",
+                title=f"Broken link: Connection failed",
+                description=f"Could not connect to {url}.",
+                evidence={"url": url, "error": str(exc)}
+            )
+        return None
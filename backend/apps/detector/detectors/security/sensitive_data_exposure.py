@@ -1,38 +1,56 @@
-import re
-from typing import List, Any
+from typing import List, Any, Iterator, Tuple
 from reqon_types.models import PageData, RawIssue
 from ..base import BaseDetector
+from apps.detector.dom_index import dom_index
+from apps.detector.secret_scanner import SecretRule, SecretScanner, luhn_valid
 
 class SensitiveDataDetector(BaseDetector):
     name = "sensitive_data_exposure"
     category = "security"
+    cost = "cpu"
     
-    PATTERNS = {
-        "aws_key": r"AKIA[0-9A-Z]{16}",
-        "github_token": r"ghp_[0-9a-zA-Z]{36}",
-        "ssn": r"\b\d{3}-\d{2}-\d{4}\b",
-        "credit_card": r"\b(?:4[0-9]{12}(?:[0-9]{3})?|5[1-5][0-9]{14}|6(?:011|5[0-9][0-9])[0-9]{12}|3[47][0-9]{13}|3(?:0[0-5]|[68][0-9])[0-9]{11}|(?:2131|1800|35\d{3})\d{11})\b",
-        "private_ip": r"\b(?:10\.\d{1,3}\.\d{1,3}\.\d{1,3}|172\.(?:1[6-9]|2\d|3[01])\.\d{1,3}\.\d{1,3}|192\.168\.\d{1,3}\.\d{1,3})\b"
+    RULES = [
+        SecretRule("aws_key", r"AKIA[0-9A-Z]{16}", ("AKIA",), "critical"),
+        SecretRule("github_token", r"ghp_[0-9a-zA-Z]{36}", ("ghp_",), "critical"),
+        SecretRule("ssn", r"\b\d{3}-\d{2}-\d{4}\b"),
+        SecretRule(
+            "credit_card",
+            r"\b(?:4[0-9]{12}(?:[0-9]{3})?|5[1-5][0-9]{14}|6(?:011|5[0-9][0-9])[0-9]{12}|3[47][0-9]{13}|3(?:0[0-5]|[68][0-9])[0-9]{11}|(?:2131|1800|35\d{3})\d{11})\b",
+            validate=luhn_valid,
+        ),
+        SecretRule(
+            "private_ip",
+            r"\b(?:10\.\d{1,3}\.\d{1,3}\.\d{1,3}|172\.(?:1[6-9]|2\d|3[01])\.\d{1,3}\.\d{1,3}|192\.168\.\d{1,3}\.\d{1,3})\b",
+            ("10.", "172.", "192.168."),
+        ),
         # In a real tool we would have much more robust patterns
-    }
+    ]
+    scanner = SecretScanner(RULES)
+
+    def _sources(self, page_data: PageData) -> Iterator[Tuple[str, str]]:
+        dom = dom_index(page_data)
+        yield "dom", dom.markup
+        for script in dom.inline_scripts:
+            yield "inline_script", script
+        for response in page_data.response_bodies:
+            yield response["url"], response["body"]
     
     async def detect(self, page_data: PageData, page: Any | None) -> List[RawIssue]:
         issues = []
+        # One issue per kind of secret, to avoid exploding the report with 100 SSNs on a test page
+        reported = set()
         
-        # Check DOM snapshot for naive occurrences
-        dom = page_data.dom_snapshot
-        
-        for key, pattern in self.PATTERNS.items():
-            matches = re.finditer(pattern, dom)
-            for m in matches:
+        for source, text in self._sources(page_data):
+            for match in self.scanner.scan_text(text, skip=reported):
+                reported.add(match.rule.name)
                 issues.append(self.create_issue(
-                    subcategory="exposed_" + key,
-                    severity="critical" if key in ["aws_key", "github_token"] else "high",
-                    title=f"Sensitive Data Exposed: {key}",
-                    description=f"Possible sensitive {key} found in page source.",
-                    evidence={"match_snippet": "***REDACTED***"}
+                    subcategory="exposed_" + match.rule.name,
+                    severity=match.rule.severity,
+                    title=f"Sensitive Data Exposed: {match.rule.name}",
+                    description=f"Possible sensitive {match.rule.name} found in page source.",
+                    evidence={"match_snippet": "***REDACTED***", "source": source}
                 ))
-                # Break to avoid exploding report with 100 SSNs on a test page
+            if len(reported) == len(self.RULES):
                 break
                 
         return issues
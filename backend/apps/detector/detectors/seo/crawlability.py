@@ -6,6 +6,8 @@ from ..base import BaseDetector
 class CrawlabilityDetector(BaseDetector):
     name = "crawlability"
     category = "seo"
+    inputs = ("page_data", "page")
+    cost = "io"
     
     async def detect(self, page_data: PageData, page: Any | None) -> List[RawIssue]:
         issues = []
@@ -6,6 +6,8 @@ from ..base import BaseDetector
 class StructuredDataDetector(BaseDetector):
     name = "structured_data"
     category = "seo"
+    inputs = ("page_data", "page")
+    cost = "io"
     
     async def detect(self, page_data: PageData, page: Any | None) -> List[RawIssue]:
         issues = []
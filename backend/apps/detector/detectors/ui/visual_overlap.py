@@ -5,6 +5,8 @@ from ..base import BaseDetector
 class VisualOverlapDetector(BaseDetector):
     name = "visual_overlap"
     category = "ui"
+    inputs = ("page_data", "page")
+    cost = "io"
     
     async def detect(self, page_data: PageData, page: Any | None) -> List[RawIssue]:
         issues = []
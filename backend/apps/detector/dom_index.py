@@ -0,0 +1,106 @@
+import re
+from collections import defaultdict
+from functools import cached_property
+from typing import Dict, List, Tuple
+
+from bs4 import BeautifulSoup, Tag
+
+from reqon_types.models import PageData
+
+SCRIPT_BLOCK = re.compile(r"(<script\b[^>]*>)(.*?)(</script\s*>)", re.IGNORECASE | re.DOTALL)
+TAG_BLOCKS = re.compile(r"<(script|style|noscript|template)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+TAGS = re.compile(r"<[^>]+>")
+
+def page_text(html: str) -> str:
+    """Visible-ish text of an HTML snapshot; good enough for fingerprinting."""
+    return TAGS.sub(" ", TAG_BLOCKS.sub(" ", html))
+
+class DomIndex:
+    """
+    Views of one page's DOM snapshot, shared by everything that inspects
+    the page: the raw HTML, its lowercase form, the visible text (and its
+    lowercase form), the markup apart from inline scripts (and its
+    lowercase form) and the scripts themselves, the parse tree and element
+    indexes by tag and by attribute. Each is built the first time it is
+    asked for and kept, so a page whose checks only need a substring
+    search never gets parsed.
+
+    Get it through dom_index(page_data) rather than constructing one, so
+    the crawler, classifier and detectors reuse the same instance.
+    """
+
+    def __init__(self, html: str):
+        self.html = html
+
+    @cached_property
+    def lower(self) -> str:
+        return self.html.lower()
+
+    @cached_property
+    def text(self) -> str:
+        """Text outside tags and script/style blocks, as near-duplicate detection fingerprints it."""
+        return page_text(self.html)
+
+    @cached_property
+    def text_lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def _script_split(self) -> Tuple[str, List[str]]:
+        scripts = []
+
+        def cut(match: re.Match) -> str:
+            if match.group(2).strip():
+                scripts.append(match.group(2))
+            return match.group(1) + match.group(3)
+
+        return SCRIPT_BLOCK.sub(cut, self.html), scripts
+
+    @property
+    def markup(self) -> str:
+        """The HTML with the bodies of its script elements cut out."""
+        return self._script_split[0]
+
+    @cached_property
+    def markup_lower(self) -> str:
+        return self.markup.lower()
+
+    @property
+    def inline_scripts(self) -> List[str]:
+        """Bodies of the page's non-empty script elements, in document order."""
+        return self._script_split[1]
+
+    @cached_property
+    def soup(self) -> BeautifulSoup:
+        return BeautifulSoup(self.html, "html.parser")
+
+    @cached_property
+    def _by_tag(self) -> Dict[str, List[Tag]]:
+        index = defaultdict(list)
+        for element in self.soup.find_all(True):
+            index[element.name].append(element)
+        return index
+
+    @cached_property
+    def _by_attribute(self) -> Dict[str, List[Tag]]:
+        index = defaultdict(list)
+        for elements in self._by_tag.values():
+            for element in elements:
+                for name in element.attrs:
+                    index[name].append(element)
+        return index
+
+    def elements(self, tag: str) -> List[Tag]:
+        """Elements named tag, in document order."""
+        return self._by_tag.get(tag.lower(), [])
+
+    def with_attribute(self, name: str) -> List[Tag]:
+        """Elements carrying attribute name, grouped by tag."""
+        return self._by_attribute.get(name.lower(), [])
+
+def dom_index(page_data: PageData) -> DomIndex:
+    """The DomIndex of page_data's snapshot, created on first use and cached on the PageData."""
+    index = page_data._dom_index
+    if index is None or index.html is not page_data.dom_snapshot:
+        index = page_data._dom_index = DomIndex(page_data.dom_snapshot)
+    return index
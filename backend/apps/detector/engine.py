@@ -1,14 +1,73 @@
+import asyncio
+import contextlib
 import pkgutil
 import inspect
-from typing import List, Dict, Type
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Dict, Optional, Type
 
 from apps.detector.detectors.base import BaseDetector
 from apps.detector.detectors import functional, ui, performance, accessibility, seo, security, content
+from apps.detector.live_page import BatchedPage
+from apps.detector.static_pool import StaticDetectorPool
 from reqon_types.models import PageData, RawIssue
+from reqon_utils.logger import setup_logger
+
+logger = setup_logger("reqon-detector")
+
+@dataclass
+class DetectorResult:
+    detector: str
+    status: str  # "ok", "timeout", "error"
+    duration: float  # seconds
+    issues: List[RawIssue] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "detector": self.detector,
+            "status": self.status,
+            "duration": self.duration,
+            "issues": [issue.model_dump() for issue in self.issues],
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> "DetectorResult":
+        return cls(raw["detector"], raw["status"], raw["duration"],
+                   [RawIssue(**issue) for issue in raw.get("issues", [])], raw.get("error"))
 
 class DefectDetectionEngine:
-    def __init__(self):
+    """
+    Runs every detector on a page concurrently, each bounded by its own
+    timeout (BaseDetector.timeout, else the engine default), routed by its
+    declared cost: "light" detectors run inline, "io" detectors at most
+    concurrency at a time across all pages being analyzed, and "cpu"
+    detectors in a StaticDetectorPool of processes worker processes. A
+    failing or slow detector only loses its own issues.
+
+    Live detectors (BaseDetector.live) need the open Playwright page. The
+    crawler runs them through live_hook() while the tab is still held,
+    their evaluate() calls batched into one round trip by BatchedPage;
+    run() without a page leaves them out.
+    """
+
+    def __init__(self, rate_limiter=None, concurrency: int = 8, timeout: float = 30.0, processes: int = 0,
+                 static_pool: Optional[StaticDetectorPool] = None):
         self.detectors: List[BaseDetector] = self._load_detectors()
+        for detector in self.detectors:
+            if detector.cost not in BaseDetector.COSTS:
+                raise ValueError(f"Unknown cost '{detector.cost}' on {detector.name}, expected one of {BaseDetector.COSTS}")
+            unknown = set(detector.inputs) - set(BaseDetector.INPUTS)
+            if unknown:
+                raise ValueError(f"Unknown inputs {sorted(unknown)} on {detector.name}, expected some of {BaseDetector.INPUTS}")
+            detector.rate_limiter = rate_limiter
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        # A pool passed in outlives the engine (one per Celery worker process); processes is then ignored.
+        self.static_pool = static_pool or StaticDetectorPool(processes, timeout)
+        self._owns_static_pool = static_pool is None
+        self._slots: Optional[asyncio.Semaphore] = None
         
     def _load_detectors(self) -> List[BaseDetector]:
         detectors = []
@@ -23,13 +82,63 @@ class DefectDetectionEngine:
                             detectors.append(obj())
         return detectors
 
-    async def run_all(self, page_data: PageData, page=None) -> List[RawIssue]:
-        issues = []
-        for detector in self.detectors:
+    async def run(self, page_data: PageData, page=None) -> List[DetectorResult]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        detectors = self.detectors if page is not None else [d for d in self.detectors if not d.live]
+        static = [d for d in detectors if d.cost == "cpu"]
+        runs = [self._run_one(d, page_data, page, self._slots if d.cost == "io" else contextlib.nullcontext())
+                for d in detectors if d.cost != "cpu"]
+        if static:
+            runs.append(self._run_static(static, page_data))
+        results: List[DetectorResult] = []
+        for outcome in await asyncio.gather(*runs):
+            results.extend(outcome if isinstance(outcome, list) else [outcome])
+        return results
+
+    async def _run_static(self, detectors: List[BaseDetector], page_data: PageData) -> List[DetectorResult]:
+        started = time.monotonic()
+        try:
+            results = [DetectorResult(*result) for result in await self.static_pool.run(detectors, page_data, self.timeout)]
+        except Exception as e:
+            logger.warning("Static detectors failed", detectors=[d.name for d in detectors], url=page_data.url, error=str(e))
+            return [DetectorResult(d.name, "error", time.monotonic() - started, error=str(e)) for d in detectors]
+        for result in results:
+            if result.status == "timeout":
+                logger.warning("Detector timed out", detector=result.detector, url=page_data.url)
+            elif result.status == "error":
+                logger.warning("Detector failed", detector=result.detector, url=page_data.url, error=result.error)
+        return results
+
+    async def run_live(self, page_data: PageData, page) -> List[DetectorResult]:
+        # Not capped: they are short in-page scripts, and batching only pays off if they go out together.
+        batched = BatchedPage(page)
+        return list(await asyncio.gather(*(
+            self._run_one(d, page_data, batched, contextlib.nullcontext()) for d in self.detectors if d.live
+        )))
+
+    async def live_hook(self, page_data: PageData, page) -> List[Dict[str, Any]]:
+        """AutonomousCrawler live_detection hook; the results travel in page_data.metadata["live_detection"]."""
+        return [result.to_dict() for result in await self.run_live(page_data, page)]
+
+    async def _run_one(self, detector: BaseDetector, page_data: PageData, page, slots) -> DetectorResult:
+        async with slots:
+            started = time.monotonic()
             try:
-                new_issues = await detector.detect(page_data, page)
-                issues.extend(new_issues)
+                issues = await asyncio.wait_for(detector.detect(page_data, page), detector.timeout or self.timeout)
+                return DetectorResult(detector.name, "ok", time.monotonic() - started, list(issues))
+            except asyncio.TimeoutError:
+                logger.warning("Detector timed out", detector=detector.name, url=page_data.url)
+                return DetectorResult(detector.name, "timeout", time.monotonic() - started)
             except Exception as e:
-                import logging
-                logging.error(f"Detector {detector.name} failed: {e}")
-        return issues
+                logger.warning("Detector failed", detector=detector.name, url=page_data.url, error=str(e))
+                return DetectorResult(detector.name, "error", time.monotonic() - started, error=str(e))
+
+    async def run_all(self, page_data: PageData, page=None) -> List[RawIssue]:
+        return [issue for result in await self.run(page_data, page) for issue in result.issues]
+
+    async def close(self):
+        for detector in self.detectors:
+            await detector.close()
+        if self._owns_static_pool:
+            self.static_pool.close()
@@ -0,0 +1,88 @@
+import asyncio
+import re
+from typing import Any, List, Tuple
+
+# Function sources ("() => {...}", "async () => ...", "function () {...}") can be
+# combined; anything else is a plain expression and is evaluated on its own.
+FUNCTION_SOURCE = re.compile(r"^\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)")
+
+COMBINED_SCRIPT = """
+async (args) => {
+    const fns = [%s];
+    return Promise.all(fns.map(async (fn, i) => {
+        try {
+            return {ok: true, value: await fn(args[i])};
+        } catch (e) {
+            return {ok: false, error: String(e && e.message || e)};
+        }
+    }));
+}
+"""
+
+class BatchedPage:
+    """
+    Stands in for a Playwright Page while live detectors run. evaluate()
+    calls made in the same event-loop turn are queued and sent as one
+    combined evaluate, so N detectors cost one round trip to the renderer
+    instead of N. A script that throws only fails its own caller. Other
+    attributes pass through to the real page.
+    """
+
+    def __init__(self, page):
+        self._page = page
+        self._pending: List[Tuple[str, Any, asyncio.Future]] = []
+        self._flushes = set()
+        self.round_trips = 0
+        self.evaluations = 0
+
+    def __getattr__(self, name):
+        return getattr(self._page, name)
+
+    async def evaluate(self, expression: str, arg: Any = None) -> Any:
+        self.evaluations += 1
+        if not FUNCTION_SOURCE.match(expression):
+            self.round_trips += 1
+            return await self._page.evaluate(expression, arg)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            loop.call_soon(self._schedule_flush)
+        self._pending.append((expression, arg, future))
+        return await future
+
+    def _schedule_flush(self):
+        task = asyncio.ensure_future(self._flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self):
+        batch, self._pending = self._pending, []
+        self.round_trips += 1
+        script = COMBINED_SCRIPT % ",\n".join(f"({expression.strip()})" for expression, _, _ in batch)
+        try:
+            outcomes = await self._page.evaluate(script, [arg for _, arg, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0][2].done():
+                    batch[0][2].set_exception(e)
+                return
+            # One script does not even parse, or the page went away: fall back to one evaluate each.
+            for expression, arg, future in batch:
+                self.round_trips += 1
+                try:
+                    result = await self._page.evaluate(expression, arg)
+                except Exception as single:
+                    if not future.done():
+                        future.set_exception(single)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            return
+        for (_, _, future), outcome in zip(batch, outcomes):
+            if future.done():
+                # The detector timed out meanwhile.
+                continue
+            if outcome["ok"]:
+                future.set_result(outcome.get("value"))
+            else:
+                future.set_exception(RuntimeError(outcome["error"]))
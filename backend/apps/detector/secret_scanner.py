@@ -0,0 +1,139 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+@dataclass(frozen=True)
+class SecretRule:
+    """
+    One kind of secret. prefixes are literals every match starts with
+    ("AKIA", "ghp_"); rules that have them are only tried where one occurs.
+    validate, if set, gets the matched text and can reject it (Luhn, entropy).
+    """
+    name: str
+    pattern: str
+    prefixes: Tuple[str, ...] = ()
+    severity: str = "high"
+    validate: Optional[Callable[[str], bool]] = None
+
+@dataclass
+class SecretMatch:
+    rule: SecretRule
+    start: int  # offset in the scanned source
+    value: str
+
+def luhn_valid(number: str) -> bool:
+    digits = [int(c) for c in number if c.isdigit()]
+    checksum = 0
+    for i, digit in enumerate(reversed(digits)):
+        if i % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        checksum += digit
+    return bool(digits) and checksum % 10 == 0
+
+def _prefix_pattern(prefixes: Iterable[str]) -> str:
+    """A regex matching any of prefixes, shaped as a trie so its cost does not grow with their number."""
+    trie: Dict[str, dict] = {}
+    for prefix in prefixes:
+        node = trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        if "" in node:
+            # A shorter prefix already makes this a candidate.
+            return ""
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+class SecretScanner:
+    """
+    Scans text for a whole rule set in one pass, however many rules it has.
+    Rules with literal prefixes are compiled into a single trie-shaped
+    prefilter; where it hits, only the rules owning that prefix are matched,
+    anchored, and only a full match is validated. Rules without a prefix
+    (digit patterns such as SSNs) share one combined regex.
+
+    Input arrives in chunks, so response bodies can be scanned as they are
+    read; the last max_length characters of each chunk are carried into the
+    next so secrets across a boundary are still found. Matches are capped
+    at max_length.
+    """
+
+    def __init__(self, rules: Sequence[SecretRule], max_length: int = 512):
+        self.rules = list(rules)
+        self.max_length = max_length
+        self._by_prefix: Dict[str, List[Tuple[SecretRule, re.Pattern]]] = {}
+        unprefixed = []
+        for rule in self.rules:
+            if rule.prefixes:
+                compiled = re.compile(rule.pattern)
+                for prefix in rule.prefixes:
+                    self._by_prefix.setdefault(prefix, []).append((rule, compiled))
+            else:
+                unprefixed.append(rule)
+        self._prefix_lengths = sorted({len(p) for p in self._by_prefix})
+        self._prefilter = re.compile(_prefix_pattern(self._by_prefix)) if self._by_prefix else None
+        self._unprefixed = {f"r{i}": rule for i, rule in enumerate(unprefixed)}
+        self._combined = re.compile("|".join(
+            f"(?P<{group}>{rule.pattern})" for group, rule in self._unprefixed.items()
+        )) if unprefixed else None
+
+    def scan(self, chunks: Iterable[str], skip: Collection[str] = ()) -> Iterator[SecretMatch]:
+        """
+        Yields the matches in chunks, in order per rule. Rules named in skip
+        are not tried; the caller may add to it while iterating, e.g. to stop
+        at the first match of each rule.
+        """
+        ends: Dict[str, int] = {}
+        window, offset = "", 0
+        for chunk in chunks:
+            window += chunk
+            limit = len(window) - self.max_length
+            if limit <= 1:
+                continue
+            yield from self._scan_window(window, offset, limit, skip, ends)
+            # One character of context stays in front so \b still sees the real neighbour.
+            window, offset = window[limit - 1:], offset + limit - 1
+        if window:
+            yield from self._scan_window(window, offset, len(window), skip, ends)
+
+    def scan_text(self, text: str, chunk_size: int = 256 * 1024, skip: Collection[str] = ()) -> Iterator[SecretMatch]:
+        return self.scan((text[i:i + chunk_size] for i in range(0, len(text), chunk_size)), skip)
+
+    def _scan_window(self, window: str, offset: int, limit: int, skip: Collection[str],
+                     ends: Dict[str, int]) -> Iterator[SecretMatch]:
+        # Every window but the first starts with one character already scanned.
+        start = 1 if offset else 0
+        found: List[Tuple[int, SecretRule, str]] = []
+        if self._prefilter is not None:
+            for hit in self._prefilter.finditer(window, start):
+                position = hit.start()
+                if position >= limit:
+                    break
+                for length in self._prefix_lengths:
+                    for rule, compiled in self._by_prefix.get(window[position:position + length], ()):
+                        if rule.name in skip:
+                            continue
+                        match = compiled.match(window, position, position + self.max_length)
+                        if match:
+                            found.append((position, rule, match.group()))
+        if self._combined is not None:
+            for match in self._combined.finditer(window, start):
+                if match.start() >= limit:
+                    break
+                found.append((match.start(), self._unprefixed[match.lastgroup], match.group()))
+
+        found.sort(key=lambda item: item[0])
+        for position, rule, value in found:
+            absolute = offset + position
+            if rule.name in skip or absolute < ends.get(rule.name, 0):
+                continue
+            if rule.validate is not None and not rule.validate(value):
+                continue
+            ends[rule.name] = absolute + len(value)
+            yield SecretMatch(rule, absolute, value)
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import pickle
+import signal
+import time
+from importlib import import_module
+from typing import Dict, List, Optional, Tuple
+
+import billiard
+
+from reqon_types.models import PageData, RawIssue
+
+# (detector name, status, seconds, issues, error), the fields of an engine DetectorResult.
+StaticResult = Tuple[str, str, float, List[RawIssue], Optional[str]]
+
+_detectors: Dict[str, object] = {}
+# The page a pool worker last unpickled, kept with its DomIndex for the page's other detectors.
+_page: Tuple[Optional[str], Optional[PageData]] = (None, None)
+
+def detector_path(detector) -> str:
+    cls = type(detector)
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+def detect_static(path: str, page_data: PageData) -> StaticResult:
+    """Runs the detector at path on page_data."""
+    detector = _detectors.get(path)
+    if detector is None:
+        module, qualname = path.split(":")
+        detector = _detectors[path] = getattr(import_module(module), qualname)()
+    started = time.monotonic()
+    try:
+        issues = asyncio.run(detector.detect(page_data, None))
+        return (detector.name, "ok", time.monotonic() - started, list(issues), None)
+    except TimeoutError:
+        return (detector.name, "timeout", time.monotonic() - started, [], None)
+    except Exception as e:
+        return (detector.name, "error", time.monotonic() - started, [], str(e))
+
+def _expire(signum, frame):
+    raise TimeoutError()
+
+def run_static(path: str, page_key: str, payload: bytes, timeout: float) -> StaticResult:
+    """
+    Runs the detector at path on the pickled page identified by page_key.
+    Executes in a pool worker, where SIGALRM stops the detector after
+    timeout seconds; re checks for signals while matching, so this also
+    ends a runaway regex.
+    """
+    global _page
+    if _page[0] != page_key:
+        _page = (page_key, pickle.loads(payload))
+    signal.signal(signal.SIGALRM, _expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return detect_static(path, _page[1])
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+def _unwrap(info) -> BaseException:
+    # billiard hands error callbacks an ExceptionInfo around an ExceptionWithTraceback.
+    error = getattr(info, "exception", info)
+    return getattr(error, "exc", error)
+
+def _settle(future: asyncio.Future, result=None, error: Optional[BaseException] = None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+class StaticDetectorPool:
+    """
+    Runs CPU-bound detectors (cost "cpu") in worker processes so regexes
+    over multi-megabyte DOMs do not stall the event loop the crawler and
+    the I/O detectors share. Each detector is its own task, stopped inside
+    the worker once it exceeds its own timeout, so one that hangs costs
+    only its own results. A page is pickled once per call, without its
+    screenshot, and a worker keeps the last page it received, so
+    detectors of one page landing on the same worker share its DomIndex.
+
+    The timeout is enforced in the worker rather than with billiard's time
+    limits: a worker killed on a hard limit takes the tasks queued behind
+    it down too. The page's summed timeouts still bound the wait here in
+    case a detector is stuck where no signal reaches it.
+
+    billiard (Celery's multiprocessing fork) can start the pool from a
+    prefork worker; spawn keeps the workers clear of the parent's loop.
+    With processes=0 the detectors run in threads instead, which yield to
+    the loop at each GIL switch but do not scale past one core.
+    """
+
+    def __init__(self, processes: int = 2, timeout: float = 30.0):
+        self.processes = processes
+        self.timeout = timeout
+        self.pages = 0
+        self._pool = None
+
+    async def run(self, detectors: List, page_data: PageData, timeout: Optional[float] = None) -> List[StaticResult]:
+        """
+        One result per detector, in order. Each detector is bounded by its
+        own timeout attribute, else timeout, else the pool's; one that
+        overruns reports "timeout".
+        """
+        timeouts = [d.timeout or timeout or self.timeout for d in detectors]
+        page_data = page_data.model_copy(update={"screenshot_bytes": None})
+        self.pages += 1
+        if self.processes <= 0:
+            return list(await asyncio.gather(*(
+                self._run_thread(d, page_data, t) for d, t in zip(detectors, timeouts)
+            )))
+
+        # The workers build their own DomIndex; a parsed one would be costly to pickle.
+        page_data._dom_index = None
+        if self._pool is None:
+            self._pool = billiard.get_context("spawn").Pool(self.processes)
+        payload = pickle.dumps(page_data)
+        page_key = f"{os.getpid()}:{id(self)}:{self.pages}"
+        # Tasks of one page may queue behind each other, so none waits past their sum.
+        deadline = time.monotonic() + sum(timeouts)
+        return list(await asyncio.gather(*(
+            self._run_task(d, page_key, payload, t, deadline) for d, t in zip(detectors, timeouts)
+        )))
+
+    async def _run_thread(self, detector, page_data: PageData, timeout: float) -> StaticResult:
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(detect_static, detector_path(detector), page_data), timeout)
+        except asyncio.TimeoutError:
+            return (detector.name, "timeout", time.monotonic() - started, [], None)
+
+    async def _run_task(self, detector, page_key: str, payload: bytes, timeout: float, deadline: float) -> StaticResult:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        started = time.monotonic()
+        self._pool.apply_async(
+            run_static, (detector_path(detector), page_key, payload, timeout),
+            callback=lambda result: loop.call_soon_threadsafe(_settle, future, result),
+            error_callback=lambda info: loop.call_soon_threadsafe(_settle, future, None, _unwrap(info)),
+        )
+        try:
+            return await asyncio.wait_for(future, max(deadline - time.monotonic(), timeout) + 1.0)
+        except asyncio.TimeoutError:
+            return (detector.name, "timeout", time.monotonic() - started, [], None)
+        except Exception as e:
+            return (detector.name, "error", time.monotonic() - started, [], str(e))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
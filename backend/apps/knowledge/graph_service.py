@@ -60,6 +60,32 @@ class KnowledgeGraphService:
             except Exception as e:
                 logger.error(f"Failed to ingest page {page.url} to Neo4j", error=str(e))
 
+    async def link_near_duplicate(self, page_url: str, canonical_url: str):
+        """Points a near-duplicate page at the canonical page that was analyzed in its place."""
+        query = """
+        MATCH (p:Page {url: $url})
+        MERGE (c:Page {url: $canonical_url})
+        MERGE (p)-[:NEAR_DUPLICATE_OF]->(c)
+        """
+        async with self._driver.session() as session:
+            try:
+                await session.run(query, url=page_url, canonical_url=canonical_url)
+            except Exception as e:
+                logger.error(f"Failed to link near-duplicate {page_url} in Neo4j", error=str(e))
+
+    async def link_represented(self, page_url: str, representative_url: str):
+        """Points a page skipped by template sampling at the sampled page of its URL template."""
+        query = """
+        MERGE (p:Page {url: $url})
+        MERGE (r:Page {url: $representative_url})
+        MERGE (p)-[:REPRESENTED_BY]->(r)
+        """
+        async with self._driver.session() as session:
+            try:
+                await session.run(query, url=page_url, representative_url=representative_url)
+            except Exception as e:
+                logger.error(f"Failed to link represented page {page_url} in Neo4j", error=str(e))
+
     async def add_issues(self, page_url: str, issues: List[RawIssue]):
         """Links issues to a Page node."""
         if not issues:
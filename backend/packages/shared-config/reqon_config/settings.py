@@ -25,6 +25,11 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
 
+    # Crawler workers
+    BROWSER_POOL_SIZE: int = 2
+    BROWSER_POOL_MAX_USES: int = 50
+    CRAWL_VISIBILITY_TIMEOUT: int = 24 * 3600  # seconds before the broker redelivers an unacknowledged crawl task
+
     # AI
     ANTHROPIC_API_KEY: Optional[str] = None
 
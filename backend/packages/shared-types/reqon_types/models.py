@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, PrivateAttr
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
@@ -17,22 +17,59 @@ class CrawlerConfig(BaseModel):
     target_url: str
     max_pages: int = 100
     max_depth: int = 5
+    max_duration: int = 0           # seconds of crawling before the scan wraps up, 0 = no time budget
     concurrent_pages: int = 3
+    rate_limit_per_host: float = 10.0  # starting requests/s per host, adapted (AIMD) between rate_limit_min and rate_limit_max
+    rate_limit_burst: int = 20        # requests a host may receive back to back
+    rate_limit_min: float = 0.5
+    rate_limit_max: float = 50.0
+    detector_concurrency: int = 8     # detectors running at once during page analysis
+    detector_timeout: float = 30.0    # seconds per detector and page, unless the detector sets its own
+    detector_processes: int = 2       # worker processes for CPU-bound detectors; 0 runs them in a thread
     page_timeout: int = 30000       # ms
-    wait_after_load: int = 2000     # ms
+    wait_after_load: int = 2000     # ms, "networkidle" readiness only
     respect_robots_txt: bool = True
     include_patterns: List[str] = []
     exclude_patterns: List[str] = []
     auth_config: Optional[AuthConfig] = None
+    auth_session_ttl: int = 1800      # seconds a login's storage state is reused across jobs of the org and target
     capture_screenshots: bool = True
     capture_dom: bool = True
     capture_network: bool = True
     capture_console: bool = True
+    capture_response_bodies: bool = False  # keep text bodies of script/XHR/fetch responses for the secret scan
+    response_body_max_bytes: int = 262144  # per response; larger bodies are skipped
     viewport_width: int = 1920
     viewport_height: int = 1080
     user_agent: str = "ReQon-QA-Bot/1.0"
     extra_headers: Dict[str, str] = {}
     cookies: List[Dict[str, Any]] = []
+    frontier_backend: str = "memory"  # "memory", "redis" (resumable)
+    frontier_strategy: str = "priority"  # "priority" (template novelty, depth, page type, inbound links), "fifo" (breadth-first)
+    template_sample_size: int = 0     # pages crawled per URL template (/product/{id}), 0 = crawl every page
+    template_dom_fingerprint: bool = False  # lift the sample limit for URL templates whose pages differ in DOM structure
+    near_duplicate_detection: bool = False  # SimHash pages; near-duplicates skip detectors and link to their canonical page
+    near_duplicate_distance: int = 3  # max differing SimHash bits (of 64) for a near-duplicate
+    sitemap_seeding: bool = False     # seed the frontier from robots.txt Sitemap: entries, else /sitemap.xml
+    sitemap_max_urls: int = 50000     # cap on URLs taken from sitemaps
+    checkpoint_interval: int = 25     # pages between frontier checkpoints
+    shard_count: int = 1              # >1 splits the job across crawl_shard tasks (Redis frontier)
+    process_workers: int = 0          # >0 runs that many browser processes on one worker host
+    process_queue_size: int = 32      # pages buffered between browser and analysis processes
+    tab_max_uses: int = 50            # navigations before a pooled tab is recycled
+    tab_keep_storage: bool = True     # keep localStorage between navigations of a pooled tab
+    interception_profile: str = "full"  # "full", "no-media", "first-party-only", "html+js"
+    dedup_backend: str = "exact"      # "exact", "compact" (64-bit digests, ~16 B/URL), "bloom" (scalable Bloom filter); memory frontier only
+    dedup_error_rate: float = 0.001   # false-positive bound of the "bloom" backend
+    canonical_strip_params: List[str] = []   # extra query params dropped from URL identity, globs allowed ("ref", "aff_*")
+    canonical_lowercase_path: bool = False   # treat paths as case-insensitive
+    canonical_rewrites: List[Dict[str, str]] = []  # [{"pattern": regex, "replacement": str}] applied to canonical URLs
+    fetch_mode: str = "browser"       # "browser", "hybrid" (HTTP first, Chromium when a page needs JS), "http" (no rendering; credentials auth still logs in with a browser)
+    readiness_strategy: str = "adaptive"  # "adaptive", "networkidle" (networkidle + wait_after_load)
+    readiness_quiet_ms: int = 500     # ms without DOM mutations before a page counts as settled
+    readiness_max_wait: int = 10000   # ms, upper bound on the adaptive wait after DOMContentLoaded
+    incremental: bool = False         # revalidate pages of the baseline scan; unchanged pages keep its issues instead of rerunning detectors
+    baseline_scan_id: Optional[str] = None  # scan to compare against, default: latest completed scan of the same org and target
 
 class PageData(BaseModel):
     url: str
@@ -52,7 +89,10 @@ class PageData(BaseModel):
     interactive_elements: List[Dict[str, Any]]
     metadata: Dict[str, Any]
     crawled_at: datetime
+    response_bodies: List[Dict[str, str]] = []  # [{"url", "body"}] of script/XHR/fetch responses, with capture_response_bodies
     model_config = ConfigDict(arbitrary_types_allowed=True)
+    # Parsed views of dom_snapshot (apps.detector.dom_index); built on demand, never serialized.
+    _dom_index: Any = PrivateAttr(default=None)
 
 class RawIssue(BaseModel):
     detector_name: str
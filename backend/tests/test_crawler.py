@@ -0,0 +1,1401 @@
+import pytest
+import asyncio
+from datetime import datetime
+import gzip
+import hashlib
+import queue
+import threading
+from unittest.mock import MagicMock
+
+import httpx
+
+from reqon_types.models import AuthConfig, CrawlerConfig, PageData
+from apps.crawler import crawler as crawler_module
+from apps.crawler import scope as scope_module
+from apps.crawler import tasks as tasks_module
+from apps.crawler.crawler import AutonomousCrawler, CrawlerEvent
+from apps.crawler.auth import AuthSession
+from apps.crawler.canonicalizer import UrlCanonicalizer
+from apps.crawler.dedup import make_hash_set
+from apps.crawler.http_fetcher import HttpFetcher
+from apps.crawler.incremental import content_hash
+from apps.crawler.frontier import FrontierEntry, MemoryFrontier
+from apps.crawler.interception import InterceptionProfile
+from apps.crawler.neardup import NearDuplicateIndex, simhash
+from apps.crawler.priority import PriorityScorer
+from apps.crawler.rate_limit import HostRateLimiter, retry_after_seconds
+from apps.crawler.readiness import ReadinessEngine
+from apps.crawler.scope import RobotsPolicy, ScopeMatcher
+from apps.crawler.sitemap import SitemapReader, parse_lastmod
+from apps.crawler.tab_pool import TabPool
+from apps.crawler.url_templates import TemplateSampler, url_template
+from apps.detector.detectors.functional.broken_links import BrokenLinksDetector
+from apps.detector.dom_index import page_text
+
+
+class FakePlaywright:
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+def make_page_data(crawler, url, depth, parent_url):
+    return PageData(
+        url=url,
+        url_hash=crawler._hash_url(url),
+        title=url,
+        http_status=200,
+        depth=depth,
+        parent_url=parent_url,
+        dom_snapshot="<html></html>",
+        dom_structure={},
+        console_logs=[],
+        network_requests=[],
+        performance_metrics={},
+        links_found=[],
+        forms_found=[],
+        interactive_elements=[],
+        metadata={},
+        crawled_at=datetime.utcnow()
+    )
+
+
+@pytest.fixture
+def site_crawler(monkeypatch):
+    """Crawler over an in-memory site graph with no real browser."""
+    site = {
+        "https://example.com": ["https://example.com/slow", "https://example.com/a", "https://example.com/b"],
+        "https://example.com/slow": [],
+        "https://example.com/a": ["https://example.com/c", "https://example.com"],
+        "https://example.com/b": ["https://other.com/x"],
+        "https://example.com/c": [],
+    }
+    crawler = AutonomousCrawler()
+    crawler.order = []
+
+    async def fake_setup_browser(config):
+        return None, FakeContext()
+
+    async def fake_process_url(url, depth, parent_url, config):
+        await asyncio.sleep(0.2 if url.endswith("/slow") else 0.01)
+        crawler.order.append(url)
+        links = site[url]
+        page_data = make_page_data(crawler, url, depth, parent_url)
+        page_data.links_found = links
+        return page_data, links
+
+    async def no_robots(origin, user_agent, client=None):
+        return None
+
+    monkeypatch.setattr(scope_module, "fetch_robots_txt", no_robots)
+    monkeypatch.setattr(scope_module, "_robots_cache", {})
+    monkeypatch.setattr(crawler_module, "async_playwright", lambda: FakePlaywright())
+    monkeypatch.setattr(crawler, "_setup_browser", fake_setup_browser)
+    monkeypatch.setattr(crawler, "_process_url", fake_process_url)
+    return crawler
+
+
+async def collect(crawler, config):
+    return [event async for event in crawler.start(config)]
+
+
+@pytest.mark.asyncio
+async def test_slow_page_does_not_block_other_slots(site_crawler):
+    config = CrawlerConfig(target_url="https://example.com", concurrent_pages=2)
+    events = await collect(site_crawler, config)
+
+    crawled = [e.data["url"] for e in events if e.event_type == "page_crawled"]
+    assert sorted(crawled) == sorted([
+        "https://example.com", "https://example.com/slow", "https://example.com/a",
+        "https://example.com/b", "https://example.com/c"
+    ])
+    # /c is discovered after the slow page started and still finishes first
+    assert site_crawler.order.index("https://example.com/c") < site_crawler.order.index("https://example.com/slow")
+    assert events[0].event_type == "scan_started"
+    assert events[-1].event_type == "scan_completed"
+    assert events[-1].data["total_pages_crawled"] == 5
+
+
+@pytest.mark.asyncio
+async def test_worker_errors_never_stall_the_scan(site_crawler, monkeypatch):
+    config = CrawlerConfig(target_url="https://example.com", concurrent_pages=2)
+    acquire = HostRateLimiter.acquire
+    failed = []
+
+    async def flaky_acquire(self, url):
+        if url.endswith("/b") and not failed:
+            failed.append(url)
+            raise ConnectionError("redis went away")
+        return await acquire(self, url)
+
+    monkeypatch.setattr(HostRateLimiter, "acquire", flaky_acquire)
+    events = await asyncio.wait_for(collect(site_crawler, config), 5)
+    # The entry is given up, its reservation returned, and the scan still completes.
+    assert failed == ["https://example.com/b"]
+    assert events[-1].event_type == "scan_completed"
+    assert events[-1].data["total_pages_crawled"] == 4
+    assert events[-1].data["error"] is None
+
+    # A frontier that fails outside any visit aborts the scan instead of hanging it.
+    async def broken_get():
+        raise ConnectionError("redis went away")
+
+    crawler = site_crawler
+    crawler.frontier = MemoryFrontier()
+    monkeypatch.setattr(crawler.frontier, "get", broken_get)
+    seen = []
+    with pytest.raises(ConnectionError):
+        async with asyncio.timeout(5):
+            async for event in crawler.start(config):
+                seen.append(event)
+    assert seen[-1].event_type == "scan_completed"
+    assert seen[-1].data["error"] == "redis went away"
+
+
+@pytest.mark.asyncio
+async def test_max_pages_and_depth_respected(site_crawler):
+    config = CrawlerConfig(target_url="https://example.com", concurrent_pages=3, max_pages=3, max_depth=1)
+    events = await collect(site_crawler, config)
+
+    crawled = [e for e in events if e.event_type == "page_crawled"]
+    assert len(crawled) == 3
+    assert all(e.data["depth"] <= 1 for e in crawled)
+    assert events[-1].data["total_pages_crawled"] == 3
+
+
+class FakeTabPage:
+    def __init__(self):
+        self.handlers = {}
+        self.closed = False
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def is_closed(self):
+        return self.closed
+
+    async def evaluate(self, *args):
+        return None
+
+    async def goto(self, url, **kwargs):
+        return None
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+        self.init_scripts = []
+
+    async def new_page(self):
+        page = FakeTabPage()
+        self.pages.append(page)
+        return page
+
+    async def add_init_script(self, script):
+        self.init_scripts.append(script)
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_tab_pool_reuses_and_recycles_tabs():
+    context = FakeContext()
+    pool = TabPool(context, size=1, max_uses=2)
+
+    first = await pool.acquire()
+    first.page.handlers["console"](MagicMock(type="log", text="one"))
+    captured = first.capture.console_logs
+    await pool.release(first)
+
+    second = await pool.acquire()
+    assert second is first
+    assert second.capture.console_logs == []
+    assert captured == [{"type": "log", "text": "one"}]
+    await pool.release(second)
+
+    # max_uses reached: the tab is closed and a new one opened
+    assert first.page.closed
+    third = await pool.acquire()
+    assert third is not first
+    third.page.handlers["crash"](None)
+    await pool.release(third)
+    assert third.page.closed
+    assert len(context.pages) == 2
+
+
+def test_interception_profiles():
+    no_media = InterceptionProfile("no-media", "https://www.example.com")
+    assert no_media.blocks("image", "https://www.example.com/a.png")
+    assert not no_media.blocks("script", "https://cdn.other.com/app.js")
+
+    first_party = InterceptionProfile("first-party-only", "https://www.example.com")
+    assert not first_party.blocks("script", "https://static.example.com/app.js")
+    assert first_party.blocks("script", "https://tracker.other.com/t.js")
+    assert not first_party.blocks("document", "https://login.other.com/")
+
+    html_js = InterceptionProfile("html+js", "https://example.com")
+    assert html_js.blocks("stylesheet", "https://example.com/a.css")
+    assert not html_js.blocks("fetch", "https://api.example.com/items")
+
+    assert not InterceptionProfile("full", "https://example.com").active
+    with pytest.raises(ValueError):
+        InterceptionProfile("everything", "https://example.com")
+
+
+class SettlingPage(FakeTabPage):
+    """Reports the DOM as quiet after a number of checks."""
+
+    def __init__(self, busy_checks):
+        super().__init__()
+        self.busy_checks = busy_checks
+        self.goto_kwargs = None
+
+    async def goto(self, url, **kwargs):
+        self.goto_kwargs = kwargs
+        return MagicMock(status=200)
+
+    async def evaluate(self, script, arg=None):
+        self.busy_checks -= 1
+        return self.busy_checks < 0
+
+
+@pytest.mark.asyncio
+async def test_adaptive_readiness_waits_for_dom_and_network():
+    context = FakeContext()
+    pool = TabPool(context, size=1)
+    tab = await pool.acquire()
+    page = SettlingPage(busy_checks=2)
+    config = CrawlerConfig(target_url="https://example.com", readiness_quiet_ms=10, readiness_max_wait=2000)
+    engine = ReadinessEngine(config)
+
+    request = MagicMock()
+    tab._on_request(request)
+    assert not tab.capture.network_quiet(ReadinessEngine.LONG_REQUEST_SECONDS)
+    asyncio.get_running_loop().call_later(0.1, tab._on_request_done, request)
+
+    response, readiness = await engine.navigate(page, "https://example.com", tab.capture)
+    assert response.status == 200
+    assert page.goto_kwargs["wait_until"] == "domcontentloaded"
+    assert readiness["strategy"] == "adaptive"
+    assert readiness["outcome"] == "quiet"
+    assert 100 <= readiness["waited_ms"] < 2000
+
+    # A page that never settles is cut off at readiness_max_wait.
+    bounded = ReadinessEngine(config.model_copy(update={"readiness_max_wait": 200}))
+    _, readiness = await bounded.navigate(SettlingPage(busy_checks=10**6), "https://example.com", tab.capture)
+    assert readiness["outcome"] == "max_wait"
+    assert readiness["waited_ms"] < 1000
+
+    with pytest.raises(ValueError):
+        ReadinessEngine(config.model_copy(update={"readiness_strategy": "sleep"}))
+
+
+STATIC_SITE = {
+    "/": """<html><head><title>Home</title></head><body>
+        <nav><a href="/docs">Docs</a> <a href="https://other.com/">Other</a> <a href="mailto:x@example.com">Mail</a></nav>
+        <h1>Welcome</h1><p>""" + "Server rendered content. " * 10 + """</p>
+        <form action="/search"><input name="q" required><select name="s"></select></form>
+        <script src="/app.js"></script></body></html>""",
+    "/docs": """<html><head><title>Docs</title></head><body><h2>Docs</h2><p>""" + "Reference text. " * 10 + """</p></body></html>""",
+    "/spa": """<html><head><title>App</title></head><body><div id="root"></div><script src="/bundle.js"></script></body></html>""",
+}
+
+
+def static_transport(request):
+    html = STATIC_SITE.get(request.url.path)
+    if html is None:
+        return httpx.Response(404, text="not found", headers={"content-type": "text/plain"})
+    return httpx.Response(200, text=html, headers={"content-type": "text/html; charset=utf-8"})
+
+
+@pytest.mark.asyncio
+async def test_http_fetcher_builds_page_data_and_detects_spa():
+    fetcher = HttpFetcher(CrawlerConfig(target_url="https://example.com"))
+    fetcher.client = httpx.AsyncClient(transport=httpx.MockTransport(static_transport))
+
+    page_data, needs_js = await fetcher.fetch("https://example.com/", "hash", 0, None)
+    assert needs_js is None
+    assert page_data.title == "Home"
+    assert page_data.links_found == ["https://example.com/docs", "https://other.com/"]
+    assert page_data.dom_structure["headings"] == ["Welcome"]
+    assert page_data.dom_structure["has_nav"]
+    assert page_data.forms_found == [{
+        "id": "", "action": "https://example.com/search", "method": "get",
+        "inputs": [{"name": "q", "type": "text", "required": True}, {"name": "s", "type": "select-one", "required": False}],
+    }]
+    assert page_data.network_requests[0]["headers"]["content-type"].startswith("text/html")
+
+    _, needs_js = await fetcher.fetch("https://example.com/spa", "hash", 0, None)
+    assert needs_js == "spa_root"
+    await fetcher.close()
+
+
+@pytest.mark.asyncio
+async def test_http_fetcher_escalates_failed_requests_in_hybrid_mode():
+    def refused(request):
+        raise httpx.ConnectError("connection reset", request=request)
+
+    for mode in ("hybrid", "http"):
+        fetcher = HttpFetcher(CrawlerConfig(target_url="https://example.com", fetch_mode=mode))
+        fetcher.client = httpx.AsyncClient(transport=httpx.MockTransport(refused))
+        if mode == "http":
+            # No browser to fall back to; the crawler logs and skips the page as before.
+            with pytest.raises(httpx.ConnectError):
+                await fetcher.fetch("https://example.com/", "hash", 0, None)
+        else:
+            page_data, needs_js = await fetcher.fetch("https://example.com/", "hash", 0, None)
+            assert needs_js == "http_error" and page_data.http_status == 0
+            assert page_data.network_requests[0]["error"] == "connection reset"
+        await fetcher.close()
+
+
+@pytest.mark.asyncio
+async def test_http_mode_never_launches_a_browser(monkeypatch):
+    crawler = AutonomousCrawler()
+    original_init = HttpFetcher.__init__
+
+    def init_with_transport(self, config):
+        original_init(self, config)
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(static_transport))
+
+    async def no_browser(config):
+        raise AssertionError("browser launched in http mode")
+
+    monkeypatch.setattr(HttpFetcher, "__init__", init_with_transport)
+    monkeypatch.setattr(crawler, "_open_browser", no_browser)
+
+    events = await collect(crawler, CrawlerConfig(target_url="https://example.com/", fetch_mode="http"))
+    crawled = {e.data["url"]: e.data["page_data"] for e in events if e.event_type == "page_crawled"}
+    assert set(crawled) == {"https://example.com/", "https://example.com/docs"}
+    assert crawled["https://example.com/"].metadata["fetch"] == {"mode": "http", "needs_js": None}
+
+
+def test_url_canonicalization():
+    canon = UrlCanonicalizer(CrawlerConfig(
+        target_url="https://shop.example.com",
+        canonical_strip_params=["ref"],
+        canonical_rewrites=[{"pattern": r"/p/(\d+)/[^/?]+", "replacement": r"/p/\1"}],
+    ))
+    same = [
+        "https://Shop.Example.com:443/list?b=2&a=1",
+        "https://shop.example.com/list/?a=1&b=2&utm_source=mail&gclid=x",
+        "https://shop.example.com/list?a=1&b=2&ref=home#reviews",
+        "https://shop.example.com/list;jsessionid=ABC?PHPSESSID=1&a=1&b=2",
+    ]
+    assert {canon.canonicalize(u) for u in same} == {"https://shop.example.com/list?a=1&b=2"}
+    assert canon.hash(same[0]) == canon.hash(same[1])
+
+    assert canon.canonicalize("http://shop.example.com:8080/Docs/Index.html") == "http://shop.example.com:8080/Docs"
+    assert canon.canonicalize("https://shop.example.com/p/42/blue-shoes") == "https://shop.example.com/p/42"
+    assert canon.canonicalize("https://shop.example.com/list?page=2") != canon.canonicalize("https://shop.example.com/list?page=3")
+
+    fresh = UrlCanonicalizer()
+    # Dedup lookups and page hashes are not counted, only links offered to the frontier, once per rule.
+    fresh.hash("https://example.com/?utm_source=a&utm_medium=b")
+    assert fresh.stats() == {}
+    fresh.hash("https://example.com/?utm_source=a&utm_medium=b", count=True)
+    assert fresh.stats() == {"tracking": 1}
+
+
+@pytest.mark.asyncio
+async def test_scan_reports_duplicate_url_hits(site_crawler):
+    events = await collect(site_crawler, CrawlerConfig(target_url="https://example.com"))
+    dedup = events[-1].data["dedup"]
+    # /a links back to the seed, which is already discovered.
+    assert dedup["links_offered"] == 5
+    assert dedup["duplicate_hits"] == 1
+
+
+@pytest.mark.parametrize("backend", ["exact", "compact", "bloom"])
+def test_dedup_backends(backend):
+    hashes = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(5000)]
+    unseen = [hashlib.sha256(f"other-{i}".encode()).hexdigest() for i in range(5000)]
+    store = make_hash_set(backend, error_rate=0.01)
+
+    added = sum(store.add(h) for h in hashes)
+    assert all(h in store for h in hashes)
+    assert not store.add(hashes[0])
+    false_positives = sum(h in store for h in unseen)
+    if backend == "bloom":
+        assert added >= 4950 and false_positives <= 100
+    else:
+        assert added == len(store) == 5000 and false_positives == 0
+    assert store.memory_bytes() > 0
+
+
+@pytest.mark.asyncio
+async def test_scan_reports_dedup_memory(site_crawler):
+    events = await collect(site_crawler, CrawlerConfig(target_url="https://example.com", dedup_backend="compact"))
+    memory = events[-1].data["dedup"]["memory"]
+    assert memory["backend"] == "compact"
+    assert memory["visited_bytes"] > 0
+    assert events[-1].data["total_pages_crawled"] == 5
+
+
+def test_scope_matcher_patterns_and_robots():
+    robots = RobotsPolicy("User-agent: *\nDisallow: /private\nCrawl-delay: 2\n", "ReQon-QA-Bot/1.0")
+    scope = ScopeMatcher(CrawlerConfig(
+        target_url="https://example.com",
+        include_patterns=["/docs/*", "re:/blog/\\d{4}/"],
+        exclude_patterns=["*.pdf", "https://example.com/docs/old/*"],
+    ), robots)
+
+    assert scope.allows("https://example.com/docs/intro")
+    assert scope.allows("https://example.com/blog/2024/post")
+    assert not scope.allows("https://example.com/blog/latest")
+    assert not scope.allows("https://example.com/docs/guide.pdf")
+    assert not scope.allows("https://example.com/docs/old/v1")
+    assert not scope.allows("https://other.com/docs/intro")
+    assert scope.crawl_delay == 2
+
+    open_scope = ScopeMatcher(CrawlerConfig(target_url="https://example.com"), robots)
+    assert not open_scope.allows("https://example.com/private/a")
+    assert open_scope.allows("https://example.com/public")
+    assert scope.stats() == {"not_included": 1, "excluded": 2, "off_site": 1, "crawl_delay": 2.0}
+
+
+@pytest.mark.asyncio
+async def test_excluded_links_never_reach_the_frontier(site_crawler):
+    config = CrawlerConfig(target_url="https://example.com", exclude_patterns=["/slow", "/a"])
+    events = await collect(site_crawler, config)
+    assert set(site_crawler.order) == {"https://example.com", "https://example.com/b"}
+    assert events[-1].data["total_pages_discovered"] == 2
+    assert events[-1].data["scope"] == {"excluded": 2, "off_site": 1}
+
+
+def test_priority_scorer_prefers_novel_templates():
+    assert url_template("https://Shop.example.com/p/123/blue-suede-shoes?color=red&size=9") == "shop.example.com/p/{id}/{slug}?color&size"
+    assert url_template("https://example.com/about-us") == "example.com/about-us"
+
+    scorer = PriorityScorer()
+    first, _ = scorer.score("https://example.com/p/1", "h1", 1)
+    second, _ = scorer.score("https://example.com/p/2", "h2", 1)
+    login, _ = scorer.score("https://example.com/login", "h3", 1)
+    deep, _ = scorer.score("https://example.com/careers", "h4", 4)
+    assert second < first
+    assert login > first
+    assert deep < first
+
+    # Repeat sightings only ever raise the priority, with diminishing returns.
+    _, bump_1 = scorer.score("https://example.com/p/2", "h2", 1)
+    _, bump_2 = scorer.score("https://example.com/p/2", "h2", 1)
+    assert bump_1 > bump_2 > 0
+
+
+@pytest.mark.asyncio
+async def test_memory_frontier_pops_by_priority():
+    frontier = MemoryFrontier()
+    await frontier.offer([
+        FrontierEntry("https://example.com/a", "a", priority=10),
+        FrontierEntry("https://example.com/b", "b", priority=50),
+        FrontierEntry("https://example.com/c", "c", priority=10),
+    ])
+    await frontier.bump({"c": 5.0, "unknown": 5.0})
+    order = []
+    for _ in range(3):
+        entry = await frontier.get()
+        order.append(entry.url_hash)
+        await frontier.task_done(entry)
+    assert order == ["b", "c", "a"]
+    # The superseded copy of "c" does not hold up join().
+    await asyncio.wait_for(frontier.join(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_time_budget_ends_the_scan(site_crawler, monkeypatch):
+    clock = [1000.0]
+    # Only the crawler's clock; the event loop keeps real time.
+    monkeypatch.setattr(crawler_module, "time", MagicMock(monotonic=lambda: clock[0]))
+    original = site_crawler._process_url
+
+    async def slow_clock(url, depth, parent_url, config):
+        clock[0] += 1.0
+        return await original(url, depth, parent_url, config)
+
+    monkeypatch.setattr(site_crawler, "_process_url", slow_clock)
+    events = await collect(site_crawler, CrawlerConfig(target_url="https://example.com", max_duration=2, concurrent_pages=1))
+    assert events[-1].data["total_pages_crawled"] == 2
+    assert events[-1].data["frontier"]["time_budget_exhausted"]
+
+
+def test_template_sampler_represents_the_rest():
+    sampler = TemplateSampler(sample_size=2)
+    urls = [f"https://shop.example.com/product/{i}" for i in range(5)]
+    decisions = [sampler.claim(url) for url in urls]
+    assert decisions[:2] == [None, None]
+    assert decisions[2:] == [urls[0]] * 3
+
+    for url in urls[:2]:
+        sampler.observe(make_page_data(AutonomousCrawler(), url, 1, None))
+    stats = sampler.stats()
+    product = stats["templates"]["shop.example.com/product/{id}"]
+    assert (product["crawled"], product["represented"], product["coverage"]) == (2, 3, 0.4)
+    assert stats["pages_represented"] == 3
+
+
+@pytest.mark.asyncio
+async def test_crawler_reports_every_represented_page(site_crawler, monkeypatch):
+    products = [f"https://example.com/product/{i}" for i in range(20)]
+
+    async def catalog(url, depth, parent_url, config):
+        links = products if url == "https://example.com" else []
+        page_data = make_page_data(site_crawler, url, depth, parent_url)
+        page_data.links_found = links
+        return page_data, links
+
+    monkeypatch.setattr(site_crawler, "_process_url", catalog)
+    monkeypatch.setattr(TemplateSampler, "MAX_EXAMPLES", 2)
+    events = await collect(site_crawler, CrawlerConfig(target_url="https://example.com", template_sample_size=1))
+    represented = {e.data["url"]: e.data["represented_by"] for e in events if e.event_type == "page_represented"}
+    crawled = [e.data["url"] for e in events if e.event_type == "page_crawled"]
+    sampled = next(url for url in crawled if "/product/" in url)
+    # Beyond the examples kept in the stats, every skipped URL is reported.
+    assert represented == {url: sampled for url in products if url != sampled}
+    assert len(events[-1].data["templates"]["templates"]["example.com/product/{id}"]["examples"]) == 2
+
+
+def test_template_sampler_splits_on_dom_structure():
+    sampler = TemplateSampler(sample_size=1, use_dom_fingerprint=True)
+    crawler = AutonomousCrawler()
+    assert sampler.claim("https://example.com/item/1") is None
+    sampler.observe(make_page_data(crawler, "https://example.com/item/1", 1, None))
+    assert sampler.claim("https://example.com/item/2") == "https://example.com/item/1"
+
+    # A structurally different page of the same URL template lifts the quota.
+    other = make_page_data(crawler, "https://example.com/item/3", 1, None)
+    other.dom_structure = {"has_form": True, "total_elements": 400}
+    sampler.observe(other)
+    assert sampler.claim("https://example.com/item/4") is None
+
+
+def test_near_duplicate_index():
+    article = " ".join(f"word{i % 97} term{i % 13}" for i in range(300))
+    printer_view = "<html><body><p>" + article + "</p><footer>Printed copy</footer></body></html>"
+    original = "<html><body><nav>Home</nav><p>" + article + "</p><script>var x = 1;</script></body></html>"
+    unrelated = "<html><body><p>" + " ".join(f"other{i} thing{i % 7}" for i in range(300)) + "</p></body></html>"
+
+    assert "var x" not in page_text(original)
+    assert simhash("too short") is None
+
+    index = NearDuplicateIndex(max_distance=3)
+    assert index.check("https://example.com/a", simhash(page_text(original))) is None
+    assert index.check("https://example.com/a?print=1", simhash(page_text(printer_view))) == "https://example.com/a"
+    assert index.check("https://example.com/b", simhash(page_text(unrelated))) is None
+    assert index.stats()["indexed"] == 2
+    assert index.stats()["near_duplicates"] == 1
+
+    bounded = NearDuplicateIndex(capacity=1)
+    bounded.add("https://example.com/1", 1)
+    bounded.add("https://example.com/2", 2 ** 40)
+    assert bounded.stats()["indexed"] == 1
+
+
+BUNDLE = {
+    "title": "Checkout",
+    "html": "<html><body><form id='pay'></form></body></html>",
+    "dom_structure": {
+        "headings": ["Checkout"], "buttons": ["Pay"], "images": [], "inputs": {"text": 1},
+        "total_elements": 9, "visible_text_length": 120, "has_form": True, "has_table": False, "has_nav": False,
+    },
+    "links": ["https://example.com/cart", "https://example.com/cart", "mailto:help@example.com"],
+    "forms": [{"id": "pay", "action": "https://example.com/pay", "method": "post",
+               "inputs": [{"name": "card", "type": "text", "required": True}]}],
+    "performance": {"load_time": 40, "dom_ready": 20, "ttfb": 5},
+}
+
+
+class BundlePage(FakeTabPage):
+    """Answers the extraction script the way a page rendering BUNDLE would."""
+
+    async def evaluate(self, script, opts=None):
+        if opts is None:
+            return None
+        return {**BUNDLE, "links": list(BUNDLE["links"]), "html": BUNDLE["html"] if opts["captureDom"] else ""}
+
+
+class BundleContext(FakeContext):
+    async def new_page(self):
+        page = BundlePage()
+        self.pages.append(page)
+        return page
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("capture_dom", [True, False])
+async def test_page_bundle_fills_page_data(monkeypatch, capture_dom):
+    crawler = AutonomousCrawler()
+
+    async def fake_setup_browser(config):
+        return None, BundleContext()
+
+    async def fake_navigate(self, page, url, capture):
+        return None, {}
+
+    async def no_robots(origin, user_agent, client=None):
+        return None
+
+    monkeypatch.setattr(scope_module, "fetch_robots_txt", no_robots)
+    monkeypatch.setattr(scope_module, "_robots_cache", {})
+    monkeypatch.setattr(crawler_module, "async_playwright", lambda: FakePlaywright())
+    monkeypatch.setattr(crawler, "_setup_browser", fake_setup_browser)
+    monkeypatch.setattr(ReadinessEngine, "navigate", fake_navigate)
+
+    config = CrawlerConfig(target_url="https://example.com/", max_depth=0, capture_screenshots=False, capture_dom=capture_dom)
+    events = await collect(crawler, config)
+    page_data = next(e.data["page_data"] for e in events if e.event_type == "page_crawled")
+    assert page_data.title == "Checkout"
+    assert page_data.dom_structure == BUNDLE["dom_structure"]
+    assert page_data.forms_found == BUNDLE["forms"]
+    assert page_data.performance_metrics == BUNDLE["performance"]
+    # Deduplicated, and only links the crawler can follow.
+    assert page_data.links_found == ["https://example.com/cart"]
+    assert page_data.dom_snapshot == (BUNDLE["html"] if capture_dom else "")
+
+
+@pytest.mark.asyncio
+async def test_live_detectors_skip_near_duplicate_pages(monkeypatch):
+    article = "<html><body><p>" + " ".join(f"word{i}" for i in range(200)) + "</p></body></html>"
+    site = {
+        "https://example.com/": ("<html><body><p>Home page</p></body></html>", ["https://example.com/a", "https://example.com/a?print=1"]),
+        "https://example.com/a": (article, []),
+        "https://example.com/a?print=1": (article, []),
+    }
+    crawler = AutonomousCrawler()
+    live = []
+
+    async def fake_setup_browser(config):
+        return None, FakeContext()
+
+    async def fake_navigate(self, page, url, capture):
+        page.url = url
+        return None, {}
+
+    async def fake_bundle(page, config):
+        html, links = site[page.url]
+        return {"title": "", "links": links, "html": html, "dom_structure": {}, "performance": {}, "forms": []}
+
+    async def live_detection(page_data, page):
+        live.append(page_data.url)
+        return []
+
+    async def no_robots(origin, user_agent, client=None):
+        return None
+
+    monkeypatch.setattr(scope_module, "fetch_robots_txt", no_robots)
+    monkeypatch.setattr(scope_module, "_robots_cache", {})
+    monkeypatch.setattr(crawler_module, "async_playwright", lambda: FakePlaywright())
+    monkeypatch.setattr(crawler, "_setup_browser", fake_setup_browser)
+    monkeypatch.setattr(crawler, "_extract_page_bundle", fake_bundle)
+    monkeypatch.setattr(ReadinessEngine, "navigate", fake_navigate)
+    crawler.live_detection = live_detection
+
+    config = CrawlerConfig(
+        target_url="https://example.com/", concurrent_pages=1, capture_screenshots=False, near_duplicate_detection=True
+    )
+    events = await collect(crawler, config)
+    crawled = {e.data["url"]: e.data["page_data"] for e in events if e.event_type == "page_crawled"}
+    assert crawled["https://example.com/a?print=1"].metadata["near_duplicate_of"] == "https://example.com/a"
+    # The near-duplicate's live results would be discarded by the pipeline, so they are never computed.
+    assert live == ["https://example.com/", "https://example.com/a"]
+    assert "live_detection" not in crawled["https://example.com/a?print=1"].metadata
+
+
+@pytest.mark.asyncio
+async def test_incremental_scan_revalidates_baseline_pages(monkeypatch):
+    def conditional_transport(request):
+        if request.url.path == "/":
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, text=STATIC_SITE["/"], headers={"content-type": "text/html", "etag": '"v2"'})
+        return static_transport(request)
+
+    original_init = HttpFetcher.__init__
+
+    def init_with_transport(self, config):
+        original_init(self, config)
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(conditional_transport))
+
+    monkeypatch.setattr(HttpFetcher, "__init__", init_with_transport)
+    config = CrawlerConfig(target_url="https://example.com/", fetch_mode="http", incremental=True)
+    canon = UrlCanonicalizer(config)
+    baseline = {
+        canon.hash("https://example.com/"): {
+            "page_id": "home", "title": "Home", "http_status": 200, "hygiene_score": 90.0,
+            "etag": '"v1"', "links": ["https://example.com/docs"],
+        },
+        canon.hash("https://example.com/docs"): {
+            "page_id": "docs", "title": "Docs", "http_status": 200, "hygiene_score": 80.0,
+            "content_hash": content_hash(STATIC_SITE["/docs"].replace("<body>", "<body><script>nonce=1</script>\n ")),
+        },
+    }
+
+    events = await collect(AutonomousCrawler(baseline=baseline), config)
+    crawled = {e.data["url"]: e.data["page_data"] for e in events if e.event_type == "page_crawled"}
+    # The 304 page is not fetched again, but its stored links still lead to /docs.
+    assert crawled["https://example.com/"].metadata["incremental"] == {"status": "not_modified", "previous_page_id": "home"}
+    assert crawled["https://example.com/"].metadata["etag"] == '"v1"'
+    assert crawled["https://example.com/docs"].metadata["incremental"] == {"status": "unchanged", "previous_page_id": "docs"}
+    assert events[-1].data["incremental"] == {"not_modified": 1, "unchanged": 1}
+
+    baseline[canon.hash("https://example.com/")]["etag"] = '"v0"'
+    events = await collect(AutonomousCrawler(baseline=baseline), config)
+    home = next(e.data["page_data"] for e in events if e.event_type == "page_crawled" and e.data["url"] == "https://example.com/")
+    assert home.metadata["incremental"] == {"status": "changed"}
+    assert home.metadata["etag"] == '"v2"'
+
+    # Neither side has a content hash to compare, so nothing shows the page is unchanged.
+    monkeypatch.setitem(STATIC_SITE, "/docs", "")
+    del baseline[canon.hash("https://example.com/docs")]["content_hash"]
+    events = await collect(AutonomousCrawler(baseline=baseline), config)
+    docs = next(e.data["page_data"] for e in events if e.event_type == "page_crawled" and e.data["url"] == "https://example.com/docs")
+    assert docs.metadata["incremental"] == {"status": "changed"}
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value.encode()
+
+    def lock(self, name, timeout=None):
+        return self._lock
+
+
+class LoginPage(FakeTabPage):
+    def __init__(self, context):
+        super().__init__()
+        self.context = context
+        self.url = "about:blank"
+
+    async def goto(self, url, **kwargs):
+        self.url = url
+
+    async def fill(self, selector, value, **kwargs):
+        pass
+
+    async def click(self, selector, **kwargs):
+        self.context.logins += 1
+        self.url = "https://app.example.com/home"
+
+    async def wait_for_selector(self, selector, **kwargs):
+        pass
+
+
+class LoginContext(FakeContext):
+    def __init__(self):
+        super().__init__()
+        self.logins = 0
+        self.cookies = []
+
+    async def new_page(self):
+        page = LoginPage(self)
+        self.pages.append(page)
+        return page
+
+    async def clear_cookies(self):
+        self.cookies = []
+
+    async def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+
+    async def storage_state(self):
+        return {
+            "cookies": [{"name": "sid", "value": f"s{self.logins}", "domain": "app.example.com", "path": "/"}],
+            "origins": [{"origin": "https://app.example.com", "localStorage": [{"name": "token", "value": "t"}]}],
+        }
+
+
+@pytest.mark.asyncio
+async def test_auth_session_logs_in_once_and_renews_on_session_loss():
+    config = CrawlerConfig(target_url="https://app.example.com/", auth_config=AuthConfig(
+        auth_type="credentials", login_url="https://app.example.com/login",
+        username="qa", password="secret", success_indicator="#account",
+    ))
+    redis = FakeRedis()
+    context = LoginContext()
+
+    async def open_context():
+        return context
+
+    first, second = AuthSession(config, redis, "org-1"), AuthSession(config, redis, "org-1")
+    await first.bootstrap(open_context)
+    await second.bootstrap(open_context)
+    # The second job reuses the cached storage state instead of logging in.
+    assert context.logins == 1
+    assert second.stats()["cache_hits"] == 1 and second.state == first.state
+
+    await first.apply(context)
+    assert context.cookies[0]["value"] == "s1"
+    assert '"token"' in context.init_scripts[-1]
+
+    assert first.session_lost("https://app.example.com/orders", "https://app.example.com/login?next=/orders", 200)
+    assert not first.session_lost("https://app.example.com/orders", "https://app.example.com/orders", 403)
+    seen = first.generation
+    assert await first.reauthenticate(context, seen)
+    # A tab that navigated with the old session only retries.
+    assert await first.reauthenticate(context, seen)
+    assert context.logins == 2
+    assert first.stats()["session_losses"] == 1
+    assert context.cookies[-1]["value"] == "s2"
+
+    with pytest.raises(ValueError):
+        AuthSession(config.model_copy(update={"auth_config": AuthConfig(auth_type="saml")}))
+
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/sitemap-pages.xml.gz</loc></sitemap>
+  <sitemap><loc>https://example.com/sitemap-missing.xml</loc></sitemap>
+</sitemapindex>"""
+SITEMAP_PAGES = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+""" + b"".join(
+    b"<url><loc>https://example.com/p/%d</loc><lastmod>2024-05-%02dT10:00:00Z</lastmod></url>" % (i, i % 28 + 1)
+    for i in range(3000)
+) + b"</urlset>"
+
+
+@pytest.mark.asyncio
+async def test_sitemap_reader_streams_gzip_and_nested_indexes():
+    def transport(request):
+        if request.url.path == "/sitemap.xml":
+            return httpx.Response(200, content=SITEMAP_INDEX)
+        if request.url.path == "/sitemap-pages.xml.gz":
+            return httpx.Response(200, content=gzip.compress(SITEMAP_PAGES), headers={"content-type": "application/gzip"})
+        return httpx.Response(404)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(transport))
+    reader = SitemapReader(client)
+    urls = [item async for item in reader.read(["https://example.com/sitemap.xml"])]
+    assert len(urls) == 3000
+    assert urls[1] == ("https://example.com/p/1", "2024-05-02T10:00:00Z")
+    assert reader.counts == {"sitemaps": 2, "urls": 3000, "errors": 1}
+
+    capped = SitemapReader(client, max_urls=10)
+    assert len([item async for item in capped.read(["https://example.com/sitemap.xml"])]) == 10
+    assert parse_lastmod("2024-05-02") < parse_lastmod("2024-05-02T10:00:00Z")
+    assert parse_lastmod("yesterday") is None
+    await client.aclose()
+
+
+def test_sitemap_priority_favours_pages_changed_since_the_baseline():
+    from apps.crawler.priority import PriorityScorer
+    from apps.crawler.sitemap import CHANGED_SINCE_BASELINE_BONUS, sitemap_priority
+
+    baseline = {"a": {"crawled_at": "2024-05-01T00:00:00"}, "b": {"crawled_at": "2024-06-01T00:00:00"}}
+    fifo = sitemap_priority(None, baseline)
+    assert fifo("https://example.com/a", "a", "2024-05-02") == CHANGED_SINCE_BASELINE_BONUS
+    assert fifo("https://example.com/b", "b", "2024-05-02") == 0.0
+    assert fifo("https://example.com/c", "c", None) == 0.0
+
+    scored = sitemap_priority(PriorityScorer(), baseline)
+    # Scored like links from the seed: a second page of the same template is less novel.
+    assert scored("https://example.com/p/1", "d", None) > scored("https://example.com/p/2", "e", None) > 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_backs_off_on_throttling_and_latency(monkeypatch):
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr("apps.crawler.rate_limit.asyncio.sleep", fake_sleep)
+    limiter = HostRateLimiter(rate=10, burst=2, min_rate=1, max_rate=20)
+
+    for _ in range(3):
+        await limiter.acquire("https://a.example.com/x")
+    # The burst is free; the third request waits for a token (~0.1 s at 10 req/s).
+    assert len(slept) == 1 and 0.05 < slept[0] <= 0.1
+
+    for _ in range(10):
+        await limiter.feedback("https://a.example.com/x", 200, 0.1)
+    assert limiter.rates["a.example.com"] > 10
+
+    await limiter.feedback("https://a.example.com/x", 429, 0.1, retry_after="5")
+    assert limiter.rates["a.example.com"] < 6
+    assert await limiter.acquire("https://a.example.com/x") >= 4.9
+    # Other hosts are unaffected.
+    assert await limiter.acquire("https://b.example.com/") == 0
+
+    limiter.DECREASE_INTERVAL = 0
+    before = limiter.rates["a.example.com"]
+    await limiter.feedback("https://a.example.com/x", 200, 5.0)
+    assert limiter.rates["a.example.com"] == pytest.approx(before * 0.8)
+    assert limiter.stats()["a.example.com"]["slow"] == 1
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["local", "redis"])
+async def test_rate_limiter_backs_off_on_failed_requests(backend):
+    redis_client = pytest.importorskip("fakeredis").aioredis.FakeRedis() if backend == "redis" else None
+    limiter = HostRateLimiter(redis_client, rate=10, min_rate=1, max_rate=20)
+    await limiter.feedback("https://a.example.com/x", 200, 0.1)
+    rate = limiter.rates["a.example.com"]
+
+    # No response at all (connection refused, timeout) is not a success.
+    await limiter.feedback("https://a.example.com/x", 0, 30.0)
+    assert limiter.rates["a.example.com"] == pytest.approx(rate * 0.8)
+    assert limiter.stats()["a.example.com"]["error"] == 1
+    # The failed request's 30 s stayed out of the latency average, so a normal response is not "slow".
+    limiter.DECREASE_INTERVAL = 0
+    await limiter.feedback("https://a.example.com/x", 200, 0.1)
+    assert "slow" not in limiter.stats()["a.example.com"]
+    assert limiter.rates["a.example.com"] > rate * 0.8
+
+
+@pytest.mark.asyncio
+async def test_broken_links_detector_bounds_concurrency():
+    in_flight, peak, statuses = 0, 0, {}
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        status = 404 if request.url.path == "/gone" else 429 if request.url.path == "/busy" else 200
+        statuses[request.url.path] = status
+        return httpx.Response(status)
+
+    detector = BrokenLinksDetector()
+    detector.rate_limiter = HostRateLimiter(rate=1000, burst=1000)
+    detector._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    links = [f"https://example.com/p{i}" for i in range(40)] + ["https://example.com/gone", "https://example.com/busy"]
+    page_data = PageData(
+        url="https://example.com/", url_hash="h", title="", http_status=200, depth=0, parent_url=None,
+        dom_snapshot="", dom_structure={}, console_logs=[], network_requests=[], performance_metrics={},
+        links_found=links, forms_found=[], interactive_elements=[], metadata={}, crawled_at=datetime.utcnow(),
+    )
+    issues = await detector.detect(page_data, None)
+    assert len(statuses) == 42
+    assert peak <= BrokenLinksDetector.MAX_CONCURRENT_CHECKS
+    assert [i.evidence["url"] for i in issues] == ["https://example.com/gone"]
+    assert detector.rate_limiter.stats()["example.com"]["throttled"] == 1
+    await detector.close()
+
+
+def make_entries(count, prefix="https://example.com/p"):
+    canonicalizer = UrlCanonicalizer()
+    return [FrontierEntry(f"{prefix}{i}", canonicalizer.hash(f"{prefix}{i}"), 1) for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_distributed_frontier_join_fails_when_a_shard_aborts(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from apps.crawler.frontier import RedisFrontier, shard_for
+
+    monkeypatch.setattr(RedisFrontier, "POLL_INTERVAL", 0.01)
+    redis_client = fakeredis.aioredis.FakeRedis()
+    shards = [RedisFrontier(redis_client, "job", shard_index=i, shard_count=2) for i in range(2)]
+    entries = make_entries(8)
+    seed = next(e for e in entries if shard_for(e.url_hash, 2) == 0)
+    await shards[0].bootstrap(seed, {"target_url": seed.url})
+    await shards[0].offer(entries)
+    assert int(await redis_client.get(shards[0].pending_key)) == 8
+
+    # Shard 0 drains its own entries; shard 1's stay pending because it died.
+    for _ in range(await redis_client.zcard(shards[0].frontier_key)):
+        await shards[0].task_done(await shards[0].get())
+    join = asyncio.create_task(shards[0].join())
+    await asyncio.sleep(0.05)
+    assert not join.done()
+
+    await shards[1].abort("shard 2/2 failed: boom")
+    await shards[0].abort("shard 1/2 failed: Scan aborted")
+    with pytest.raises(RuntimeError, match="shard 2/2 failed: boom"):
+        await asyncio.wait_for(join, 1)
+
+
+@pytest.mark.asyncio
+async def test_redis_frontier_resume_requeues_inflight_entries():
+    fakeredis = pytest.importorskip("fakeredis")
+    from apps.crawler.frontier import RedisFrontier
+
+    redis_client = fakeredis.aioredis.FakeRedis()
+    frontier = RedisFrontier(redis_client, "job")
+    entries = make_entries(3)
+    await frontier.bootstrap(entries[0], {"target_url": entries[0].url})
+    await frontier.offer(entries)
+    for _ in range(2):
+        assert await frontier.reserve(10)
+        await frontier.get()
+    assert await redis_client.hlen(frontier.inflight_key) == 2
+
+    # The worker dies with two pages in flight; the redelivered task resumes.
+    resumed = RedisFrontier(redis_client, "job")
+    assert await resumed.resume()
+    assert await redis_client.hlen(resumed.inflight_key) == 0
+    assert int(await redis_client.get(resumed.reserved_key)) == 0
+    crawled = []
+    for _ in range(3):
+        entry = await asyncio.wait_for(resumed.get(), 1)
+        crawled.append(entry.url)
+        await resumed.task_done(entry)
+    await asyncio.wait_for(resumed.join(), 1)
+    assert sorted(crawled) == sorted(e.url for e in entries)
+    assert not await RedisFrontier(redis_client, "other").resume()
+
+
+@pytest.mark.asyncio
+async def test_redis_frontier_budget_and_close():
+    fakeredis = pytest.importorskip("fakeredis")
+    from apps.crawler.frontier import RedisFrontier
+
+    redis_client = fakeredis.aioredis.FakeRedis()
+    shards = [RedisFrontier(redis_client, "job", shard_index=i, shard_count=2) for i in range(2)]
+    seed = make_entries(1)[0]
+    await shards[0].bootstrap(seed, {"target_url": seed.url})
+
+    assert [await shards[i % 2].reserve(2) for i in range(3)] == [True, True, False]
+    await shards[0].release()
+    assert await shards[1].reserve(2)
+    assert int(await redis_client.get(shards[0].reserved_key)) == 2
+
+    # Interrupted jobs keep their state for redelivery; the last shard to finish drops it.
+    assert not await shards[0].close(completed=False)
+    assert not await shards[0].close(completed=True)
+    assert await redis_client.exists(shards[0].meta_key)
+    assert await shards[1].close(completed=True)
+    assert not await redis_client.exists(shards[0].meta_key, shards[0].reserved_key, shards[0].frontier_key)
+
+
+@pytest.mark.asyncio
+async def test_redis_frontier_lease_admits_one_delivery():
+    fakeredis = pytest.importorskip("fakeredis")
+    from apps.crawler.frontier import RedisFrontier
+
+    redis_client = fakeredis.aioredis.FakeRedis()
+    running, redelivered = RedisFrontier(redis_client, "job"), RedisFrontier(redis_client, "job")
+    assert await running.acquire_lease()
+    assert not await redelivered.acquire_lease()
+    # Releasing a lease it never got leaves the running delivery's in place.
+    await redelivered.release_lease()
+    assert await redis_client.exists(running.lease_key)
+
+    await running.release_lease()
+    assert await redelivered.acquire_lease()
+    assert await redis_client.ttl(redelivered.lease_key) <= RedisFrontier.LEASE_TTL
+    await redelivered.release_lease()
+
+
+class FakeChromium:
+    def __init__(self):
+        self.connected = True
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def is_connected(self):
+        return self.connected
+
+    def disconnect(self):
+        self.connected = False
+        self.handlers["disconnected"](self)
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeChromiumDriver:
+    def __init__(self, failures):
+        self.failures = failures
+        self.launched = []
+        self.stopped = False
+        self.chromium = self
+
+    async def start(self):
+        return self
+
+    async def launch(self, headless=True):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("driver died")
+        self.launched.append(FakeChromium())
+        return self.launched[-1]
+
+    async def stop(self):
+        self.stopped = True
+
+
+@pytest.mark.asyncio
+async def test_browser_pool_recycles_and_relaunches_browsers(monkeypatch):
+    from apps.crawler import browser_pool as browser_pool_module
+
+    drivers = []
+
+    def fake_async_playwright():
+        # Only the first driver fails to launch.
+        drivers.append(FakeChromiumDriver(failures=0 if drivers else 1))
+        return drivers[-1]
+
+    monkeypatch.setattr(browser_pool_module, "async_playwright", fake_async_playwright)
+    pool = browser_pool_module.BrowserPool(size=1, max_uses=2)
+
+    # The first launch fails; the pool restarts the driver and launches again.
+    async with pool.lease() as first:
+        pass
+    assert drivers[0].stopped and len(drivers) == 2
+    async with pool.lease() as second:
+        pass
+    assert second is first and first.uses == 2
+
+    # max_uses reached: the browser was closed instead of going back to the pool.
+    assert not first.browser.is_connected()
+    async with pool.lease() as third:
+        assert third is not first
+        # Crashed while leased: closed on release.
+        third.browser.disconnect()
+    async with pool.lease() as fourth:
+        assert fourth is not third
+    # Crashed while idle: discarded on the next acquire.
+    fourth.browser.disconnect()
+    async with pool.lease() as fifth:
+        assert fifth is not fourth
+    assert len(drivers[1].launched) == 4
+
+    await pool.close()
+    assert drivers[1].stopped and not fifth.browser.is_connected()
+
+
+@pytest.mark.asyncio
+async def test_failed_login_returns_pooled_browser(monkeypatch):
+    from apps.crawler import browser_pool as browser_pool_module
+
+    driver = FakeChromiumDriver(failures=0)
+    monkeypatch.setattr(browser_pool_module, "async_playwright", lambda: driver)
+    pool = browser_pool_module.BrowserPool(size=1)
+    config = CrawlerConfig(target_url="https://app.example.com/", auth_config=AuthConfig(
+        auth_type="credentials", login_url="https://app.example.com/login",
+        username="qa", password="secret", success_indicator="#account",
+    ))
+    crawler = AutonomousCrawler(browser_pool=pool)
+    context = FakeContext()
+    context.closed = False
+
+    async def new_context(browser, config):
+        return context
+
+    async def close_context():
+        context.closed = True
+
+    async def failed_login(self, open_context):
+        await open_context()
+        raise RuntimeError("did not leave the login form")
+
+    async def no_robots(origin, user_agent, client=None):
+        return None
+
+    context.close = close_context
+    monkeypatch.setattr(scope_module, "fetch_robots_txt", no_robots)
+    monkeypatch.setattr(scope_module, "_robots_cache", {})
+    monkeypatch.setattr(crawler, "_new_context", new_context)
+    monkeypatch.setattr(AuthSession, "bootstrap", failed_login)
+
+    with pytest.raises(RuntimeError, match="login form"):
+        await collect(crawler, config)
+    assert context.closed and crawler._lease is None
+    # The slot is free again and the browser went back to the pool.
+    async with asyncio.timeout(1):
+        async with pool.lease() as pooled:
+            assert pooled.browser is driver.launched[0] and pooled.uses == 2
+    await pool.close()
+
+
+class ShardCrawler:
+    """Stands in for AutonomousCrawler in a browser process: one page per shard."""
+
+    def __init__(self, frontier, **kwargs):
+        self.shard = frontier.shard_index
+
+    def _hash_url(self, url):
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    async def start(self, config):
+        yield CrawlerEvent("scan_started", {"resumed": False})
+        url = f"https://example.com/shard-{self.shard}"
+        yield CrawlerEvent("page_crawled", {"url": url, "page_data": make_page_data(self, url, 1, "https://example.com")})
+        yield CrawlerEvent("page_represented", {"url": f"{url}/2", "represented_by": url})
+        yield CrawlerEvent("scan_completed", {
+            "total_pages_crawled": 2, "total_pages_discovered": 3,
+            "dedup": {"duplicates_skipped": self.shard}, "final": self.shard == 1, "error": None,
+        })
+
+
+class StubDetectorEngine:
+    def __init__(self, timeout=None):
+        self.live_hook = None
+
+    async def close(self):
+        pass
+
+
+class StubPipeline:
+    def __init__(self, job_id, config, static_pool=None):
+        self.redis_client = StubPipeline.redis_client
+        self.pages = []
+        self.represented = {}
+        self.pages_handled = 0
+        self.completed = None
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def publish(self, message):
+        pass
+
+    async def load_baseline(self, config):
+        return {}
+
+    async def load_org_id(self):
+        return "org-1"
+
+    async def handle_page(self, page_data):
+        self.pages.append(page_data.url)
+        self.pages_handled += 1
+
+    async def handle_represented(self, url, representative_url):
+        self.represented[url] = representative_url
+
+    def throughput(self):
+        return {"pages": self.pages_handled, "pages_per_sec": 1.0, "detectors": {}}
+
+    async def complete(self, stats):
+        self.completed = stats
+        StubPipeline.instances.append(self)
+
+
+class ThreadProcess:
+    """billiard Process stand-in that runs the browser process target in a thread."""
+
+    def __init__(self, target, args):
+        self.thread = threading.Thread(target=target, args=args)
+        self.exitcode = None
+
+    def start(self):
+        self.thread.start()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+        self.exitcode = 0
+
+    def terminate(self):
+        pass
+
+
+class DeadProcess(ThreadProcess):
+    """Killed before it could report, e.g. by the OOM killer."""
+
+    def start(self):
+        self.exitcode = -9
+
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+
+class FakeSpawnContext:
+    def __init__(self, process_class):
+        self.Process = process_class
+
+    def Queue(self, maxsize=0):
+        return queue.Queue(maxsize)
+
+
+@pytest.fixture
+def multiprocess_job(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    StubPipeline.redis_client = fakeredis.aioredis.FakeRedis()
+    StubPipeline.instances = []
+    failures = []
+
+    async def mark_failed(job_id, message):
+        failures.append(message)
+
+    async def bootstrapped(pipeline, config, shard_count, baseline=None):
+        return True
+
+    monkeypatch.setattr(tasks_module, "ScanPipeline", StubPipeline)
+    monkeypatch.setattr(tasks_module, "_get_static_pool", lambda processes: None)
+    monkeypatch.setattr(tasks_module, "_bootstrap_shared_frontier", bootstrapped)
+    monkeypatch.setattr(tasks_module, "_mark_job_failed", mark_failed)
+    monkeypatch.setattr(tasks_module, "AutonomousCrawler", ShardCrawler)
+    monkeypatch.setattr(tasks_module, "DefectDetectionEngine", StubDetectorEngine)
+    monkeypatch.setattr(tasks_module.aioredis, "from_url", lambda url: fakeredis.aioredis.FakeRedis())
+    return failures
+
+
+@pytest.mark.asyncio
+async def test_browser_process_reports_pages_then_done(multiprocess_job):
+    page_queue = queue.Queue()
+    config = CrawlerConfig(target_url="https://example.com", process_workers=2)
+    await tasks_module._browser_process("job-1", config.model_dump(), 1, 2, page_queue)
+
+    kind, shard, payload = page_queue.get_nowait()
+    assert (kind, shard, payload["url"]) == ("page", 1, "https://example.com/shard-1")
+    kind, shard, payload = page_queue.get_nowait()
+    assert (kind, shard, payload["represented_by"]) == ("represented", 1, "https://example.com/shard-1")
+    kind, shard, stats = page_queue.get_nowait()
+    assert (kind, shard) == ("done", 1)
+    assert stats["pages"] == 1 and stats["error"] is None and stats["scan"]["final"]
+    assert set(stats) == {"pages", "pages_per_sec", "queue_wait_seconds", "scan", "error"}
+    assert page_queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_multiprocess_scan_collects_pages_and_throughput(multiprocess_job, monkeypatch):
+    monkeypatch.setattr(tasks_module.billiard, "get_context", lambda method: FakeSpawnContext(ThreadProcess))
+    config = CrawlerConfig(target_url="https://example.com", process_workers=2)
+
+    result = await tasks_module._run_multiprocess("job-1", config.model_dump())
+    assert result == {"status": "completed", "job_id": "job-1"}
+    pipeline = StubPipeline.instances[0]
+    assert sorted(pipeline.pages) == ["https://example.com/shard-0", "https://example.com/shard-1"]
+    assert pipeline.represented["https://example.com/shard-0/2"] == "https://example.com/shard-0"
+
+    stats = pipeline.completed
+    # Totals come from the process that closed the shared frontier.
+    assert (stats["total_pages_crawled"], stats["total_pages_discovered"]) == (2, 3)
+    assert set(stats["throughput"]["browser"]) == {"0", "1"}
+    assert set(stats["throughput"]["browser"]["0"]) == {"pages", "pages_per_sec", "queue_wait_seconds", "error"}
+    assert stats["throughput"]["analysis"]["pages"] == 2
+    assert stats["dedup"] == {"0": {"duplicates_skipped": 0}, "1": {"duplicates_skipped": 1}}
+    assert not multiprocess_job
+
+
+@pytest.mark.asyncio
+async def test_multiprocess_scan_aborts_when_a_browser_process_dies(multiprocess_job, monkeypatch):
+    from apps.crawler.frontier import RedisFrontier
+
+    monkeypatch.setattr(tasks_module.billiard, "get_context", lambda method: FakeSpawnContext(DeadProcess))
+    config = CrawlerConfig(target_url="https://example.com", process_workers=2)
+
+    with pytest.raises(RuntimeError, match="exited with code -9"):
+        await tasks_module._run_multiprocess("job-1", config.model_dump())
+    assert multiprocess_job == ["Browser process 1/2 exited with code -9"]
+    frontier = RedisFrontier(StubPipeline.redis_client, "job-1", shard_count=2)
+    # Survivors see the abort in join(), and the next delivery can take the lease.
+    assert await StubPipeline.redis_client.get(frontier.abort_key)
+    assert await frontier.acquire_lease()
+    await frontier.release_lease()